@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Lastmessung der CSV-Synchronisation gegen den lokalen Shopware-Mock
+
+Erzeugt synthetische CSV-Dateien, startet mock_shopware.py und misst für
+ProductSyncManager.run_once je Dateigröße und Modus:
+Zeilen/Sekunde, Anfragen/Zeile, maximalen Speicherbedarf (Peak RSS) sowie
+p50/p99 der Anfragelatenz. Jeder Lauf findet in einem eigenen Prozess statt.
+
+Verwendung:
+    python benchmark.py                                   # 1k und 10k Zeilen, single und bulk
+    python benchmark.py --rows 1000 100000 1000000 --modes bulk --concurrency 4
+    python benchmark.py --latency 0.02 --error-rate 0.01 --output ergebnis.json
+    python benchmark.py --runs 2 --compare                # Zweiter Lauf mit unveränderter CSV
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # Nicht verfügbar unter Windows
+    resource = None
+
+from mock_shopware import MockShopwareServer
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+def generate_csv(file_path: str, rows: int, seed: int = 42):
+    """
+    Schreibt eine synthetische Produkt-CSV mit der Spaltenstruktur der Beispieldatei
+    """
+    rng = random.Random(seed)
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        f.write('product_number,name,description,price,stock,weight,ean,active\n')
+        for i in range(rows):
+            f.write(
+                f"BENCH{i:07d},Benchmark Produkt {i},Synthetisches Produkt für Lasttests,"
+                f"{rng.uniform(1, 500):.2f},{rng.randint(0, 1000)},{rng.uniform(0.1, 20):.2f},"
+                f"{4000000000000 + i},{'true' if rng.random() > 0.1 else 'false'}\n"
+            )
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Maximaler Speicherbedarf des aktuellen Prozesses in MB
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def percentile(values: List[float], percent: int) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+def run_sync(env: Dict[str, str], results):
+    """
+    Führt eine Synchronisation im Kindprozess aus und meldet die Messwerte
+    """
+    os.environ.update(env)
+    sys.path.append(SRC_DIR)
+    from sync_manager import ProductSyncManager
+    from sync_metrics import metrics
+
+    manager = ProductSyncManager()
+
+    # Latenz jeder HTTP-Anfrage (inkl. Wiederholungen) erfassen
+    latencies = []
+    manager.shopware_api.session.hooks['response'].append(
+        lambda response, *args, **kwargs: latencies.append(response.elapsed.total_seconds())
+    )
+
+    started = time.perf_counter()
+    success = manager.run_once()
+    duration = time.perf_counter() - started
+
+    results.put({
+        'success': success,
+        'duration': duration,
+        'latencies': latencies,
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': metrics.snapshot()['phases']
+    })
+
+def run_case(server: MockShopwareServer, work_dir: str, csv_path: str, rows: int, mode: str,
+             args: argparse.Namespace, run: int = 1) -> Dict:
+    """
+    Misst einen Lauf für eine Dateigröße und einen Modus
+
+    Ab dem zweiten Lauf bleibt der Produktbestand des Mock-Shops erhalten.
+    """
+    if run == 1:
+        server.state.reset()
+        server.state.seed([f"BENCH{i:07d}" for i in range(int(rows * args.existing))])
+    else:
+        server.state.reset_stats()
+
+    env = {
+        'SHOPWARE_URL': server.url,
+        'SHOPWARE_API_USERNAME': 'benchmark',
+        'SHOPWARE_API_PASSWORD': 'benchmark',
+        'CSV_FILE_PATH': csv_path,
+        'SYNC_MODE': mode,
+        'SYNC_CONCURRENCY': str(args.concurrency),
+        'CSV_CHUNK_SIZE': str(args.chunk_size),
+        'CSV_PARSE_MODE': args.parse_mode,
+        'SHOPWARE_RATE_LIMIT': '0',
+        'INCREMENTAL_SYNC': 'false',
+        'COMPARE_BEFORE_UPDATE': 'true' if args.compare else 'false',
+        'PRODUCT_ID_CACHE_FILE': '',
+        'CHECKPOINT_FILE': '',
+        'DEAD_LETTER_FILE': os.path.join(work_dir, f'dead_letter_{mode}_{rows}.jsonl'),
+        'LOG_FILE': os.path.join(work_dir, 'benchmark.log'),
+        'METRICS_FILE': os.path.join(work_dir, f'metrics_{mode}_{rows}.json'),
+        'LOG_LEVEL': args.log_level
+    }
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_sync, args=(env, results))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"Benchmark-Prozess beendet mit Code {process.exitcode}")
+    process.join()
+
+    stats = server.state.stats()
+    latencies = result['latencies']
+
+    return {
+        'rows': rows,
+        'mode': mode,
+        'run': run,
+        'success': result['success'],
+        'duration_s': round(result['duration'], 3),
+        'rows_per_s': round(rows / result['duration'], 1) if result['duration'] else None,
+        'requests': stats['total_requests'],
+        'requests_per_row': round(stats['total_requests'] / rows, 4) if rows else None,
+        'requests_by_endpoint': stats['requests'],
+        'products_in_shop': stats['products'],
+        'peak_rss_mb': round(result['peak_rss_mb'], 1) if result['peak_rss_mb'] else None,
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'phases': result['phases']
+    }
+
+def print_results(results: List[Dict]):
+    print()
+    print(f"{'Zeilen':>9} {'Modus':<7} {'Lauf':>4} {'OK':<3} {'Dauer s':>9} {'Zeilen/s':>10} {'Anfr./Zeile':>11} "
+          f"{'RSS MB':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    print("-" * 89)
+    for r in results:
+        print(f"{r['rows']:>9} {r['mode']:<7} {r['run']:>4} {'✅' if r['success'] else '❌':<3} {r['duration_s']:>9} "
+              f"{r['rows_per_s']:>10} {r['requests_per_row']:>11} {str(r['peak_rss_mb']):>8} "
+              f"{str(r['latency_p50_ms']):>8} {str(r['latency_p99_ms']):>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Lastmessung der CSV-Synchronisation gegen den Shopware-Mock")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help="Zeilenanzahlen der CSV-Dateien")
+    parser.add_argument('--modes', nargs='+', default=['single', 'bulk'], choices=['single', 'bulk'])
+    parser.add_argument('--concurrency', type=int, default=4, help="SYNC_CONCURRENCY")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="CSV_CHUNK_SIZE")
+    parser.add_argument('--parse-mode', default='default', choices=['default', 'processes', 'pyarrow', 'parallel'],
+                        help="CSV_PARSE_MODE")
+    parser.add_argument('--runs', type=int, default=1, help="Läufe je Fall (Folgeläufe mit unverändertem Shop)")
+    parser.add_argument('--compare', action='store_true', help="COMPARE_BEFORE_UPDATE aktivieren")
+    parser.add_argument('--existing', type=float, default=0.5, help="Anteil bereits vorhandener Produkte (0-1)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mock: Antwortzeit je Anfrage in Sekunden")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Mock: zusätzliche zufällige Antwortzeit")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Mock: Anteil der Anfragen mit HTTP 503")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Mock: maximale Anfragen pro Sekunde")
+    parser.add_argument('--log-level', default='ERROR', help="LOG_LEVEL der Synchronisation")
+    parser.add_argument('--output', help="Ergebnisse zusätzlich als JSON-Datei speichern")
+    args = parser.parse_args()
+
+    server = MockShopwareServer(latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, rate_limit=args.rate_limit).start()
+    print(f"🧪 Mock Shopware API läuft auf {server.url}")
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            for rows in args.rows:
+                csv_path = os.path.join(work_dir, f'products_{rows}.csv')
+                generate_csv(csv_path, rows)
+
+                for mode in args.modes:
+                    for run in range(1, args.runs + 1):
+                        print(f"⏱️ {rows} Zeilen, Modus {mode}, Lauf {run}...")
+                        results.append(run_case(server, work_dir, csv_path, rows, mode, args, run))
+    finally:
+        server.stop()
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Ergebnisse gespeichert: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -52,12 +52,99 @@ SHOPWARE_API_PASSWORD={api_password}
 # CSV-Datei Pfad
 CSV_FILE_PATH={csv_path}
 
+# Verzeichnismodus: alle Dateien mit FEED_PATTERN in FEED_DIRECTORY synchronisieren
+# (ersetzt CSV_FILE_PATH; Zustandsdateien erhalten den Dateinamen als Zusatz).
+# Bis zu FEED_CONCURRENCY Dateien werden gleichzeitig verarbeitet.
+FEED_DIRECTORY=
+FEED_PATTERN=*.csv
+FEED_CONCURRENCY=2
+
 # Logging Konfiguration
 LOG_LEVEL={log_level}
 LOG_FILE=./logs/shopware_sync.log
 
 # Update Intervall (in Sekunden)
 CHECK_INTERVAL={check_interval}
+
+# Dateiüberwachung: Ereignisse innerhalb dieses Fensters zusammenfassen (Sekunden)
+WATCH_DEBOUNCE_SECONDS=2
+# Datei gilt als fertig geschrieben, wenn Größe/Änderungszeit so lange gleich bleiben
+WATCH_STABLE_SECONDS=0.5
+
+# Synchronisationsmodus: single (einzeln) oder bulk (Sync-API)
+SYNC_MODE=single
+SYNC_BATCH_SIZE=500
+# Steuersatz in Prozent sowie Standard-Währungs- und Steuer-ID
+# (je Zeile überschreibbar über die Spalten tax_rate, currency_id, tax_id)
+SHOPWARE_TAX_RATE=19
+SHOPWARE_CURRENCY_ID=b7d2554b0ce847cd82f3ac9bd1c0dfca
+SHOPWARE_TAX_ID=f5c428b9cd2e455b9b2d3c9b9d9f1c85
+# Eigene Zuordnung CSV-Spalten -> Shopware-Felder (JSON oder YAML, leer = Standard)
+# Beispiel: ./mappings/standard.json
+PRODUCT_MAPPING_FILE=
+# Anzahl CSV-Zeilen, die pro Block gelesen und synchronisiert werden
+CSV_CHUNK_SIZE=10000
+# CSV-Parsing für sehr große Dateien: default (ein Kern), processes (Prozesspool,
+# Bereiche von CSV_PARSE_BLOCK_MB), pyarrow (mehrere Threads, erfordert pyarrow)
+# oder parallel (pyarrow falls installiert, sonst processes); 0 Worker = alle Kerne
+CSV_PARSE_MODE=default
+CSV_PARSE_WORKERS=0
+CSV_PARSE_BLOCK_MB=32
+# Parallele Anfragen an Shopware und maximale Anfragen pro Sekunde (0 = unbegrenzt)
+SYNC_CONCURRENCY=1
+SHOPWARE_RATE_LIMIT=0
+
+# HTTP-Verbindungen: Poolgröße (0 = SYNC_CONCURRENCY), Timeouts in Sekunden, gzip-komprimierte Anfragen
+SHOPWARE_POOL_SIZE=0
+SHOPWARE_CONNECT_TIMEOUT=5
+SHOPWARE_READ_TIMEOUT=60
+SHOPWARE_GZIP_REQUESTS=false
+# Access Token so viele Sekunden vor Ablauf erneuern
+SHOPWARE_TOKEN_REFRESH_MARGIN=60
+
+# Wiederholungen bei 429/5xx (Backoff in Sekunden) und Pause bei hoher Fehlerquote
+SHOPWARE_MAX_RETRIES=5
+SHOPWARE_RETRY_BASE_DELAY=0.5
+SHOPWARE_RETRY_MAX_DELAY=60
+CIRCUIT_BREAKER_FAILURE_RATE=0.5
+CIRCUIT_BREAKER_COOLDOWN=30
+# Endgültig fehlgeschlagene Zeilen (erneut senden mit: python main.py replay)
+DEAD_LETTER_FILE=./state/dead_letter.jsonl
+
+# Cache Produktnummer -> Produkt-ID (leer lassen, um nur im Speicher zu cachen)
+PRODUCT_ID_CACHE_FILE=./state/product_ids.json
+# Aktuellen Produktstand vorab abrufen und nur geänderte Felder senden
+# (unveränderte Produkte werden übersprungen)
+COMPARE_BEFORE_UPDATE=false
+
+# Medienordner für importierte Produktbilder (RestAPI_Test/media_import.py, leer = Standardordner)
+SHOPWARE_MEDIA_FOLDER_ID=
+
+# Inkrementelle Synchronisation: nur neue/geänderte Zeilen senden
+INCREMENTAL_SYNC=false
+ROW_STATE_FILE=./state/row_snapshot.json
+# Checkpoint-Datenbank für "python main.py resume" (leer = deaktiviert)
+CHECKPOINT_FILE=./state/sync_checkpoint.db
+# Aus der CSV entfernte Produkte in Shopware deaktivieren
+DEACTIVATE_DELETED_PRODUCTS=false
+
+# Fast Lane (aktiviert den Zeilenvergleich): Änderungen nur an Bestand/Preis
+# werden alle FAST_SYNC_INTERVAL Sekunden gebündelt übertragen, übrige
+# Inhaltsänderungen spätestens nach FULL_SYNC_INTERVAL Sekunden
+FAST_LANE=false
+FAST_LANE_FIELDS=stock,price
+FAST_LANE_BATCH_SIZE=2000
+FAST_SYNC_INTERVAL=30
+FULL_SYNC_INTERVAL=900
+
+# Kennzahlen je Lauf als JSON-Datei (leer = deaktiviert)
+METRICS_FILE=./logs/sync_metrics.json
+# Prometheus-Endpunkt /metrics im watcher/interval-Modus (0 = deaktiviert)
+METRICS_PORT=0
+# Adresse des Metrik-Endpunkts (0.0.0.0 = alle Netzwerkschnittstellen)
+METRICS_HOST=127.0.0.1
+# Jede gemessene Phase einzeln protokollieren
+METRICS_TRACE_SPANS=false
 """
     
     try:
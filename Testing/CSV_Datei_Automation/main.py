@@ -7,8 +7,10 @@ einer CSV-Datei und einem Shopware-Shop über die Admin API.
 
 Verwendung:
     python main.py once           # Einmalige Synchronisation
+    python main.py resume         # Unterbrochene Synchronisation fortsetzen
     python main.py watcher        # Kontinuierliche Überwachung der CSV-Datei
     python main.py interval       # Intervallbasierte Prüfung auf Änderungen
+    python main.py replay         # Fehlgeschlagene Zeilen erneut senden
 """
 
 import sys
@@ -17,13 +19,14 @@ import os
 # Pfad zum src-Verzeichnis hinzufügen
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from sync_manager import ProductSyncManager
+from feed_directory import create_sync_manager
 
 def main():
     """
     Hauptfunktion des Programms
     """
-    sync_manager = ProductSyncManager()
+    # Mit FEED_DIRECTORY werden alle CSV-Dateien des Verzeichnisses synchronisiert
+    sync_manager = create_sync_manager()
     
     # Kommandozeilenargumente verarbeiten
     if len(sys.argv) > 1:
@@ -38,6 +41,15 @@ def main():
                 print("❌ Synchronisation fehlgeschlagen!")
                 sys.exit(1)
                 
+        elif mode == 'resume':
+            print("⏯️ Setze unterbrochene Synchronisation fort...")
+            success = sync_manager.run_resume()
+            if success:
+                print("✅ Synchronisation erfolgreich abgeschlossen!")
+            else:
+                print("❌ Synchronisation fehlgeschlagen!")
+                sys.exit(1)
+                
         elif mode == 'watcher':
             print("👀 Starte Dateiüberwachung...")
             print("Drücken Sie Ctrl+C zum Beenden")
@@ -48,6 +60,15 @@ def main():
             print("Drücken Sie Ctrl+C zum Beenden")
             sync_manager.run_continuous('interval')
             
+        elif mode == 'replay':
+            print("🔁 Sende fehlgeschlagene Zeilen erneut...")
+            success = sync_manager.run_replay()
+            if success:
+                print("✅ Alle fehlgeschlagenen Zeilen erfolgreich übertragen!")
+            else:
+                print("❌ Einige Zeilen sind erneut fehlgeschlagen (siehe Dead-Letter-Datei)!")
+                sys.exit(1)
+                
         elif mode in ['help', '-h', '--help']:
             print_help()
             
@@ -70,17 +91,22 @@ Verwendung:
 
 Modi:
     once        Einmalige Synchronisation aller Produkte
+    resume      Abgebrochene Synchronisation ab dem letzten Checkpoint fortsetzen
     watcher     Kontinuierliche Überwachung der CSV-Datei auf Änderungen
     interval    Intervallbasierte Prüfung auf CSV-Änderungen
+    replay      Fehlgeschlagene Zeilen aus der Dead-Letter-Datei erneut senden
     help        Diese Hilfe anzeigen
 
 Konfiguration:
     Bearbeiten Sie die .env-Datei für Ihre Shopware-Einstellungen.
+    Mit FEED_DIRECTORY gelten alle Modi für sämtliche Feed-Dateien eines Verzeichnisses.
 
 Beispiele:
     python main.py once         # Sofortige Synchronisation
+    python main.py resume       # Nach einem Abbruch dort weitermachen, wo aufgehört wurde
     python main.py watcher      # Läuft dauerhaft und reagiert auf CSV-Änderungen
     python main.py interval     # Prüft alle X Sekunden auf Änderungen
+    python main.py replay       # Sendet nur die zuletzt fehlgeschlagenen Zeilen
     """)
 
 if __name__ == "__main__":
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Lokaler Ersatz für die Shopware Admin API
+
+Stellt die von der Synchronisation genutzten Endpunkte bereit (OAuth-Token,
+Produktsuche, PATCH/POST Produkt, Sync-API, Medien-Suche/-Upload) und simuliert Latenz, Fehlerquoten
+und Ratenbegrenzung. Damit lassen sich Synchronisation und Benchmarks ohne
+echten Shop ausführen.
+
+Verwendung:
+    python mock_shopware.py --port 8000 --latency 0.02 --error-rate 0.01 --rate-limit 100
+
+Anschließend in der .env-Datei SHOPWARE_URL=http://127.0.0.1:8000 setzen.
+Statistiken: GET /__stats, Zurücksetzen: POST /__reset
+"""
+
+import re
+import gzip
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl
+
+PRODUCT_URL = re.compile(r'^/api/product/([0-9a-f]{32})$')
+MEDIA_URL = re.compile(r'^/api/media/([0-9a-f]{32})$')
+MEDIA_UPLOAD_URL = re.compile(r'^/api/_action/media/([0-9a-f]{32})/upload\?(.*)$')
+
+class MockShopwareState:
+    """
+    Produktbestand und Anfragestatistik des Mock-Servers
+    """
+
+    def __init__(self):
+        self.products: Dict[str, Dict] = {}
+        self.numbers: Dict[str, str] = {}
+        self.media: Dict[str, Dict] = {}
+        self.tokens = set()
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+    def add_product(self, product: Dict) -> str:
+        """
+        Legt ein Produkt an oder überschreibt es (Upsert über id bzw. productNumber)
+        """
+        with self.lock:
+            product_id = product.get('id') or self.numbers.get(product.get('productNumber')) or uuid.uuid4().hex
+            stored = dict(self.products.get(product_id, {}))
+            stored.update(product)
+            stored['id'] = product_id
+            self.products[product_id] = stored
+            self.numbers[stored.get('productNumber')] = product_id
+            return product_id
+
+    def seed(self, product_numbers: List[str]):
+        """
+        Legt vorhandene Produkte an (z.B. für Benchmarks mit Aktualisierungen)
+        """
+        for product_number in product_numbers:
+            self.add_product({'productNumber': product_number, 'name': product_number})
+
+    def reset(self):
+        with self.lock:
+            self.products.clear()
+            self.numbers.clear()
+            self.media.clear()
+            self.tokens.clear()
+            self.requests.clear()
+
+    def reset_stats(self):
+        """
+        Setzt nur die Anfragestatistik zurück, der Produktbestand bleibt erhalten
+        """
+        with self.lock:
+            self.requests.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'products': len(self.products),
+                'media': len(self.media),
+                'requests': dict(self.requests),
+                'total_requests': sum(self.requests.values())
+            }
+
+
+class MockShopwareHandler(BaseHTTPRequestHandler):
+    """
+    HTTP-Handler mit den Shopware-Endpunkten
+    """
+
+    # Keep-Alive, damit Verbindungspools wie bei einem echten Server wirken
+    protocol_version = 'HTTP/1.1'
+    # Header und Body werden getrennt geschrieben; ohne TCP_NODELAY verzögert
+    # Nagle + Delayed ACK jede Antwort um bis zu 40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Keine Ausgabe je Anfrage
+        pass
+
+    # --- Antworten ---
+
+    def _send_json(self, status: int, data: Optional[Dict] = None, headers: Optional[Dict] = None):
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        self.send_response(status)
+        if body:
+            self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_error(self, status: int, detail: str, headers: Optional[Dict] = None):
+        self._send_json(status, {'errors': [{'status': str(status), 'detail': detail}]}, headers)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return json.loads(body) if body else {}
+
+    # --- Simulation ---
+
+    def _simulate(self, endpoint: str) -> bool:
+        """
+        Zählt die Anfrage, wartet die Latenz ab und simuliert Ratenbegrenzung und Serverfehler
+
+        Returns:
+            False, wenn bereits eine Fehlerantwort gesendet wurde
+        """
+        server = self.server
+        with server.state.lock:
+            server.state.requests[endpoint] += 1
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        if not server.allow_request():
+            self._send_error(429, 'Too Many Requests', {'Retry-After': '1'})
+            return False
+
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_error(503, 'Service Unavailable')
+            return False
+
+        return True
+
+    def _authorized(self) -> bool:
+        header = self.headers.get('Authorization', '')
+        token = header[7:] if header.startswith('Bearer ') else None
+        with self.server.state.lock:
+            valid = token in self.server.state.tokens
+        if not valid:
+            self._send_error(401, 'Access token could not be verified')
+        return valid
+
+    # --- Endpunkte ---
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        if self.path == '/__stats':
+            self._send_json(200, self.server.state.stats())
+        else:
+            self._send_error(404, f'No route found for "GET {self.path}"')
+
+    def do_POST(self):
+        upload = MEDIA_UPLOAD_URL.match(self.path)
+        if upload:
+            self._upload(upload.group(1), upload.group(2))
+            return
+
+        try:
+            data = self._read_json()
+        except ValueError:
+            self._send_error(400, 'Invalid JSON')
+            return
+
+        if self.path == '/__reset':
+            self.server.state.reset()
+            self._send_json(204)
+        elif self.path == '/api/oauth/token':
+            self._token(data)
+        elif self.path == '/api/search/product':
+            self._search(data)
+        elif self.path == '/api/search/media':
+            self._search_media(data)
+        elif self.path == '/api/product':
+            self._create(data)
+        elif self.path == '/api/_action/sync':
+            self._sync(data)
+        else:
+            self._send_error(404, f'No route found for "POST {self.path}"')
+
+    def do_PATCH(self):
+        match = PRODUCT_URL.match(self.path)
+        if not match:
+            self._send_error(404, f'No route found for "PATCH {self.path}"')
+            return
+
+        data = self._read_json()
+        if not self._simulate('update') or not self._authorized():
+            return
+
+        state = self.server.state
+        with state.lock:
+            exists = match.group(1) in state.products
+        if not exists:
+            self._send_error(404, f'The product resource with the following primary key was not found: id({match.group(1)})')
+            return
+
+        data['id'] = match.group(1)
+        state.add_product(data)
+        self._send_json(204)
+
+    def do_DELETE(self):
+        match = MEDIA_URL.match(self.path)
+        if not match:
+            self._send_error(404, f'No route found for "DELETE {self.path}"')
+            return
+        if not self._simulate('media_delete') or not self._authorized():
+            return
+
+        with self.server.state.lock:
+            deleted = self.server.state.media.pop(match.group(1), None)
+        if deleted is None:
+            self._send_error(404, f'The media resource with the following primary key was not found: id({match.group(1)})')
+            return
+        self._send_json(204)
+
+    def _token(self, data: Dict):
+        if not self._simulate('token'):
+            return
+        if not data.get('username') or not data.get('password'):
+            self._send_error(400, 'The user credentials were incorrect.')
+            return
+
+        token = uuid.uuid4().hex
+        with self.server.state.lock:
+            self.server.state.tokens.add(token)
+        self._send_json(200, {'token_type': 'Bearer', 'expires_in': self.server.token_ttl, 'access_token': token})
+
+    def _search(self, data: Dict):
+        if not self._simulate('search') or not self._authorized():
+            return
+
+        state = self.server.state
+        numbers = None
+        for criteria in data.get('filter', []):
+            if criteria.get('field') != 'productNumber':
+                continue
+            if criteria.get('type') == 'equals':
+                numbers = [criteria.get('value')]
+            elif criteria.get('type') == 'equalsAny':
+                numbers = list(criteria.get('value') or [])
+
+        with state.lock:
+            if numbers is None:
+                products = list(state.products.values())
+            else:
+                products = [state.products[state.numbers[n]] for n in numbers if n in state.numbers]
+
+        total = len(products)
+        limit = int(data.get('limit') or 0)
+        if limit:
+            page = int(data.get('page') or 1)
+            products = products[(page - 1) * limit:page * limit]
+
+        includes = (data.get('includes') or {}).get('product')
+        if includes:
+            products = [{field: product.get(field) for field in includes} for product in products]
+
+        self._send_json(200, {'total': total, 'data': products})
+
+    def _create(self, data: Dict):
+        if not self._simulate('create') or not self._authorized():
+            return
+
+        error = self._validate(data)
+        if error:
+            self._send_error(400, error)
+            return
+
+        product_id = self.server.state.add_product(data)
+        self._send_json(200, {'data': {'id': product_id}})
+
+    def _sync(self, data: Dict):
+        if not self._simulate('sync') or not self._authorized():
+            return
+
+        # Wie bei Shopware: Fehler mit JSON-Pointer, bei Fehlern wird nichts geschrieben.
+        # Teilaktualisierungen vorhandener Produkte benötigen keine Pflichtfelder.
+        # Wie die Datenbank: eine Produktnummer gehört zu genau einer ID.
+        state = self.server.state
+        errors = []
+        for key, operation in data.items():
+            if operation.get('entity', 'product') != 'product':
+                continue
+            owners = {}
+            for index, payload in enumerate(operation.get('payload') or []):
+                product_number = payload.get('productNumber')
+                with state.lock:
+                    exists = payload.get('id') in state.products
+                    owner = owners.get(product_number) or state.numbers.get(product_number)
+                error = None if exists else self._validate(payload)
+                if product_number and owner not in (None, payload.get('id')):
+                    error = f"Duplicate entry '{product_number}' for key 'product.uniq.product.product_number'"
+                if product_number:
+                    owners.setdefault(product_number, payload.get('id'))
+                if error:
+                    errors.append({
+                        'status': '400',
+                        'detail': error,
+                        'source': {'pointer': f'/{key}/{index}/productNumber'}
+                    })
+        if errors:
+            self._send_json(400, {'errors': errors})
+            return
+
+        for operation in data.values():
+            for payload in operation.get('payload') or []:
+                if operation.get('entity', 'product') == 'media':
+                    with state.lock:
+                        media_id = payload.get('id') or uuid.uuid4().hex
+                        state.media.setdefault(media_id, {'id': media_id, 'fileName': None}).update(payload)
+                else:
+                    state.add_product(payload)
+        self._send_json(200, {'success': True})
+
+    def _search_media(self, data: Dict):
+        if not self._simulate('search_media') or not self._authorized():
+            return
+
+        file_names = None
+        for criteria in data.get('filter', []):
+            if criteria.get('field') == 'fileName' and criteria.get('type') == 'equalsAny':
+                file_names = set(criteria.get('value') or [])
+
+        with self.server.state.lock:
+            media = [
+                dict(entry) for entry in self.server.state.media.values()
+                if entry.get('fileName') and (file_names is None or entry['fileName'] in file_names)
+            ]
+        self._send_json(200, {'total': len(media), 'data': media})
+
+    def _upload(self, media_id: str, query: str):
+        body = self._read_body()
+        if not self._simulate('media_upload') or not self._authorized():
+            return
+
+        params = dict(parse_qsl(query))
+        state = self.server.state
+        with state.lock:
+            media = state.media.get(media_id)
+            duplicate = any(
+                entry.get('fileName') == params.get('fileName') and entry['id'] != media_id
+                for entry in state.media.values()
+            )
+            if media is not None and not duplicate and body:
+                media.update({
+                    'fileName': params.get('fileName'),
+                    'fileExtension': params.get('extension'),
+                    'mimeType': self.headers.get('Content-Type'),
+                    'fileSize': len(body)
+                })
+
+        if media is None:
+            self._send_error(404, f'The media resource with the following primary key was not found: id({media_id})')
+        elif duplicate:
+            self._send_error(409, f'A file with the name "{params.get("fileName")}.{params.get("extension")}" already exists.')
+        elif not body:
+            self._send_error(400, 'Expected non-empty file body')
+        else:
+            self._send_json(204)
+
+    @staticmethod
+    def _validate(product: Dict) -> Optional[str]:
+        for field in ('productNumber', 'name'):
+            if not product.get(field):
+                return f'Das Feld "{field}" darf nicht leer sein.'
+        return None
+
+
+class MockShopwareServer(ThreadingHTTPServer):
+    """
+    Mock-Server mit konfigurierbarer Latenz, Fehlerquote und Ratenbegrenzung
+
+    Args:
+        latency: feste Antwortzeit je Anfrage in Sekunden
+        jitter: zusätzliche zufällige Antwortzeit bis zu diesem Wert
+        error_rate: Anteil der Anfragen, die mit HTTP 503 beantwortet werden
+        rate_limit: maximale Anfragen pro Sekunde, darüber HTTP 429 (0 = unbegrenzt)
+        token_ttl: Gültigkeit der Access Tokens in Sekunden
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: float = 0.0, token_ttl: int = 600):
+        super().__init__((host, port), MockShopwareHandler)
+        self.state = MockShopwareState()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.token_ttl = token_ttl
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.window_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def allow_request(self) -> bool:
+        """
+        Ratenbegrenzung in Fenstern von einer Sekunde
+        """
+        if not self.rate_limit:
+            return True
+
+        with self.window_lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            return self.window_count <= self.rate_limit
+
+    def start(self) -> 'MockShopwareServer':
+        """
+        Startet den Server in einem Hintergrund-Thread
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread:
+            self.thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler Mock der Shopware Admin API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help="Antwortzeit je Anfrage in Sekunden")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Zusätzliche zufällige Antwortzeit in Sekunden")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Anteil der Anfragen mit HTTP 503")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Maximale Anfragen pro Sekunde (0 = unbegrenzt)")
+    parser.add_argument('--token-ttl', type=int, default=600, help="Gültigkeit der Access Tokens in Sekunden")
+    args = parser.parse_args()
+
+    server = MockShopwareServer(args.host, args.port, args.latency, args.jitter,
+                                args.error_rate, args.rate_limit, args.token_ttl)
+    print(f"🧪 Mock Shopware API läuft auf {server.url}")
+    print("Drücken Sie Ctrl+C zum Beenden")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"📊 {json.dumps(server.state.stats())}")
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,176 @@
+import io
 import os
+import json
 import hashlib
 import logging
-from typing import Dict, List, Optional
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 try:
+    import numpy as np
     import pandas as pd
 except ImportError:
     print("❌ pandas nicht installiert. Installieren Sie es mit: pip install pandas")
     raise
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from sync_metrics import metrics, timed
+
+# Blockgröße beim Hashen der Datei (1 MB)
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Parse-Modi: default (pandas, ein Kern), processes (Byte-Bereiche im
+# Prozesspool), pyarrow (mehrere Threads), parallel (pyarrow falls installiert,
+# sonst processes)
+CSV_PARSE_MODES = ('default', 'processes', 'pyarrow', 'parallel')
+
+# Deklarierte Spaltentypen: pandas muss die Typen nicht aus der ganzen Datei
+# ableiten, und EANs bzw. Produktnummern bleiben Text (keine Floats, keine
+# verlorenen führenden Nullen). Zahlenspalten werden ebenfalls als Text gelesen,
+# damit eine ungültige Zahl nur ihre Zeile scheitern lässt (Prüfung im Mapping).
+# Nicht aufgeführte Spalten werden abgeleitet.
+CSV_COLUMN_DTYPES = {
+    'product_number': 'string',
+    'name': 'string',
+    'description': 'string',
+    'price': 'string',
+    'stock': 'string',
+    'weight': 'string',
+    'ean': 'string',
+    'active': 'string'
+}
+
+def _parse_csv_range(csv_file_path: str, start: int, end: int, columns: List[str],
+                     column_dtypes: Dict[str, str]) -> 'pd.DataFrame':
+    """
+    Liest einen Byte-Bereich (ganze Datensätze ohne Kopfzeile) im Worker-Prozess
+    """
+    with open(csv_file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=column_dtypes, skip_blank_lines=False)
+
+def _embedded_line_breaks(frame: 'pd.DataFrame') -> 'np.ndarray':
+    """
+    Anzahl der Zeilenumbrüche innerhalb der Werte je Datensatz (nur Textspalten)
+    """
+    counts = np.zeros(len(frame), dtype=np.int64)
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype == object or isinstance(values.dtype, pd.StringDtype):
+            counts += values.astype('string').str.count('\n').fillna(0).to_numpy(dtype=np.int64)
+    return counts
+
+def _arrow_type(dtype: str):
+    return {'string': pa.string(), 'float64': pa.float64(), 'Int64': pa.int64(), 'boolean': pa.bool_()}.get(dtype)
+
 class CSVProcessor:
     """
     Klasse für die Verarbeitung der CSV-Datei
     """
     
-    def __init__(self, csv_file_path: str):
+    def __init__(self, csv_file_path: str, row_state_file_path: Optional[str] = None,
+                 column_dtypes: Optional[Dict[str, str]] = None, fast_columns: Optional[List[str]] = None,
+                 parse_mode: str = 'default', parse_workers: int = 0, parse_block_size: int = 32 * 1024 * 1024):
         self.csv_file_path = csv_file_path
+        self.column_dtypes = CSV_COLUMN_DTYPES if column_dtypes is None else column_dtypes
         self.last_hash = None
+        self.last_stat = None
         self.logger = logging.getLogger(__name__)
         
+        # Fingerabdrücke je Produktnummer für die zeilenweise Änderungserkennung
+        self.row_state_file_path = row_state_file_path
+        self.row_snapshot = self._load_row_snapshot()
+        self.pending_row_snapshot = None
+        self.diff_counts = {'inserted': 0, 'modified': 0, 'fast': 0}
+        
+        # Spalten der Fast Lane (z.B. Bestand und Preis) erhalten einen eigenen
+        # Fingerabdruck, damit reine Bestands-/Preisänderungen erkennbar sind
+        self.fast_columns = list(fast_columns or [])
+        
+        # Parallele Verarbeitung sehr großer Dateien (siehe CSV_PARSE_MODES)
+        if parse_mode not in CSV_PARSE_MODES:
+            self.logger.warning(f"Unbekannter CSV-Parse-Modus '{parse_mode}' - verwende default")
+            parse_mode = 'default'
+        if parse_mode == 'parallel':
+            parse_mode = 'pyarrow' if PYARROW_AVAILABLE else 'processes'
+        if parse_mode == 'pyarrow' and not PYARROW_AVAILABLE:
+            self.logger.warning("pyarrow nicht installiert - verwende den Prozesspool zum Parsen")
+            parse_mode = 'processes'
+        self.parse_mode = parse_mode
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.parse_block_size = max(HASH_BLOCK_SIZE, parse_block_size)
+        
     def calculate_file_hash(self) -> Optional[str]:
         """
         Berechnet den Hash der CSV-Datei für Änderungserkennung
+        
+        Die Datei wird blockweise gelesen, damit auch große Dateien nicht
+        vollständig in den Speicher geladen werden.
         """
         try:
             if not os.path.exists(self.csv_file_path):
                 self.logger.warning(f"CSV-Datei nicht gefunden: {self.csv_file_path}")
                 return None
-                
+            
+            file_hash = hashlib.blake2b(digest_size=16)
             with open(self.csv_file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.md5(content).hexdigest()
+                for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                    file_hash.update(block)
+            return file_hash.hexdigest()
                 
         except Exception as e:
             self.logger.error(f"Fehler beim Berechnen des Datei-Hash: {e}")
             return None
     
+    def get_file_stat(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Gibt (Größe, Änderungszeit in ns, Inode) der Datei zurück
+        """
+        try:
+            stat = os.stat(self.csv_file_path)
+            return stat.st_size, stat.st_mtime_ns, stat.st_ino
+        except OSError:
+            return None
+    
+    def file_version(self) -> Optional[str]:
+        """
+        Kennung des Dateistands aus Größe, Änderungszeit und Inode (ohne die Datei zu lesen)
+        """
+        stat = self.get_file_stat()
+        return None if stat is None else ':'.join(str(value) for value in stat)
+    
     def has_file_changed(self) -> bool:
         """
         Prüft, ob sich die CSV-Datei geändert hat
+        
+        Zuerst werden nur Größe, Änderungszeit und Inode verglichen; der
+        Hash wird nur berechnet, wenn sich diese geändert haben.
         """
+        current_stat = self.get_file_stat()
+        
+        if current_stat is None:
+            self.logger.warning(f"CSV-Datei nicht gefunden: {self.csv_file_path}")
+            return False
+        
+        if self.last_hash is not None and current_stat == self.last_stat:
+            return False
+        
         current_hash = self.calculate_file_hash()
         
         if current_hash is None:
             return False
+        
+        self.last_stat = current_stat
             
         if self.last_hash is None:
             self.last_hash = current_hash
@@ -56,6 +182,7 @@ class CSVProcessor:
             
         return False
     
+    @timed('csv_parse')
     def read_csv_data(self) -> Optional[List[Dict]]:
         """
         Liest die CSV-Datei und gibt die Daten als Liste von Dictionaries zurück
@@ -65,13 +192,13 @@ class CSVProcessor:
                 self.logger.error(f"CSV-Datei nicht gefunden: {self.csv_file_path}")
                 return None
                 
-            df = pd.read_csv(self.csv_file_path)
+            df = pd.read_csv(self.csv_file_path, dtype=self.column_dtypes)
             
             # Leere Zeilen entfernen
             df = df.dropna(how='all')
             
-            # DataFrame zu Liste von Dictionaries konvertieren
-            data = df.to_dict('records')
+            # DataFrame zu Liste von Dictionaries konvertieren (fehlende Werte als None)
+            data = [row for _, row in self.frame_to_rows(df)]
             
             self.logger.info(f"CSV-Datei gelesen: {len(data)} Zeilen")
             return data
@@ -80,13 +207,174 @@ class CSVProcessor:
             self.logger.error(f"Fehler beim Lesen der CSV-Datei: {e}")
             return None
     
+    def iter_csv_frames(self, chunk_size: int = 10000) -> Iterator['pd.DataFrame']:
+        """
+        Liest die CSV-Datei blockweise, ohne sie vollständig in den Speicher zu laden
+        
+        Yields:
+            DataFrame-Blöcke mit höchstens chunk_size Zeilen; der Index enthält
+            die CSV-Zeilennummern (Zeile, in der der Datensatz beginnt; leere
+            Zeilen und Zeilenumbrüche in Anführungszeichen werden mitgezählt)
+        """
+        if not os.path.exists(self.csv_file_path):
+            self.logger.error(f"CSV-Datei nicht gefunden: {self.csv_file_path}")
+            return
+        
+        # Zeilennummern wie in der CSV-Datei (Zeile 1 ist die Kopfzeile)
+        next_row_number = 2
+        row_count = 0
+        
+        if self.parse_mode == 'processes':
+            reader = self._iter_process_frames()
+        elif self.parse_mode == 'pyarrow':
+            reader = self._iter_arrow_frames()
+        else:
+            reader = pd.read_csv(self.csv_file_path, dtype=self.column_dtypes, chunksize=chunk_size,
+                                 skip_blank_lines=False)
+        
+        for frame in metrics.timed_iter('csv_parse', reader):
+            # Parallel gelesene Bereiche können größer als chunk_size sein
+            for offset in range(0, len(frame), chunk_size):
+                chunk = frame.iloc[offset:offset + chunk_size]
+                # Datensätze mit Zeilenumbrüchen in Anführungszeichen belegen mehrere Zeilen
+                extra_lines = _embedded_line_breaks(chunk)
+                chunk.index = next_row_number + np.arange(len(chunk)) + np.cumsum(extra_lines) - extra_lines
+                next_row_number += len(chunk) + int(extra_lines.sum())
+                
+                # Leere Zeilen entfernen
+                chunk = chunk.dropna(how='all')
+                if chunk.empty:
+                    continue
+                
+                row_count += len(chunk)
+                yield chunk
+        
+        self.logger.info(f"CSV-Datei gelesen: {row_count} Zeilen")
+    
+    def _iter_process_frames(self) -> Iterator['pd.DataFrame']:
+        """
+        Parst die Datei in Byte-Bereichen parallel im Prozesspool
+        
+        Die Bereiche enden immer an einem Zeilenende außerhalb von Anführungszeichen
+        und werden in Dateireihenfolge zurückgegeben. Höchstens zwei Bereiche je
+        Worker sind gleichzeitig in Arbeit, damit der Speicherbedarf begrenzt bleibt.
+        """
+        columns = self.read_csv_header()
+        dtypes = {column: dtype for column, dtype in self.column_dtypes.items() if column in columns}
+        
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=context) as executor:
+            pending = deque()
+            for start, end in self._split_byte_ranges():
+                pending.append(executor.submit(_parse_csv_range, self.csv_file_path, start, end, columns, dtypes))
+                if len(pending) >= self.parse_workers * 2:
+                    yield pending.popleft().result()
+            
+            while pending:
+                yield pending.popleft().result()
+    
+    def _split_byte_ranges(self) -> Iterator[Tuple[int, int]]:
+        """
+        Teilt die Datensätze der Datei (ohne Kopfzeile) in Bereiche von etwa parse_block_size Bytes
+        
+        Ein Zeilenende zählt nur als Grenze, wenn davor eine gerade Anzahl
+        Anführungszeichen steht (sonst liegt es innerhalb eines Textfelds).
+        """
+        with open(self.csv_file_path, 'rb') as f:
+            f.readline()
+            start = f.tell()
+            position = start
+            target = start + self.parse_block_size
+            quotes = 0
+            
+            while True:
+                block = f.read(HASH_BLOCK_SIZE)
+                if not block:
+                    break
+                
+                index = 0
+                while position + len(block) > target:
+                    # Anführungszeichen bis zur Zielposition zählen, dann nächstes gültiges Zeilenende suchen
+                    search_from = max(index, target - position)
+                    quotes += block.count(b'"', index, search_from)
+                    index = search_from
+                    
+                    newline = block.find(b'\n', index)
+                    if newline == -1:
+                        break
+                    
+                    quotes += block.count(b'"', index, newline)
+                    index = newline + 1
+                    if quotes % 2 == 0:
+                        yield start, position + index
+                        start = position + index
+                        target = start + self.parse_block_size
+                    else:
+                        target = position + index
+                
+                quotes += block.count(b'"', index)
+                position += len(block)
+            
+            if position > start:
+                yield start, position
+    
+    def _iter_arrow_frames(self) -> Iterator['pd.DataFrame']:
+        """
+        Parst die Datei mit dem mehrfädigen CSV-Leser von pyarrow
+        
+        Der Streaming-Leser leitet Typen nur aus dem ersten Block ab und bricht
+        bei einem abweichenden Wert später ab. Nicht deklarierte Spalten werden
+        daher als Text gelesen; Zahlen prüft das Mapping je Zeile.
+        """
+        column_types = {column: pa.string() for column in self.read_csv_header()}
+        for column, dtype in self.column_dtypes.items():
+            if column in column_types and _arrow_type(dtype):
+                column_types[column] = _arrow_type(dtype)
+        reader = pa_csv.open_csv(
+            self.csv_file_path,
+            read_options=pa_csv.ReadOptions(use_threads=True, block_size=self.parse_block_size),
+            # Leere Zeilen behalten, damit die Zeilennummern stimmen
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True, ignore_empty_lines=False),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+        )
+        
+        for batch in reader:
+            frame = batch.to_pandas()
+            yield frame.astype({column: dtype for column, dtype in self.column_dtypes.items() if column in frame.columns})
+    
+    @staticmethod
+    def frame_to_rows(chunk: 'pd.DataFrame') -> List[Tuple[int, Dict]]:
+        """
+        Wandelt einen DataFrame-Block in Tupel (Zeilennummer, Zeile) mit Python-Typen um
+        
+        Fehlende Werte werden zu None statt NaN.
+        """
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        return list(zip(chunk.index, chunk.to_dict('records')))
+    
+    @staticmethod
+    def rows_to_frame(numbered_rows: List[Tuple[int, Dict]]) -> 'pd.DataFrame':
+        """
+        Wandelt Tupel (Zeilennummer, Zeile) zurück in einen DataFrame-Block
+        """
+        return pd.DataFrame(
+            [row for _, row in numbered_rows],
+            index=[row_number for row_number, _ in numbered_rows]
+        )
+    
+    def read_csv_header(self) -> List[str]:
+        """
+        Liest nur die Kopfzeile der CSV-Datei
+        """
+        return list(pd.read_csv(self.csv_file_path, nrows=0).columns)
+    
     def validate_csv_structure(self, required_columns: List[str]) -> bool:
         """
-        Validiert die Struktur der CSV-Datei
+        Validiert die Struktur der CSV-Datei (liest nur die Kopfzeile)
         """
         try:
-            df = pd.read_csv(self.csv_file_path)
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            columns = self.read_csv_header()
+            missing_columns = [col for col in required_columns if col not in columns]
             
             if missing_columns:
                 self.logger.error(f"Fehlende Spalten in CSV: {missing_columns}")
@@ -110,3 +398,202 @@ class CSVProcessor:
         except Exception as e:
             self.logger.error(f"Fehler beim Abrufen der Änderungszeit: {e}")
             return None
+
+    
+    @staticmethod
+    def row_fingerprint(row: Dict) -> str:
+        """
+        Berechnet einen Fingerabdruck über alle Werte einer CSV-Zeile
+        """
+        serialized = json.dumps(row, sort_keys=True, default=str)
+        return hashlib.blake2b(serialized.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _row_fingerprint(self, row: Dict) -> str:
+        """
+        Fingerabdruck für den Snapshot: mit Fast-Lane-Spalten "Inhalt:Fast Lane"
+        """
+        if not self.fast_columns:
+            return self.row_fingerprint(row)
+        
+        content = {column: value for column, value in row.items() if column not in self.fast_columns}
+        fast = {column: row.get(column) for column in self.fast_columns}
+        return f"{self.row_fingerprint(content)}:{self.row_fingerprint(fast)}"
+    
+    def diff_rows(self, numbered_rows: Iterable[Tuple[int, Dict]]) -> Dict[str, List]:
+        """
+        Vergleicht die CSV-Zeilen mit dem letzten Snapshot
+        
+        Args:
+            numbered_rows: Tupel (CSV-Zeilennummer, CSV-Zeile)
+            
+        Returns:
+            Dictionary mit 'inserted', 'modified' und 'fast' (Listen von Tupeln
+            wie in numbered_rows) sowie 'deleted' (Liste entfernter Produktnummern)
+        """
+        changes = {'inserted': [], 'modified': [], 'fast': [], 'deleted': []}
+        
+        self.begin_row_diff()
+        self._diff_row_chunk(numbered_rows, changes)
+        changes['deleted'] = self.finish_row_diff()
+        
+        return changes
+    
+    def begin_row_diff(self):
+        """
+        Startet einen blockweisen Zeilenvergleich (siehe diff_row_chunk)
+        """
+        self.pending_row_snapshot = {}
+        self.diff_counts = {'inserted': 0, 'modified': 0, 'fast': 0}
+    
+    def diff_row_chunk(self, numbered_rows: Iterable[Tuple[int, Dict]]) -> List[Tuple[int, Dict]]:
+        """
+        Gibt die neuen und geänderten Zeilen eines Blocks in Dateireihenfolge zurück
+        """
+        changes = self.classify_row_chunk(numbered_rows)
+        return sorted(changes['inserted'] + changes['modified'] + changes['fast'], key=lambda item: item[0])
+    
+    def classify_row_chunk(self, numbered_rows: Iterable[Tuple[int, Dict]]) -> Dict[str, List]:
+        """
+        Ordnet die Zeilen eines Blocks den Listen 'inserted', 'modified' und
+        'fast' (nur Fast-Lane-Spalten geändert) zu
+        """
+        changes = {'inserted': [], 'modified': [], 'fast': []}
+        self._diff_row_chunk(numbered_rows, changes)
+        return changes
+    
+    def defer_row_changes(self, product_numbers: Iterable[str]):
+        """
+        Verschiebt Inhaltsänderungen auf den nächsten Lauf
+        
+        Die Produkte behalten im neuen Snapshot den alten Inhalts-Fingerabdruck
+        (neue Produkte fehlen darin), die Fast-Lane-Spalten gelten als übertragen.
+        """
+        for product_number in product_numbers:
+            product_number = str(product_number)
+            previous = self.row_snapshot.get(product_number)
+            current = self.pending_row_snapshot.get(product_number)
+            
+            if previous is None or current is None:
+                self.pending_row_snapshot.pop(product_number, None)
+            else:
+                self.pending_row_snapshot[product_number] = f"{previous.split(':')[0]}:{current.split(':')[-1]}"
+    
+    def finish_row_diff(self) -> List[str]:
+        """
+        Beendet den blockweisen Zeilenvergleich
+        
+        Returns:
+            Produktnummern, die im Snapshot, aber nicht mehr in der CSV-Datei stehen
+        """
+        deleted = [number for number in self.row_snapshot if number not in self.pending_row_snapshot]
+        
+        self.logger.info(
+            f"Zeilenvergleich: {self.diff_counts['inserted']} neu, {self.diff_counts['modified']} geändert, "
+            f"{self.diff_counts['fast']} nur Bestand/Preis geändert, {len(deleted)} entfernt"
+            if self.fast_columns else
+            f"Zeilenvergleich: {self.diff_counts['inserted']} neu, {self.diff_counts['modified']} geändert, "
+            f"{len(deleted)} entfernt"
+        )
+        return deleted
+    
+    def _diff_row_chunk(self, numbered_rows: Iterable[Tuple[int, Dict]], changes: Dict[str, List]):
+        """
+        Ordnet die Zeilen eines Blocks den Listen 'inserted', 'modified' und 'fast' zu
+        """
+        for row_number, row in numbered_rows:
+            product_number = row.get('product_number')
+            if not product_number or product_number != product_number:
+                # Zeilen ohne Produktnummer weiterreichen, damit der Fehler sichtbar wird
+                changes['inserted'].append((row_number, row))
+                self.diff_counts['inserted'] += 1
+                continue
+            
+            product_number = str(product_number)
+            fingerprint = self._row_fingerprint(row)
+            self.pending_row_snapshot[product_number] = fingerprint
+            
+            previous = self.row_snapshot.get(product_number)
+            if previous is None:
+                changes['inserted'].append((row_number, row))
+                self.diff_counts['inserted'] += 1
+            elif previous == fingerprint:
+                continue
+            elif self.fast_columns and previous.split(':')[0] == fingerprint.split(':')[0]:
+                changes['fast'].append((row_number, row))
+                self.diff_counts['fast'] += 1
+            else:
+                changes['modified'].append((row_number, row))
+                self.diff_counts['modified'] += 1
+    
+    def commit_row_snapshot(self, failed_product_numbers: Iterable[str] = (),
+                            forgotten_product_numbers: Iterable[str] = ()) -> bool:
+        """
+        Übernimmt den Snapshot des letzten diff_rows-Aufrufs und speichert ihn
+        
+        Fehlgeschlagene Produkte behalten ihren alten Stand, damit sie beim
+        nächsten Lauf erneut als geändert erkannt werden. Vergessene Produkte
+        werden entfernt und beim nächsten Lauf vollständig übertragen.
+        """
+        if self.pending_row_snapshot is None:
+            return False
+        
+        snapshot = self.pending_row_snapshot
+        for product_number in forgotten_product_numbers:
+            snapshot.pop(str(product_number), None)
+        for product_number in failed_product_numbers:
+            product_number = str(product_number)
+            if product_number in self.row_snapshot:
+                snapshot[product_number] = self.row_snapshot[product_number]
+            else:
+                snapshot.pop(product_number, None)
+        
+        self.row_snapshot = snapshot
+        self.pending_row_snapshot = None
+        return self._save_row_snapshot()
+    
+    def _load_row_snapshot(self) -> Dict[str, str]:
+        """
+        Lädt den Zeilen-Snapshot aus der Zustandsdatei
+        """
+        if not self.row_state_file_path or not os.path.exists(self.row_state_file_path):
+            return {}
+        
+        try:
+            with open(self.row_state_file_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            
+            # Snapshot gehört zu einer anderen CSV-Datei
+            if state.get('csv_file') != os.path.abspath(self.csv_file_path):
+                return {}
+            
+            return state.get('rows', {})
+            
+        except (OSError, ValueError, AttributeError) as e:
+            self.logger.warning(f"Zeilen-Snapshot konnte nicht geladen werden: {e}")
+            return {}
+    
+    def _save_row_snapshot(self) -> bool:
+        """
+        Speichert den Zeilen-Snapshot atomar in der Zustandsdatei
+        """
+        if not self.row_state_file_path:
+            return False
+        
+        try:
+            directory = os.path.dirname(self.row_state_file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            state = {
+                'csv_file': os.path.abspath(self.csv_file_path),
+                'rows': self.row_snapshot
+            }
+            temp_path = f"{self.row_state_file_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.row_state_file_path)
+            return True
+            
+        except OSError as e:
+            self.logger.error(f"Zeilen-Snapshot konnte nicht gespeichert werden: {e}")
+            return False
@@ -0,0 +1,80 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+class DeadLetterFile:
+    """
+    JSON-Lines-Datei mit endgültig fehlgeschlagenen CSV-Zeilen zum späteren erneuten Senden
+    """
+
+    def __init__(self, file_path: Optional[str]):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def append(self, numbered_rows: List[Tuple[int, Dict]], errors: Dict[int, str]) -> int:
+        """
+        Hängt die fehlgeschlagenen Zeilen eines Blocks an die Datei an
+
+        Returns:
+            Anzahl geschriebener Einträge
+        """
+        if not self.file_path or not errors:
+            return 0
+
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        lines = [
+            json.dumps({
+                'row_number': int(row_number),
+                'error': errors[row_number],
+                'failed_at': timestamp,
+                'row': row
+            }, default=str, ensure_ascii=False)
+            for row_number, row in numbered_rows
+            if row_number in errors
+        ]
+
+        try:
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            with self.lock, open(self.file_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            return len(lines)
+
+        except OSError as e:
+            self.logger.error(f"Dead-Letter-Datei konnte nicht geschrieben werden: {e}")
+            return 0
+
+    def take(self) -> List[Tuple[int, Dict]]:
+        """
+        Liest alle Einträge und leert die Datei (erneut fehlschlagende Zeilen werden neu angehängt)
+
+        Returns:
+            Liste von Tupeln (CSV-Zeilennummer, CSV-Zeile)
+        """
+        if not self.file_path or not os.path.exists(self.file_path):
+            return []
+
+        with self.lock:
+            processing_path = f"{self.file_path}.processing"
+            os.replace(self.file_path, processing_path)
+
+            entries = []
+            with open(processing_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                        entries.append((entry['row_number'], entry['row']))
+                    except (ValueError, KeyError) as e:
+                        self.logger.warning(f"Ungültiger Eintrag in Dead-Letter-Datei übersprungen: {e}")
+
+            os.remove(processing_path)
+
+        return entries
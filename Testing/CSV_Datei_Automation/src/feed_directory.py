@@ -0,0 +1,303 @@
+import os
+import glob
+import time
+import fnmatch
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+try:
+    from decouple import config
+except ImportError:
+    print("⚠️ python-decouple nicht verfügbar. Verwende Umgebungsvariablen.")
+    def config(key, default=None):
+        return os.getenv(key, default)
+
+from shopware_api import ShopwareAPI
+from sync_manager import (
+    WATCHDOG_AVAILABLE, CSVFileHandler, FileSystemEventHandler, ProductSyncManager, feed_name_from_path
+)
+from sync_metrics import metrics, start_metrics_server
+
+if WATCHDOG_AVAILABLE:
+    from watchdog.observers import Observer
+
+class FeedDirectoryHandler(FileSystemEventHandler):
+    """
+    Leitet Dateiereignisse im Feed-Verzeichnis an den Handler der jeweiligen Datei weiter
+    """
+
+    def __init__(self, feed_sync: 'FeedDirectorySync'):
+        super().__init__()
+        self.feed_sync = feed_sync
+
+    def on_modified(self, event):
+        self._handle_event(event, event.src_path)
+
+    def on_created(self, event):
+        self._handle_event(event, event.src_path)
+
+    def on_moved(self, event):
+        self._handle_event(event, event.dest_path)
+
+    def _handle_event(self, event, path: str):
+        if not event.is_directory and self.feed_sync.matches(path):
+            self.feed_sync.handler_for(path).schedule_sync()
+
+class FeedDirectorySync:
+    """
+    Synchronisiert alle CSV-Dateien eines Verzeichnisses (z.B. eine Datei je Lieferant)
+
+    Alle Feeds teilen sich eine Shopware-Verbindung (Token, Verbindungspool,
+    Ratenbegrenzung, Produkt-ID-Cache). Geänderte Dateien werden in eine
+    gemeinsame Warteschlange gestellt; bis zu FEED_CONCURRENCY Dateien werden
+    gleichzeitig synchronisiert, dieselbe Datei nie parallel.
+    """
+
+    def __init__(self):
+        self.feed_directory = os.path.abspath(config('FEED_DIRECTORY'))
+        self.feed_pattern = config('FEED_PATTERN', '*.csv')
+        self.feed_concurrency = max(1, int(config('FEED_CONCURRENCY', 2)))
+        self.check_interval = int(config('CHECK_INTERVAL', 60))
+        if config('FAST_LANE', 'false').lower() == 'true':
+            self.check_interval = int(config('FAST_SYNC_INTERVAL', 30))
+        self.debounce_seconds = float(config('WATCH_DEBOUNCE_SECONDS', 2))
+        self.stable_seconds = float(config('WATCH_STABLE_SECONDS', 0.5))
+        self.metrics_file = config('METRICS_FILE', default='') or None
+        self.metrics_port = int(config('METRICS_PORT', 0))
+        self.metrics_host = config('METRICS_HOST', '127.0.0.1')
+
+        # Jeder Feed nutzt bis zu SYNC_CONCURRENCY Verbindungen
+        sync_concurrency = max(1, int(config('SYNC_CONCURRENCY', 1)))
+        self.shopware_api = ShopwareAPI(pool_size=sync_concurrency * self.feed_concurrency)
+
+        self.managers: Dict[str, ProductSyncManager] = {}
+        self.handlers: Dict[str, CSVFileHandler] = {}
+        self.lock = threading.Lock()
+        self.executor = None
+
+        ProductSyncManager.setup_logging()
+        self.logger = logging.getLogger(__name__)
+
+    def feed_paths(self) -> List[str]:
+        """
+        Alle Feed-Dateien des Verzeichnisses, sortiert nach Namen
+        """
+        return sorted(
+            path for path in glob.glob(os.path.join(self.feed_directory, self.feed_pattern))
+            if os.path.isfile(path)
+        )
+
+    def matches(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        return (
+            os.path.dirname(path) == self.feed_directory
+            and fnmatch.fnmatch(os.path.basename(path), self.feed_pattern)
+        )
+
+    def manager_for(self, path: str) -> ProductSyncManager:
+        """
+        Synchronisation der Datei (wird beim ersten Zugriff angelegt)
+        """
+        path = os.path.abspath(path)
+        with self.lock:
+            manager = self.managers.get(path)
+            if manager is None:
+                manager = ProductSyncManager(path, self.shopware_api, feed_name_from_path(path))
+                self.managers[path] = manager
+            return manager
+
+    def handler_for(self, path: str) -> CSVFileHandler:
+        """
+        Handler der Datei, der Änderungen in die gemeinsame Warteschlange stellt
+        """
+        path = os.path.abspath(path)
+        manager = self.manager_for(path)
+        with self.lock:
+            handler = self.handlers.get(path)
+            if handler is None:
+                handler = CSVFileHandler(path, manager, self.debounce_seconds, self.stable_seconds, self.executor)
+                self.handlers[path] = handler
+            return handler
+
+    def validate_setup(self) -> bool:
+        """
+        Prüft Verzeichnis, Feed-Dateien und die Shopware-Verbindung
+        """
+        if not os.path.isdir(self.feed_directory):
+            self.logger.error(f"Feed-Verzeichnis nicht gefunden: {self.feed_directory}")
+            return False
+
+        paths = self.feed_paths()
+        self.logger.info(f"{len(paths)} Feed-Dateien in {self.feed_directory} ({self.feed_pattern})")
+
+        for path in paths:
+            manager = self.manager_for(path)
+            if not manager.csv_processor.validate_csv_structure(manager.required_columns):
+                self.logger.error(f"Ungültige Feed-Datei: {path}")
+                return False
+
+        if not self.shopware_api.authenticate():
+            self.logger.error("Shopware API Authentifizierung fehlgeschlagen")
+            return False
+
+        self.logger.info("Setup-Validierung erfolgreich")
+        return True
+
+    def sync_all(self, resume: bool = False) -> bool:
+        """
+        Synchronisiert alle Feed-Dateien, bis zu FEED_CONCURRENCY gleichzeitig
+        """
+        managers = [self.manager_for(path) for path in self.feed_paths()]
+        if not managers:
+            self.logger.warning("Keine Feed-Dateien gefunden")
+            return True
+
+        metrics.reset()
+        with ThreadPoolExecutor(max_workers=self.feed_concurrency) as executor:
+            results = list(executor.map(lambda manager: manager.sync_products(resume=resume), managers))
+        self.record_metrics()
+
+        failed = [manager.feed_name for manager, success in zip(managers, results) if not success]
+        if failed:
+            self.logger.error(f"Synchronisation fehlgeschlagen für: {', '.join(failed)}")
+        return not failed
+
+    def record_metrics(self):
+        metrics.finish()
+        self.logger.info(metrics.summary())
+        if self.metrics_file:
+            metrics.write_json(self.metrics_file)
+
+    def run_once(self) -> bool:
+        """
+        Führt eine einmalige Synchronisation aller Feeds durch
+        """
+        self.logger.info("Führe einmalige Synchronisation aller Feeds durch...")
+
+        if not self.validate_setup():
+            return False
+
+        try:
+            return self.sync_all()
+        finally:
+            self.shopware_api.close()
+
+    def run_resume(self) -> bool:
+        """
+        Setzt unterbrochene Synchronisationen aller Feeds fort
+        """
+        self.logger.info("Setze Synchronisation aller Feeds fort...")
+
+        if not self.validate_setup():
+            return False
+
+        try:
+            return self.sync_all(resume=True)
+        finally:
+            self.shopware_api.close()
+
+    def run_replay(self) -> bool:
+        """
+        Sendet die Dead-Letter-Zeilen aller Feeds erneut
+        """
+        if not self.shopware_api.authenticate():
+            self.logger.error("Shopware API Authentifizierung fehlgeschlagen")
+            return False
+
+        try:
+            results = [self.manager_for(path).replay_dead_letters() for path in self.feed_paths()]
+            return all(results)
+        finally:
+            self.shopware_api.close()
+
+    def run_continuous(self, mode='watcher'):
+        """
+        Startet die kontinuierliche Synchronisation aller Feeds
+
+        Args:
+            mode: 'watcher' für Dateiüberwachung oder 'interval' für intervallbasierte Prüfung
+        """
+        if mode not in ('watcher', 'interval'):
+            self.logger.error(f"Unbekannter Modus: {mode}")
+            return
+
+        if mode == 'watcher' and not WATCHDOG_AVAILABLE:
+            self.logger.error("Watchdog ist nicht verfügbar. Verwenden Sie stattdessen den interval-Modus.")
+            return
+
+        if not self.validate_setup():
+            return
+
+        if self.metrics_port:
+            start_metrics_server(self.metrics_port, self.metrics_host)
+
+        metrics.reset()
+        self.executor = ThreadPoolExecutor(max_workers=self.feed_concurrency, thread_name_prefix='feed')
+
+        try:
+            if mode == 'watcher':
+                self.start_directory_watcher()
+            else:
+                self.start_interval_sync()
+        finally:
+            for handler in list(self.handlers.values()):
+                handler.stop()
+            self.executor.shutdown(wait=True)
+            self.shopware_api.close()
+
+    def start_directory_watcher(self):
+        """
+        Überwacht das Feed-Verzeichnis (erfordert watchdog)
+        """
+        self.logger.info(f"Starte Verzeichnisüberwachung: {self.feed_directory}")
+
+        # Initiale Synchronisation aller vorhandenen Feeds
+        for path in self.feed_paths():
+            self.handler_for(path).schedule_sync()
+
+        observer = Observer()
+        observer.schedule(FeedDirectoryHandler(self), self.feed_directory, recursive=False)
+        observer.start()
+
+        try:
+            while True:
+                time.sleep(1)
+
+                # Von der Fast Lane verschobene Inhaltsänderungen nachziehen
+                for path, manager in list(self.managers.items()):
+                    handler = self.handler_for(path)
+                    if manager.full_sync_due() and not (handler.sync_pending or handler.sync_running):
+                        handler.schedule_sync()
+        except KeyboardInterrupt:
+            self.logger.info("Verzeichnisüberwachung wird beendet...")
+        finally:
+            observer.stop()
+            observer.join()
+
+    def start_interval_sync(self):
+        """
+        Prüft das Feed-Verzeichnis in festen Abständen auf neue und geänderte Dateien
+        """
+        self.logger.info(f"Starte intervallbasierte Synchronisation aller Feeds (alle {self.check_interval} Sekunden)...")
+
+        try:
+            while True:
+                for path in self.feed_paths():
+                    manager = self.manager_for(path)
+                    if manager.csv_processor.has_file_changed() or manager.full_sync_due():
+                        self.handler_for(path).schedule_sync()
+
+                time.sleep(self.check_interval)
+
+        except KeyboardInterrupt:
+            self.logger.info("Intervall-Synchronisation wird beendet...")
+
+def create_sync_manager():
+    """
+    Verzeichnismodus, wenn FEED_DIRECTORY gesetzt ist, sonst Synchronisation von CSV_FILE_PATH
+    """
+    if config('FEED_DIRECTORY', default=''):
+        return FeedDirectorySync()
+    return ProductSyncManager()
@@ -0,0 +1,319 @@
+import os
+import json
+import math
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    print("❌ pandas nicht installiert. Installieren Sie es mit: pip install pandas")
+    raise
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+# Markiert Felder, die in den Produktdaten weggelassen werden
+OMIT = object()
+
+FIELD_TYPES = ('string', 'int', 'float', 'bool')
+
+# Ganzzahlige Felder (z.B. Bestand) müssen in Shopwares 64-Bit-Ganzzahlen passen
+INT_LIMIT = 2 ** 63
+
+# Fehlermeldung je Typ bei ungültigen Werten
+INVALID_VALUE_MESSAGES = {
+    'int': 'keine ganze Zahl',
+    'float': 'keine gültige Zahl'
+}
+FIELD_OPTIONS = {
+    'column', 'type', 'default', 'value', 'required', 'omit_empty', 'compute',
+    'tax_rate', 'tax_rate_column', 'currency_id', 'currency_id_column', 'linked'
+}
+
+class MappingError(ValueError):
+    """
+    Ungültige Mapping-Konfiguration
+    """
+
+
+def load_mapping(file_path: str) -> Dict:
+    """
+    Lädt eine Mapping-Konfiguration aus einer JSON- oder YAML-Datei
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if os.path.splitext(file_path)[1].lower() in ('.yaml', '.yml'):
+            if not YAML_AVAILABLE:
+                raise MappingError("PyYAML nicht installiert. Installieren Sie es mit: pip install pyyaml")
+            mapping = yaml.safe_load(f)
+        else:
+            mapping = json.load(f)
+
+    if not isinstance(mapping, dict) or not isinstance(mapping.get('fields'), dict):
+        raise MappingError(f"Mapping-Datei {file_path} enthält keinen Abschnitt 'fields'")
+    return mapping
+
+
+class CompiledField:
+    """
+    Ein Shopware-Feld mit vorbereiteten Umwandlungen für einzelne Zeilen und ganze Blöcke
+    """
+
+    def __init__(self, target: str, spec: Dict):
+        unknown = set(spec) - FIELD_OPTIONS
+        if unknown:
+            raise MappingError(f"Feld '{target}': unbekannte Optionen {sorted(unknown)}")
+
+        self.target = target
+        self.column = spec.get('column')
+        self.field_type = spec.get('type', 'string')
+        self.default = spec.get('default')
+        self.required = bool(spec.get('required', False))
+        self.omit_empty = bool(spec.get('omit_empty', False))
+        self.compute = spec.get('compute')
+
+        if self.field_type not in FIELD_TYPES:
+            raise MappingError(f"Feld '{target}': unbekannter Typ '{self.field_type}' (erlaubt: {FIELD_TYPES})")
+        if self.compute not in (None, 'price'):
+            raise MappingError(f"Feld '{target}': unbekannte Berechnung '{self.compute}'")
+        if 'value' not in spec and not self.column:
+            raise MappingError(f"Feld '{target}': 'column' oder 'value' erforderlich")
+
+        if 'value' in spec:
+            value = spec['value']
+            self.convert_row = lambda row: value
+            self.convert_frame = lambda frame: ([value] * len(frame), {})
+        elif self.compute == 'price':
+            self._compile_price(spec)
+        else:
+            self.convert_row = self._convert_row
+            self.convert_frame = self._convert_frame
+
+    # --- Einzelne Zeilen ---
+
+    def _convert_row(self, csv_row: Dict) -> Any:
+        value = self._scalar(csv_row.get(self.column), self.field_type)
+        if value is None:
+            value = self.default
+        if value is None and self.required:
+            raise ValueError(self._missing_message())
+        if self.omit_empty and not value:
+            return OMIT
+        return value
+
+    def _scalar(self, value: Any, field_type: str) -> Any:
+        if value is None or value is pd.NA or value != value or value == '':
+            return None
+        if field_type == 'bool':
+            return str(value).lower() == 'true'
+        if field_type == 'string':
+            return str(value)
+
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = math.nan
+        if not math.isfinite(number) or (
+            field_type == 'int' and (not number.is_integer() or abs(number) >= INT_LIMIT)
+        ):
+            raise ValueError(self._invalid_message(self.column, value, field_type))
+        return int(number) if field_type == 'int' else number
+
+    # --- Ganze Blöcke ---
+
+    def _convert_frame(self, frame: 'pd.DataFrame') -> Tuple[List, Dict[int, str]]:
+        values, errors = self._series(frame, self.column, self.field_type)
+
+        if self.default is not None:
+            values = values.fillna(self.default)
+        if self.required:
+            for row_number in frame.index[values.isna().to_numpy()]:
+                errors.setdefault(row_number, self._missing_message())
+
+        if self.field_type == 'int':
+            values = values.astype('Int64')
+        if self.omit_empty:
+            return [value if value else OMIT for value in _to_python(values)], errors
+        return _to_python(values), errors
+
+    def _series(self, frame: 'pd.DataFrame', column: str, field_type: str) -> Tuple['pd.Series', Dict[int, str]]:
+        """
+        Gibt eine Spalte im Zieltyp zurück; ungültige Zahlen werden als Fehler je Zeile gemeldet
+        """
+        errors = {}
+
+        if column not in frame.columns:
+            dtype = object if field_type in ('string', 'bool') else float
+            return pd.Series(np.nan, index=frame.index, dtype=dtype), errors
+
+        raw = frame[column]
+        if raw.dtype == bool:
+            raw = raw.map({True: 'true', False: 'false'})
+
+        if field_type == 'string':
+            values = raw.astype('string')
+            return values.mask(values.str.len() == 0), errors
+
+        if field_type == 'bool':
+            text = raw.astype('string').str.lower()
+            return text.eq('true').astype(object).where(text.notna() & (text.str.len() > 0)), errors
+
+        values = pd.to_numeric(raw, errors='coerce').astype(float)
+        if not pd.api.types.is_numeric_dtype(raw):
+            # Nur Texte können ungültige Zahlen enthalten
+            suspicious = raw[(values.isna() & raw.notna()).to_numpy()]
+            for row_number, value in suspicious[suspicious.astype(str).str.len() > 0].items():
+                errors[row_number] = self._invalid_message(column, value, field_type)
+
+        # Unendliche Werte sowie Nachkommastellen und Überläufe bei Ganzzahlen ablehnen
+        invalid = values.notna() & ~np.isfinite(values)
+        if field_type == 'int':
+            invalid |= values.notna() & ((values != np.trunc(values)) | (values.abs() >= INT_LIMIT))
+        if invalid.any():
+            for row_number, value in raw[invalid.to_numpy()].items():
+                errors[row_number] = self._invalid_message(column, value, field_type)
+            values = values.mask(invalid)
+        return values, errors
+
+    # --- Berechnete Felder ---
+
+    def _compile_price(self, spec: Dict):
+        """
+        Preisfeld: Brutto aus der Spalte, Netto über den (ggf. zeilenweisen) Steuersatz in Prozent
+        """
+        self.field_type = 'float'
+        tax_rate = float(spec.get('tax_rate', 19))
+        tax_rate_column = spec.get('tax_rate_column')
+        currency_id = spec.get('currency_id')
+        currency_id_column = spec.get('currency_id_column')
+        linked = bool(spec.get('linked', True))
+
+        if not currency_id:
+            raise MappingError(f"Feld '{self.target}': 'currency_id' erforderlich")
+
+        def convert_row(csv_row: Dict) -> Any:
+            gross = self._convert_row(csv_row)
+            if gross is None or gross is OMIT:
+                return gross
+            row_tax_rate = self._scalar(csv_row.get(tax_rate_column), 'float') if tax_rate_column else None
+            row_currency_id = csv_row.get(currency_id_column) if currency_id_column else None
+            return [{
+                "currencyId": row_currency_id or currency_id,
+                "gross": gross,
+                "net": gross / (1 + (tax_rate if row_tax_rate is None else row_tax_rate) / 100),
+                "linked": linked
+            }]
+
+        def convert_frame(frame: 'pd.DataFrame') -> Tuple[List, Dict[int, str]]:
+            gross, errors = self._series(frame, self.column, 'float')
+            if self.default is not None:
+                gross = gross.fillna(float(self.default))
+            if self.required:
+                for row_number in frame.index[gross.isna().to_numpy()]:
+                    errors.setdefault(row_number, self._missing_message())
+
+            # Nettopreise spaltenweise berechnen
+            rates, _ = self._series(frame, tax_rate_column or '', 'float')
+            net = gross.to_numpy(dtype=float) / (1 + rates.fillna(tax_rate).to_numpy(dtype=float) / 100)
+            currencies, _ = self._series(frame, currency_id_column or '', 'string')
+
+            prices = [
+                None if gross_price != gross_price else
+                [{"currencyId": currency, "gross": gross_price, "net": net_price, "linked": linked}]
+                for gross_price, net_price, currency in zip(
+                    gross.tolist(), net.tolist(), currencies.fillna(currency_id).tolist()
+                )
+            ]
+            return prices, errors
+
+        self.convert_row = convert_row
+        self.convert_frame = convert_frame
+
+    def _invalid_message(self, column: str, value: Any, field_type: str) -> str:
+        return f"Feld '{self.target}' (Spalte {column}): '{value}' ist {INVALID_VALUE_MESSAGES[field_type]}"
+
+    def _missing_message(self) -> str:
+        return f"Pflichtfeld '{self.target}' fehlt (Spalte {self.column})"
+
+
+class CompiledMapping:
+    """
+    Einmalig kompiliertes CSV -> Shopware Mapping
+    """
+
+    def __init__(self, mapping: Dict):
+        fields = mapping.get('fields') or {}
+        if not fields:
+            raise MappingError("Mapping enthält keine Felder")
+
+        self.fields = [CompiledField(target, spec or {}) for target, spec in fields.items()]
+        self.targets = [field.target for field in self.fields]
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def required_columns(self) -> List[str]:
+        """
+        Spalten, die für Pflichtfelder in der CSV-Datei vorhanden sein müssen
+        """
+        return [field.column for field in self.fields if field.required and field.column]
+
+    @property
+    def column_dtypes(self) -> Dict[str, str]:
+        """
+        Spalten, die als Text eingelesen werden sollen (z.B. EANs)
+        """
+        return {
+            field.column: 'string'
+            for field in self.fields
+            if field.column and field.field_type == 'string' and field.compute is None
+        }
+
+    def transform_row(self, csv_row: Dict) -> Dict:
+        """
+        Wendet das Mapping auf eine Zeile an
+
+        Raises:
+            ValueError: wenn ein Pflichtfeld fehlt oder ein Wert ungültig ist
+        """
+        product_data = {}
+        for field in self.fields:
+            value = field.convert_row(csv_row)
+            if value is not OMIT:
+                product_data[field.target] = value
+        return product_data
+
+    def transform_frame(self, frame: 'pd.DataFrame') -> Tuple[List[Tuple[int, Dict]], Dict[int, str]]:
+        """
+        Wendet das Mapping spaltenweise auf einen DataFrame-Block an
+
+        Returns:
+            Tuple (Liste von Tupeln (CSV-Zeilennummer, Produktdaten), Fehler je CSV-Zeilennummer)
+        """
+        errors = {}
+        columns = []
+        for field in self.fields:
+            values, field_errors = field.convert_frame(frame)
+            for row_number, message in field_errors.items():
+                errors.setdefault(row_number, message)
+            columns.append(values)
+
+        # Zeilen mit Fehlern überspringen, leere optionale Felder weglassen
+        payloads = []
+        for row_number, values in zip(frame.index.tolist(), zip(*columns)):
+            if row_number in errors:
+                continue
+            payloads.append((row_number, {
+                target: value for target, value in zip(self.targets, values) if value is not OMIT
+            }))
+        return payloads, errors
+
+
+def _to_python(values: 'pd.Series') -> List:
+    """
+    Wandelt eine Spalte in eine Liste mit None für fehlende Werte um
+    """
+    return values.to_numpy(dtype=object, na_value=None).tolist()
@@ -0,0 +1,140 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+class ProductIdCache:
+    """
+    In-Memory-Index Produktnummer -> Shopware-Produkt-ID mit optionaler Speicherung auf der Festplatte
+
+    Zusätzlich werden für den laufenden Lauf die Nummern vermerkt, die es in
+    Shopware noch nicht gibt, damit neue Produkte nicht einzeln nachgeschlagen werden.
+    """
+
+    def __init__(self, cache_file_path: Optional[str] = None):
+        self.cache_file_path = cache_file_path
+        self.ids: Dict[str, str] = {}
+        self.known_missing: Set[str] = set()
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        if self.cache_file_path:
+            self.load()
+
+    def get(self, product_number: str) -> Optional[str]:
+        with self.lock:
+            return self.ids.get(str(product_number))
+
+    def get_many(self, product_numbers: Iterable[str]) -> Dict[str, str]:
+        """
+        Gibt die bekannten IDs zurück (unbekannte Nummern fehlen im Ergebnis)
+        """
+        with self.lock:
+            return {number: self.ids[str(number)] for number in product_numbers if str(number) in self.ids}
+
+    def missing(self, product_numbers: Iterable[str]) -> List[str]:
+        """
+        Gibt die Produktnummern zurück, für die noch keine ID bekannt ist (ohne bekannt fehlende)
+        """
+        with self.lock:
+            return [
+                number for number in dict.fromkeys(product_numbers)
+                if str(number) not in self.ids and str(number) not in self.known_missing
+            ]
+
+    def is_missing(self, product_number: str) -> bool:
+        """
+        Prüft, ob das Produkt in diesem Lauf bereits vergeblich gesucht wurde
+        """
+        with self.lock:
+            return str(product_number) in self.known_missing
+
+    def mark_missing(self, product_numbers: Iterable[str]):
+        """
+        Vermerkt gesuchte, aber in Shopware nicht gefundene Produktnummern
+        """
+        with self.lock:
+            self.known_missing.update(str(number) for number in product_numbers if str(number) not in self.ids)
+
+    def reset_missing(self):
+        """
+        Vergisst die fehlenden Nummern (zu Beginn eines Laufs, Produkte können inzwischen angelegt sein)
+        """
+        with self.lock:
+            self.known_missing.clear()
+
+    def store(self, product_number: str, product_id: str):
+        self.store_many({product_number: product_id})
+
+    def store_many(self, ids: Dict[str, str]):
+        if not ids:
+            return
+        with self.lock:
+            self.ids.update({str(number): product_id for number, product_id in ids.items()})
+            self.known_missing.difference_update(str(number) for number in ids)
+            self.dirty = True
+
+    def invalidate(self, product_number: str):
+        """
+        Entfernt einen veralteten Eintrag, z.B. nach einem 404 beim Aktualisieren
+        """
+        with self.lock:
+            if self.ids.pop(str(product_number), None) is not None:
+                self.dirty = True
+
+    def invalidate_id(self, product_id: str):
+        with self.lock:
+            stale = [number for number, cached_id in self.ids.items() if cached_id == product_id]
+            for number in stale:
+                del self.ids[number]
+            if stale:
+                self.dirty = True
+
+    def load(self) -> bool:
+        """
+        Lädt den Index aus der Cache-Datei
+        """
+        if not self.cache_file_path or not os.path.exists(self.cache_file_path):
+            return False
+
+        try:
+            with open(self.cache_file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self.lock:
+                self.ids = {str(number): str(product_id) for number, product_id in data.items()}
+                self.dirty = False
+            self.logger.info(f"Produkt-ID-Cache geladen: {len(self.ids)} Einträge")
+            return True
+        except (OSError, ValueError, AttributeError) as e:
+            self.logger.warning(f"Produkt-ID-Cache konnte nicht geladen werden: {e}")
+            return False
+
+    def save(self) -> bool:
+        """
+        Speichert den Index atomar in der Cache-Datei (nur wenn er sich geändert hat)
+        """
+        if not self.cache_file_path or not self.dirty:
+            return False
+
+        try:
+            directory = os.path.dirname(self.cache_file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Mehrere Synchronisationen können gleichzeitig speichern (gemeinsame Temp-Datei)
+            with self.save_lock:
+                with self.lock:
+                    data = dict(self.ids)
+                    self.dirty = False
+
+                temp_path = f"{self.cache_file_path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(temp_path, self.cache_file_path)
+            return True
+        except OSError as e:
+            self.logger.error(f"Produkt-ID-Cache konnte nicht gespeichert werden: {e}")
+            return False
@@ -0,0 +1,126 @@
+import math
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from field_mapping import CompiledMapping
+
+# Standardwerte der Shopware-Installation
+DEFAULT_CURRENCY_ID = "b7d2554b0ce847cd82f3ac9bd1c0dfca"  # EUR (Standard Currency ID)
+DEFAULT_TAX_ID = "f5c428b9cd2e455b9b2d3c9b9d9f1c85"  # Standard Tax ID (19%)
+DEFAULT_TAX_RATE = 19.0
+
+def default_mapping(tax_rate: float = DEFAULT_TAX_RATE, currency_id: str = DEFAULT_CURRENCY_ID,
+                    tax_id: str = DEFAULT_TAX_ID) -> Dict:
+    """
+    Standard-Zuordnung zwischen CSV-Spalten und Shopware-Feldern
+
+    Optionale Spalten 'tax_rate' (in Prozent), 'currency_id' und 'tax_id'
+    überschreiben die Standardwerte je Zeile.
+    """
+    return {
+        "fields": {
+            "productNumber": {"column": "product_number", "type": "string", "required": True},
+            "name": {"column": "name", "type": "string", "required": True},
+            "description": {"column": "description", "type": "string"},
+            "price": {
+                "column": "price",
+                "compute": "price",
+                "required": True,
+                "tax_rate": tax_rate,
+                "tax_rate_column": "tax_rate",
+                "currency_id": currency_id,
+                "currency_id_column": "currency_id"
+            },
+            "stock": {"column": "stock", "type": "int", "required": True},
+            "taxId": {"column": "tax_id", "type": "string", "default": tax_id},
+            "active": {"column": "active", "type": "bool", "default": True},
+            "weight": {"column": "weight", "type": "float", "omit_empty": True},
+            "ean": {"column": "ean", "type": "string", "omit_empty": True}
+        }
+    }
+
+def diff_product_data(current: Dict, product_data: Dict) -> Dict:
+    """
+    Vergleicht vorbereitete Produktdaten mit dem aktuellen Stand in Shopware
+
+    Zahlen gelten bis auf Rundungsdifferenzen als gleich, leere Texte wie
+    fehlende Werte. Preise werden je Währung verglichen.
+
+    Returns:
+        Nur die geänderten Felder (leer, wenn das Produkt unverändert ist)
+    """
+    return {
+        field: value
+        for field, value in product_data.items()
+        if field not in current or not _same_value(current[field], value)
+    }
+
+def _same_value(current, value) -> bool:
+    if isinstance(value, list) and value and all(isinstance(item, dict) and 'currencyId' in item for item in value):
+        return _same_prices(current, value)
+    if isinstance(value, bool) or isinstance(current, bool):
+        return current is value
+    if isinstance(value, (int, float)) and isinstance(current, (int, float)):
+        return math.isclose(current, value, rel_tol=0, abs_tol=1e-4)
+    if value in (None, '') and current in (None, ''):
+        return True
+    return current == value
+
+def _same_prices(current, prices: List[Dict]) -> bool:
+    if not isinstance(current, list):
+        return False
+
+    current_prices = {price.get('currencyId'): price for price in current if isinstance(price, dict)}
+    if set(current_prices) != {price['currencyId'] for price in prices}:
+        return False
+
+    return all(
+        _same_value(current_prices[price['currencyId']].get(key), price.get(key))
+        for price in prices
+        for key in ('gross', 'net', 'linked')
+    )
+
+class ProductTransformer:
+    """
+    Wandelt CSV-Daten anhand eines Mappings in Produktdaten für die Shopware API um
+
+    transform_row verarbeitet eine einzelne Zeile, transform_frame einen
+    ganzen DataFrame-Block spaltenweise (für große Dateien). Das Mapping
+    wird einmalig beim Erstellen kompiliert.
+    """
+
+    def __init__(self, mapping: Optional[Dict] = None, tax_rate: float = DEFAULT_TAX_RATE,
+                 currency_id: str = DEFAULT_CURRENCY_ID, tax_id: str = DEFAULT_TAX_ID):
+        if mapping is None:
+            mapping = default_mapping(float(tax_rate), currency_id, tax_id)
+        self.mapping = CompiledMapping(mapping)
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def required_columns(self) -> List[str]:
+        return self.mapping.required_columns
+
+    @property
+    def column_dtypes(self) -> Dict[str, str]:
+        return self.mapping.column_dtypes
+
+    def transform_row(self, csv_row: Dict) -> Dict:
+        """
+        Bereitet die Produktdaten einer CSV-Zeile vor
+
+        Raises:
+            ValueError: wenn ein Pflichtfeld fehlt oder ein Wert ungültig ist
+        """
+        return self.mapping.transform_row(csv_row)
+
+    def transform_frame(self, frame) -> Tuple[List[Tuple[int, Dict]], Dict[int, str]]:
+        """
+        Bereitet die Produktdaten eines ganzen Blocks spaltenweise vor
+
+        Args:
+            frame: DataFrame-Block, der Index enthält die CSV-Zeilennummern
+
+        Returns:
+            Tuple (Liste von Tupeln (CSV-Zeilennummer, Produktdaten), Fehler je CSV-Zeilennummer)
+        """
+        return self.mapping.transform_frame(frame)
@@ -0,0 +1,51 @@
+import time
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+class RateLimiter:
+    """
+    Thread-sicherer Token-Bucket, der Anfragen auf eine feste Rate begrenzt
+    """
+
+    def __init__(self, requests_per_second: float, burst: Optional[int] = None):
+        self.rate = float(requests_per_second)
+        self.capacity = float(burst if burst else max(1, int(self.rate)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blockiert, bis eine weitere Anfrage gesendet werden darf
+        """
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(url: str, requests_per_second: float) -> RateLimiter:
+    """
+    Gibt den gemeinsamen RateLimiter für den Host einer URL zurück
+    """
+    host = urlparse(url or '').netloc
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(requests_per_second)
+        return _limiters[host]
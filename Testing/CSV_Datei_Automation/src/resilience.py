@@ -0,0 +1,95 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# HTTP-Status, bei denen sich eine Wiederholung lohnt
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+class RetryPolicy:
+    """
+    Exponentielles Backoff mit Jitter, berücksichtigt den Retry-After-Header
+    """
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Wartezeit vor Wiederholung Nummer attempt (beginnend bei 0)
+        """
+        server_delay = self.parse_retry_after(retry_after)
+        if server_delay is not None:
+            return min(server_delay, self.max_delay)
+
+        # "Full Jitter": zufällige Wartezeit bis zur exponentiellen Obergrenze
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """
+        Wertet Retry-After als Sekunden oder HTTP-Datum aus
+        """
+        if not value:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            return None
+
+
+class CircuitBreaker:
+    """
+    Pausiert alle Anfragen, wenn die Fehlerquote der letzten Anfragen zu hoch ist
+    """
+
+    def __init__(self, failure_rate: float = 0.5, window_size: int = 20,
+                 min_requests: int = 10, cooldown: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.results = deque(maxlen=window_size)
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def wait_until_closed(self):
+        """
+        Blockiert, solange der Circuit Breaker offen ist
+        """
+        while True:
+            with self.lock:
+                remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def record(self, success: bool):
+        """
+        Vermerkt das Ergebnis einer Anfrage und öffnet ggf. den Circuit Breaker
+        """
+        with self.lock:
+            self.results.append(success)
+
+            if len(self.results) < self.min_requests:
+                return
+
+            failures = self.results.count(False)
+            if failures / len(self.results) >= self.failure_rate and time.monotonic() >= self.open_until:
+                self.open_until = time.monotonic() + self.cooldown
+                # Nach der Pause mit leerem Fenster neu bewerten
+                self.results.clear()
+                self.logger.warning(
+                    f"Fehlerquote zu hoch ({failures} Fehler) - pausiere Synchronisation für {self.cooldown:.0f} Sekunden"
+                )
@@ -1,9 +1,16 @@
+import os
+import re
+import gzip
 import json
+import time
+import uuid
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, List, Optional, Tuple
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     print("❌ requests nicht installiert. Installieren Sie es mit: pip install requests")
     raise
@@ -12,20 +19,71 @@ try:
     from decouple import config
 except ImportError:
     print("⚠️ python-decouple nicht verfügbar. Verwende Umgebungsvariablen.")
-    import os
     def config(key, default=None):
         return os.getenv(key, default)
 
+from product_id_cache import ProductIdCache
+from rate_limiter import get_rate_limiter
+from resilience import RETRY_STATUS_CODES, CircuitBreaker, RetryPolicy
+from sync_metrics import metrics, timed
+from field_mapping import load_mapping
+from product_transformer import (
+    DEFAULT_CURRENCY_ID, DEFAULT_TAX_ID, DEFAULT_TAX_RATE, ProductTransformer, diff_product_data
+)
+
 class ShopwareAPI:
     """
     Klasse für die Kommunikation mit der Shopware API
+    
+    Args:
+        pool_size: Größe des Verbindungspools (Standard: SHOPWARE_POOL_SIZE bzw. SYNC_CONCURRENCY)
     """
     
-    def __init__(self):
+    def __init__(self, pool_size: Optional[int] = None):
         self.base_url = config('SHOPWARE_URL')
         self.username = config('SHOPWARE_API_USERNAME')
         self.password = config('SHOPWARE_API_PASSWORD')
         self.access_token = None
+        self.token_expires_at = None
+        self.token_refresh_margin = float(config('SHOPWARE_TOKEN_REFRESH_MARGIN', 60))
+        self.auth_lock = threading.RLock()
+        self.batch_size = int(config('SYNC_BATCH_SIZE', 500))
+        self.search_page_size = int(config('SEARCH_PAGE_SIZE', 500))
+        self.product_ids = ProductIdCache(config('PRODUCT_ID_CACHE_FILE', default='') or None)
+        # Bestehende Produkte vor dem Schreiben abrufen und nur geänderte Felder senden
+        self.compare_before_update = config('COMPARE_BEFORE_UPDATE', 'false').lower() == 'true'
+        # Medienordner für importierte Produktbilder (leer = Standardordner)
+        self.media_folder_id = config('SHOPWARE_MEDIA_FOLDER_ID', default='') or None
+        # Eigenes CSV -> Shopware Mapping (JSON/YAML), leer = Standard-Mapping
+        mapping_file = config('PRODUCT_MAPPING_FILE', default='')
+        self.transformer = ProductTransformer(
+            mapping=load_mapping(mapping_file) if mapping_file else None,
+            tax_rate=float(config('SHOPWARE_TAX_RATE', DEFAULT_TAX_RATE)),
+            currency_id=config('SHOPWARE_CURRENCY_ID', DEFAULT_CURRENCY_ID),
+            tax_id=config('SHOPWARE_TAX_ID', DEFAULT_TAX_ID)
+        )
+        
+        # Gemeinsame Ratenbegrenzung je Shopware-Host (0 = unbegrenzt)
+        self.rate_limiter = get_rate_limiter(self.base_url, float(config('SHOPWARE_RATE_LIMIT', 0)))
+        
+        # Timeouts in Sekunden (Verbindungsaufbau, Antwort)
+        self.timeout = (
+            float(config('SHOPWARE_CONNECT_TIMEOUT', 5)),
+            float(config('SHOPWARE_READ_TIMEOUT', 60))
+        )
+        self.gzip_requests = config('SHOPWARE_GZIP_REQUESTS', 'false').lower() == 'true'
+        
+        # Wiederholungen bei 429/5xx und Pause bei hoher Fehlerquote
+        self.retry_policy = RetryPolicy(
+            max_retries=int(config('SHOPWARE_MAX_RETRIES', 5)),
+            base_delay=float(config('SHOPWARE_RETRY_BASE_DELAY', 0.5)),
+            max_delay=float(config('SHOPWARE_RETRY_MAX_DELAY', 60))
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_rate=float(config('CIRCUIT_BREAKER_FAILURE_RATE', 0.5)),
+            cooldown=float(config('CIRCUIT_BREAKER_COOLDOWN', 30))
+        )
+        self.session = self._create_session(pool_size)
         self.headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json'
@@ -34,6 +92,149 @@ class ShopwareAPI:
         # Logger konfigurieren
         self.logger = logging.getLogger(__name__)
         
+    def _create_session(self, pool_size: Optional[int] = None) -> requests.Session:
+        """
+        Erstellt eine Session mit Keep-Alive und einem Verbindungspool passend zur Parallelität
+        
+        Eine vom Aufrufer übergebene Poolgröße (z.B. für mehrere Feeds) hat Vorrang
+        vor SHOPWARE_POOL_SIZE.
+        """
+        pool_size = pool_size or int(config('SHOPWARE_POOL_SIZE', 0)) or max(1, int(config('SYNC_CONCURRENCY', 1)))
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Accept-Encoding'] = 'gzip, deflate'
+        return session
+    
+    def close(self):
+        """
+        Schließt alle offenen Verbindungen
+        """
+        self.session.close()
+    
+    def _request(self, method: str, url: str, authorize: bool = True, **kwargs):
+        """
+        Sendet eine HTTP-Anfrage über die Session unter Einhaltung der Ratenbegrenzung
+        
+        Authentifizierte Anfragen werden bei 401 nach einer Token-Erneuerung
+        einmal wiederholt.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        
+        if self.gzip_requests and kwargs.get('json') is not None:
+            # JSON-Body komprimiert senden (muss vom Webserver unterstützt werden)
+            body = json.dumps(kwargs.pop('json')).encode('utf-8')
+            kwargs['data'] = gzip.compress(body)
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **{
+                'Content-Type': 'application/json',
+                'Content-Encoding': 'gzip'
+            })
+        
+        if not authorize:
+            return self._send(method, url, **kwargs)
+        
+        headers = dict(kwargs.pop('headers', None) or self.headers)
+        
+        for attempt in range(2):
+            token = self.access_token
+            headers['Authorization'] = f'Bearer {token}'
+            
+            response = self._send(method, url, headers=headers, **kwargs)
+            
+            if response.status_code != 401 or attempt == 1:
+                return response
+            
+            self.logger.info("Access Token abgelehnt (401) - erneuere Token")
+            if not self._refresh_token(token):
+                return response
+        
+        return response
+    
+    def _send(self, method: str, url: str, **kwargs):
+        """
+        Sendet eine Anfrage und wiederholt sie bei 429/5xx oder Verbindungsfehlern mit Backoff
+        """
+        max_retries = self.retry_policy.max_retries
+        
+        # Dateien (z.B. Medien-Uploads) bei jeder Wiederholung von vorn senden
+        body = kwargs.get('data')
+        body_start = body.tell() if hasattr(body, 'seek') else None
+        
+        for attempt in range(max_retries + 1):
+            self.circuit_breaker.wait_until_closed()
+            self.rate_limiter.acquire()
+            if body_start is not None:
+                body.seek(body_start)
+            
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                metrics.increment('http_errors')
+                self.circuit_breaker.record(False)
+                if attempt == max_retries:
+                    raise
+                delay = self.retry_policy.get_delay(attempt)
+                reason = type(e).__name__
+            else:
+                metrics.observe('http_request', time.perf_counter() - started)
+                metrics.increment('http_requests')
+                metrics.increment('bytes_sent', int(response.request.headers.get('Content-Length') or 0))
+                metrics.increment('bytes_received', len(response.content))
+                if response.status_code >= 400:
+                    metrics.increment('http_errors')
+                
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self.circuit_breaker.record(True)
+                    return response
+                
+                self.circuit_breaker.record(False)
+                if attempt == max_retries:
+                    return response
+                delay = self.retry_policy.get_delay(attempt, response.headers.get('Retry-After'))
+                reason = f"HTTP {response.status_code}"
+            
+            metrics.increment('retries')
+            self.logger.warning(
+                f"{method} {url} fehlgeschlagen ({reason}) - Wiederholung {attempt + 1}/{max_retries} in {delay:.1f}s"
+            )
+            time.sleep(delay)
+    
+    def _token_is_valid(self) -> bool:
+        """
+        Prüft, ob ein Token vorhanden ist und nicht demnächst abläuft
+        """
+        if not self.access_token:
+            return False
+        if self.token_expires_at is None:
+            return True
+        return time.monotonic() < self.token_expires_at - self.token_refresh_margin
+    
+    def _ensure_token(self) -> bool:
+        """
+        Stellt sicher, dass ein gültiges Token vorliegt, und erneuert es kurz vor Ablauf
+        """
+        if self._token_is_valid():
+            return True
+        
+        # Nur ein Thread erneuert das Token, die anderen verwenden das Ergebnis
+        with self.auth_lock:
+            if self._token_is_valid():
+                return True
+            return self.authenticate()
+    
+    def _refresh_token(self, rejected_token: Optional[str]) -> bool:
+        """
+        Erneuert ein vom Server abgelehntes Token (nur einmal für alle wartenden Threads)
+        """
+        with self.auth_lock:
+            if self.access_token != rejected_token and self._token_is_valid():
+                return True
+            return self.authenticate()
+    
+    @timed('auth')
     def authenticate(self) -> bool:
         """
         Authentifizierung bei der Shopware API
@@ -46,32 +247,36 @@ class ShopwareAPI:
             "password": self.password
         }
         
-        try:
-            response = requests.post(auth_url, json=auth_data)
-            response.raise_for_status()
-            
-            token_data = response.json()
-            self.access_token = token_data.get('access_token')
-            
-            if self.access_token:
-                self.headers['Authorization'] = f'Bearer {self.access_token}'
-                self.logger.info("Erfolgreich bei Shopware API authentifiziert")
-                return True
-            else:
-                self.logger.error("Keine Access Token erhalten")
-                return False
+        with self.auth_lock:
+            try:
+                requested_at = time.monotonic()
+                response = self._request('POST', auth_url, authorize=False, json=auth_data)
+                response.raise_for_status()
                 
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Fehler bei der Authentifizierung: {e}")
-            return False
+                token_data = response.json()
+                access_token = token_data.get('access_token')
+                
+                if access_token:
+                    expires_in = token_data.get('expires_in')
+                    self.token_expires_at = requested_at + float(expires_in) if expires_in else None
+                    self.access_token = access_token
+                    self.logger.info("Erfolgreich bei Shopware API authentifiziert")
+                    return True
+                else:
+                    self.logger.error("Keine Access Token erhalten")
+                    return False
+                    
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"Fehler bei der Authentifizierung: {e}")
+                return False
     
+    @timed('lookup')
     def get_product_by_number(self, product_number: str) -> Optional[Dict]:
         """
         Sucht ein Produkt anhand der Produktnummer
         """
-        if not self.access_token:
-            if not self.authenticate():
-                return None
+        if not self._ensure_token():
+            return None
         
         search_url = f"{self.base_url}/api/search/product"
         search_data = {
@@ -85,7 +290,7 @@ class ShopwareAPI:
         }
         
         try:
-            response = requests.post(search_url, json=search_data, headers=self.headers)
+            response = self._request('POST', search_url, json=search_data, headers=self.headers)
             response.raise_for_status()
             
             result = response.json()
@@ -101,45 +306,92 @@ class ShopwareAPI:
             self.logger.error(f"Fehler beim Suchen des Produkts {product_number}: {e}")
             return None
     
+    def get_product_id(self, product_number: str) -> Optional[str]:
+        """
+        Gibt die ID eines Produkts zurück, bevorzugt aus dem Produkt-ID-Cache
+        """
+        product_id = self.product_ids.get(product_number)
+        if product_id:
+            return product_id
+        
+        # Bereits in der Sammelsuche nicht gefunden - neues Produkt
+        if self.product_ids.is_missing(product_number):
+            return None
+        
+        existing_product = self.get_product_by_number(product_number)
+        if not existing_product:
+            return None
+        
+        product_id = existing_product.get('id')
+        self.product_ids.store(product_number, product_id)
+        return product_id
+    
+    def resolve_product_ids(self, product_numbers: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Ermittelt die IDs vieler Produkte; nur noch unbekannte Nummern werden gesucht
+        
+        Returns:
+            Dictionary productNumber -> ID der existierenden Produkte, None bei Fehlern
+        """
+        missing = self.product_ids.missing(product_numbers)
+        
+        for start in range(0, len(missing), self.search_page_size):
+            batch = missing[start:start + self.search_page_size]
+            found = self.search_product_ids(batch)
+            if found is None:
+                return None
+            self.product_ids.store_many(found)
+            self.product_ids.mark_missing(number for number in batch if number not in found)
+        
+        if missing:
+            self.logger.debug(f"{len(missing)} Produktnummern nachgeschlagen, "
+                              f"{len(product_numbers) - len(missing)} aus dem Cache")
+        
+        return self.product_ids.get_many(product_numbers)
+    
+    @timed('update')
     def update_product(self, product_id: str, product_data: Dict) -> bool:
         """
         Aktualisiert ein Produkt in Shopware
         """
-        if not self.access_token:
-            if not self.authenticate():
-                return False
+        if not self._ensure_token():
+            return False
         
         update_url = f"{self.base_url}/api/product/{product_id}"
         
         try:
-            response = requests.patch(update_url, json=product_data, headers=self.headers)
+            response = self._request('PATCH', update_url, json=product_data, headers=self.headers)
             response.raise_for_status()
             
             self.logger.info(f"Produkt {product_id} erfolgreich aktualisiert")
             return True
             
         except requests.exceptions.RequestException as e:
+            if e.response is not None and e.response.status_code == 404:
+                # Produkt existiert nicht mehr - zwischengespeicherte ID ist veraltet
+                self.product_ids.invalidate_id(product_id)
             self.logger.error(f"Fehler beim Aktualisieren des Produkts {product_id}: {e}")
             return False
     
+    @timed('create')
     def create_product(self, product_data: Dict) -> Optional[str]:
         """
         Erstellt ein neues Produkt in Shopware
         """
-        if not self.access_token:
-            if not self.authenticate():
-                return None
+        if not self._ensure_token():
+            return None
         
         create_url = f"{self.base_url}/api/product"
         
         try:
-            response = requests.post(create_url, json=product_data, headers=self.headers)
+            response = self._request('POST', create_url, json=product_data, headers=self.headers)
             response.raise_for_status()
             
             result = response.json()
             product_id = result.get('data', {}).get('id')
             
             if product_id:
+                self.product_ids.store(product_data.get('productNumber'), product_id)
                 self.logger.info(f"Neues Produkt erstellt mit ID: {product_id}")
                 return product_id
             else:
@@ -148,59 +400,418 @@ class ShopwareAPI:
                 
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Fehler beim Erstellen des Produkts: {e}")
-            return False
+            return None
     
-    def sync_product_from_csv_data(self, csv_row: Dict) -> bool:
+    def sync_product_from_csv_data(self, csv_row: Dict, current_state: Optional[Dict] = None) -> bool:
         """
         Synchronisiert ein Produkt basierend auf CSV-Daten
+        
+        Args:
+            csv_row: CSV-Zeile
+            current_state: aktueller Stand des Produkts in Shopware (siehe
+                           fetch_product_states); dann werden nur geänderte Felder gesendet
         """
         product_number = csv_row.get('product_number')
         if not product_number:
             self.logger.error("Keine Produktnummer in CSV-Zeile gefunden")
             return False
         
-        # Produkt in Shopware suchen
-        existing_product = self.get_product_by_number(product_number)
+        # Produkt-ID aus dem abgerufenen Stand, dem Cache oder per Suche in Shopware ermitteln
+        product_id = current_state.get('id') if current_state else self.get_product_id(product_number)
         
         # Produktdaten aus CSV vorbereiten
         product_data = self._prepare_product_data(csv_row)
         
-        if existing_product:
+        if product_id:
+            if current_state:
+                product_data = diff_product_data(current_state, product_data)
+                if not product_data:
+                    # Keine Änderungen - kein Schreibzugriff nötig
+                    metrics.increment('updates_skipped')
+                    return True
+            
             # Produkt existiert - aktualisieren
-            product_id = existing_product.get('id')
             return self.update_product(product_id, product_data)
         else:
             # Neues Produkt erstellen
             product_id = self.create_product(product_data)
             return product_id is not None
     
+    @timed('transform')
     def _prepare_product_data(self, csv_row: Dict) -> Dict:
         """
         Bereitet Produktdaten für die Shopware API vor
         """
-        # Hier können Sie die Zuordnung zwischen CSV-Spalten und Shopware-Feldern anpassen
-        product_data = {
-            "productNumber": csv_row.get('product_number'),
-            "name": csv_row.get('name'),
-            "description": csv_row.get('description'),
-            "price": [
+        return self.transformer.transform_row(csv_row)
+    
+    def search_product_ids(self, product_numbers: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Sucht die IDs mehrerer Produkte (nur id und productNumber werden abgerufen)
+        
+        Returns:
+            Dictionary productNumber -> ID der gefundenen Produkte, None bei Fehlern
+        """
+        products = self.search_products(product_numbers, ['id', 'productNumber'])
+        if products is None:
+            return None
+        return {product_number: product['id'] for product_number, product in products.items()}
+    
+    def fetch_product_states(self, product_numbers: List[str]) -> Optional[Dict[str, Dict]]:
+        """
+        Ruft den aktuellen Stand aller Felder des Mappings für viele Produkte ab
+        
+        Die IDs werden dabei im Produkt-ID-Cache aktualisiert.
+        
+        Returns:
+            Dictionary productNumber -> Produktdaten der gefundenen Produkte, None bei Fehlern
+        """
+        fields = ['id', 'productNumber'] + [
+            target for target in self.transformer.mapping.targets if target not in ('id', 'productNumber')
+        ]
+        
+        states = {}
+        for start in range(0, len(product_numbers), self.search_page_size):
+            products = self.search_products(product_numbers[start:start + self.search_page_size], fields)
+            if products is None:
+                return None
+            states.update(products)
+        
+        self.product_ids.store_many({product_number: product['id'] for product_number, product in states.items()})
+        self.product_ids.mark_missing(number for number in product_numbers if number not in states)
+        return states
+    
+    @timed('lookup_batch')
+    def search_products(self, product_numbers: List[str], fields: List[str]) -> Optional[Dict[str, Dict]]:
+        """
+        Sucht mehrere Produkte per equalsAny-Filter (seitenweise, nur die angegebenen Felder)
+        
+        Returns:
+            Dictionary productNumber -> Produktdaten der gefundenen Produkte, None bei Fehlern
+        """
+        if not self._ensure_token():
+            return None
+        
+        search_url = f"{self.base_url}/api/search/product"
+        search_data = {
+            "page": 1,
+            "limit": self.search_page_size,
+            "filter": [
                 {
-                    "currencyId": "b7d2554b0ce847cd82f3ac9bd1c0dfca",  # EUR (Standard Currency ID)
-                    "gross": float(csv_row.get('price', 0)),
-                    "net": float(csv_row.get('price', 0)) / 1.19,  # Annahme: 19% MwSt
-                    "linked": True
+                    "type": "equalsAny",
+                    "field": "productNumber",
+                    "value": product_numbers
                 }
             ],
-            "stock": int(csv_row.get('stock', 0)),
-            "taxId": "f5c428b9cd2e455b9b2d3c9b9d9f1c85",  # Standard Tax ID (19%)
-            "active": csv_row.get('active', 'true').lower() == 'true'
+            "includes": {"product": fields}
+        }
+        
+        found = {}
+        
+        try:
+            while True:
+                response = self._request('POST', search_url, json=search_data, headers=self.headers)
+                response.raise_for_status()
+                
+                products = response.json().get('data', [])
+                found.update({product['productNumber']: product for product in products})
+                
+                if len(products) < self.search_page_size:
+                    return found
+                search_data['page'] += 1
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Fehler bei der Sammelsuche nach {len(product_numbers)} Produkten: {e}")
+            return None
+    
+    def upsert_product_payloads(self, numbered_payloads: List[Tuple[int, Dict]]) -> Tuple[int, Dict[int, str]]:
+        """
+        Schreibt einen Batch vorbereiteter Produktdaten per Upsert in Shopware
+        
+        Bestehende Produkte werden über ihre Produktnummer einer ID zugeordnet,
+        neue Produkte erhalten eine neu erzeugte ID. Mit COMPARE_BEFORE_UPDATE
+        werden für bestehende Produkte nur geänderte Felder gesendet und
+        unveränderte Produkte übersprungen. Kommt eine Produktnummer mehrfach
+        vor, wird nur die letzte Zeile gesendet; frühere gelten als ersetzt.
+        """
+        # Zwei neue IDs für dieselbe Produktnummer würden den ganzen Batch scheitern lassen
+        last_rows = {payload['productNumber']: row_number for row_number, payload in numbered_payloads}
+        superseded_count = len(numbered_payloads) - len(last_rows)
+        if superseded_count:
+            for row_number, payload in numbered_payloads:
+                if last_rows[payload['productNumber']] != row_number:
+                    self.logger.warning(
+                        f"CSV-Zeile {row_number} ersetzt durch Zeile {last_rows[payload['productNumber']]} "
+                        f"(Produktnummer {payload['productNumber']} mehrfach vorhanden)"
+                    )
+            metrics.increment('rows_superseded', superseded_count)
+            numbered_payloads = [
+                (row_number, payload) for row_number, payload in numbered_payloads
+                if last_rows[payload['productNumber']] == row_number
+            ]
+        
+        product_numbers = [payload['productNumber'] for _, payload in numbered_payloads]
+        
+        states = {}
+        if self.compare_before_update:
+            states = self.fetch_product_states(product_numbers)
+            product_ids = None if states is None else {number: state['id'] for number, state in states.items()}
+        else:
+            product_ids = self.resolve_product_ids(product_numbers)
+        
+        if product_ids is None:
+            message = "Produkt-IDs konnten nicht ermittelt werden"
+            return 0, {row_number: message for row_number, _ in numbered_payloads}
+        
+        row_numbers = []
+        payloads = []
+        skipped_count = 0
+        for row_number, payload in numbered_payloads:
+            state = states.get(payload['productNumber'])
+            if state:
+                changes = diff_product_data(state, payload)
+                if not changes:
+                    skipped_count += 1
+                    continue
+                payload = dict(changes, productNumber=payload['productNumber'])
+            
+            payload = dict(payload)
+            payload['id'] = product_ids.get(payload['productNumber']) or uuid.uuid4().hex
+            row_numbers.append(row_number)
+            payloads.append(payload)
+        
+        if skipped_count:
+            metrics.increment('updates_skipped', skipped_count)
+        skipped_count += superseded_count
+        if not payloads:
+            return skipped_count, {}
+        
+        errors = {}
+        success_count = 0
+        pending = list(range(len(payloads)))
+        
+        # Die Sync-API schreibt einen Batch in einer Transaktion. Schlägt ein
+        # Eintrag fehl, werden die übrigen Einträge einmal erneut gesendet.
+        for attempt in range(2):
+            item_errors = self._send_sync_request([payloads[i] for i in pending])
+            
+            if item_errors is None:
+                # Neu angelegte Produkte im Cache vermerken
+                self.product_ids.store_many({payloads[i]['productNumber']: payloads[i]['id'] for i in pending})
+                success_count = len(pending)
+                break
+            
+            failed = {
+                pending[i]: message
+                for i, message in item_errors.items()
+                if 0 <= i < len(pending)
+            }
+            fallback = next(iter(item_errors.values()))
+            
+            if not failed or attempt == 1:
+                # Fehler nicht zuordenbar oder erneut fehlgeschlagen: ganzer Rest ist fehlerhaft
+                for i in pending:
+                    errors[row_numbers[i]] = failed.get(i, fallback)
+                break
+            
+            for i, message in failed.items():
+                errors[row_numbers[i]] = message
+            pending = [i for i in pending if i not in failed]
+            
+            if not pending:
+                break
+        
+        # Zwischengespeicherte IDs fehlerhafter Zeilen könnten veraltet sein
+        for i, payload in enumerate(payloads):
+            if row_numbers[i] in errors:
+                self.product_ids.invalidate(payload['productNumber'])
+        
+        return skipped_count + success_count, errors
+    
+    @timed('sync_batch')
+    def _send_sync_request(self, payloads: List[Dict], entity: str = 'product') -> Optional[Dict[int, str]]:
+        """
+        Sendet eine Upsert-Operation für eine Entität (Standard: product) an die Sync-API
+        
+        Returns:
+            None bei Erfolg, sonst Fehlermeldungen je Position im Payload
+            (Position -1, wenn sich ein Fehler keinem Eintrag zuordnen lässt)
+        """
+        if not self._ensure_token():
+            return {-1: "Authentifizierung fehlgeschlagen"}
+        
+        sync_url = f"{self.base_url}/api/_action/sync"
+        sync_data = {
+            f"write-{entity}": {
+                "entity": entity,
+                "action": "upsert",
+                "payload": payloads
+            }
         }
+        headers = dict(self.headers)
+        headers['indexing-behavior'] = 'use-queue-indexing'
         
-        # Zusätzliche Felder können hier hinzugefügt werden
-        if csv_row.get('weight'):
-            product_data['weight'] = float(csv_row.get('weight'))
+        try:
+            response = self._request('POST', sync_url, json=sync_data, headers=headers)
+            if response.status_code < 400:
+                self.logger.info(f"{len(payloads)} {entity}-Einträge per Sync-API geschrieben")
+                return None
+            
+            item_errors = self._parse_sync_errors(response)
+            self.logger.error(f"Sync-API meldet {len(item_errors)} Fehler (HTTP {response.status_code})")
+            return item_errors
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Fehler bei der Sync-Anfrage: {e}")
+            return {-1: str(e)}
+    
+    def _parse_sync_errors(self, response) -> Dict[int, str]:
+        """
+        Ordnet die Fehler einer Sync-Antwort den Positionen im Payload zu
+        
+        Shopware liefert die Position im JSON-Pointer, z.B. "/write-product/3/name".
+        """
+        try:
+            error_list = response.json().get('errors', [])
+        except ValueError:
+            error_list = []
         
-        if csv_row.get('ean'):
-            product_data['ean'] = csv_row.get('ean')
+        item_errors = {}
+        for error in error_list:
+            message = error.get('detail') or error.get('title') or "Unbekannter Fehler"
+            pointer = (error.get('source') or {}).get('pointer', '')
+            match = re.match(r'^/[^/]+/(\d+)', pointer)
+            index = int(match.group(1)) if match else -1
+            item_errors.setdefault(index, message)
+        
+        return item_errors or {-1: f"HTTP {response.status_code}"}
+    
+    @timed('media_lookup')
+    def search_media_ids(self, file_names: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Sucht hochgeladene Medien über ihren Dateinamen (ohne Endung)
+        
+        Returns:
+            Dictionary fileName -> Medien-ID der gefundenen Medien, None bei Fehlern
+        """
+        if not self._ensure_token():
+            return None
+        
+        search_url = f"{self.base_url}/api/search/media"
+        found = {}
+        
+        try:
+            for start in range(0, len(file_names), self.search_page_size):
+                search_data = {
+                    "page": 1,
+                    "limit": self.search_page_size,
+                    "filter": [
+                        {
+                            "type": "equalsAny",
+                            "field": "fileName",
+                            "value": file_names[start:start + self.search_page_size]
+                        }
+                    ],
+                    "includes": {"media": ["id", "fileName"]}
+                }
+                response = self._request('POST', search_url, json=search_data, headers=self.headers)
+                response.raise_for_status()
+                found.update({media['fileName']: media['id'] for media in response.json().get('data', [])})
+            
+            return found
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Fehler bei der Suche nach {len(file_names)} Medien: {e}")
+            return None
+    
+    def create_media(self, media_ids: List[str]) -> Optional[Dict[int, str]]:
+        """
+        Legt leere Medien-Entitäten gebündelt über die Sync-API an
+        
+        Returns:
+            None bei Erfolg, sonst Fehlermeldungen je Position in media_ids
+        """
+        payloads = []
+        for media_id in media_ids:
+            payload = {"id": media_id}
+            if self.media_folder_id:
+                payload["mediaFolderId"] = self.media_folder_id
+            payloads.append(payload)
+        
+        return self._send_sync_request(payloads, entity='media')
+    
+    @timed('media_upload')
+    def upload_media(self, media_id: str, file_path: str, content_type: str, file_name: str) -> bool:
+        """
+        Lädt eine Datei in eine bestehende Medien-Entität hoch
+        
+        Die Datei wird direkt von der Festplatte gestreamt und nicht in den Speicher geladen.
+        
+        Args:
+            media_id: ID der zuvor angelegten Medien-Entität
+            file_path: Pfad der Bilddatei
+            content_type: MIME-Typ der Datei
+            file_name: Dateiname in Shopware (ohne Endung)
+        """
+        if not self._ensure_token():
+            return False
+        
+        upload_url = f"{self.base_url}/api/_action/media/{media_id}/upload"
+        params = {
+            "extension": os.path.splitext(file_path)[1].lstrip('.').lower(),
+            "fileName": file_name
+        }
+        headers = dict(self.headers)
+        headers['Content-Type'] = content_type
+        
+        try:
+            with open(file_path, 'rb') as f:
+                response = self._request('POST', upload_url, params=params, data=f, headers=headers)
+            response.raise_for_status()
+            return True
+            
+        except (OSError, requests.exceptions.RequestException) as e:
+            self.logger.error(f"Fehler beim Hochladen von {file_path} (Medium {media_id}): {e}")
+            return False
+    
+    def delete_media(self, media_id: str) -> bool:
+        """
+        Löscht eine Medien-Entität (z.B. nach einem fehlgeschlagenen Upload)
+        """
+        if not self._ensure_token():
+            return False
+        
+        try:
+            response = self._request('DELETE', f"{self.base_url}/api/media/{media_id}", headers=self.headers)
+            response.raise_for_status()
+            return True
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Fehler beim Löschen von Medium {media_id}: {e}")
+            return False
+    
+    def link_product_media(self, product_media: Dict[str, List[str]]) -> Optional[Dict[int, str]]:
+        """
+        Ordnet Produkten Medien zu; das erste Medium wird Titelbild
+        
+        Die IDs der Zuordnungen (product_media) werden aus Produkt- und Medien-ID
+        abgeleitet, ein erneuter Import aktualisiert daher nur die Position.
+        
+        Args:
+            product_media: Dictionary Produkt-ID -> Medien-IDs in Anzeigereihenfolge
+            
+        Returns:
+            None bei Erfolg, sonst Fehlermeldungen je Position in product_media
+        """
+        payloads = []
+        for product_id, media_ids in product_media.items():
+            links = [
+                {
+                    "id": uuid.uuid5(uuid.NAMESPACE_URL, f"product-media:{product_id}:{media_id}").hex,
+                    "mediaId": media_id,
+                    "position": position
+                }
+                for position, media_id in enumerate(media_ids)
+            ]
+            payloads.append({"id": product_id, "media": links, "coverId": links[0]["id"]})
         
-        return product_data
+        return self._send_sync_request(payloads)
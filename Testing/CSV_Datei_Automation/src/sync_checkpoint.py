@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+class SyncCheckpoint:
+    """
+    SQLite-Datei mit dem Fortschritt des laufenden Synchronisationslaufs
+
+    Nach jedem übertragenen Block werden die zuletzt verarbeitete CSV-Zeile
+    und das Ergebnis je Zeile gespeichert. Bricht ein Lauf ab, kann der
+    nächste Lauf für dieselbe, unveränderte Datei dort fortsetzen.
+    """
+
+    def __init__(self, file_path: Optional[str]):
+        self.file_path = file_path
+        self.active = False
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Öffnet die Datenbank und führt den Block als eine Transaktion aus
+        """
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.file_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoint (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    csv_file TEXT NOT NULL,
+                    file_hash TEXT NOT NULL,
+                    committed_row INTEGER NOT NULL,
+                    started_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    finished INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS row_outcomes (
+                    row_number INTEGER PRIMARY KEY,
+                    product_number TEXT,
+                    error TEXT
+                )
+            """)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def begin(self, csv_file: str, file_version: Optional[str], resume: bool = False) -> int:
+        """
+        Beginnt einen Lauf oder setzt einen unterbrochenen Lauf fort
+
+        Args:
+            csv_file: Pfad der CSV-Datei
+            file_version: Kennung des Dateistands, z.B. aus CSVProcessor.file_version
+                          (None deaktiviert den Checkpoint für diesen Lauf)
+            resume: True, um einen unterbrochenen Lauf derselben Datei fortzusetzen
+
+        Returns:
+            Letzte bereits übertragene CSV-Zeilennummer (0 = von vorne beginnen)
+        """
+        self.active = False
+        if not self.file_path or not file_version:
+            return 0
+
+        csv_file = os.path.abspath(csv_file)
+        now = datetime.now().isoformat(timespec='seconds')
+
+        try:
+            with self.lock, self._transaction() as conn:
+                if resume:
+                    checkpoint = conn.execute(
+                        "SELECT csv_file, file_hash, committed_row, finished FROM checkpoint WHERE id = 1"
+                    ).fetchone()
+
+                    if checkpoint and not checkpoint[3] and checkpoint[:2] == (csv_file, file_version):
+                        self.active = True
+                        return checkpoint[2]
+
+                    if checkpoint and not checkpoint[3]:
+                        self.logger.warning("CSV-Datei wurde seit dem unterbrochenen Lauf geändert - beginne von vorne")
+
+                conn.execute("DELETE FROM row_outcomes")
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoint "
+                    "(id, csv_file, file_hash, committed_row, started_at, updated_at, finished) "
+                    "VALUES (1, ?, ?, 0, ?, ?, 0)",
+                    (csv_file, file_version, now, now)
+                )
+            self.active = True
+            return 0
+
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"Checkpoint-Datei konnte nicht geöffnet werden: {e}")
+            return 0
+
+    def load_outcomes(self) -> Tuple[int, Dict[int, str], List[str]]:
+        """
+        Lädt die Ergebnisse der bereits übertragenen Zeilen des laufenden Laufs
+
+        Returns:
+            Tuple (Anzahl erfolgreicher Zeilen, Fehler je CSV-Zeilennummer, fehlgeschlagene Produktnummern)
+        """
+        if not self.active:
+            return 0, {}, []
+
+        try:
+            with self.lock, self._transaction() as conn:
+                success_count = conn.execute(
+                    "SELECT COUNT(*) FROM row_outcomes WHERE error IS NULL"
+                ).fetchone()[0]
+                failed = conn.execute(
+                    "SELECT row_number, product_number, error FROM row_outcomes WHERE error IS NOT NULL"
+                ).fetchall()
+
+            errors = {row_number: error for row_number, _, error in failed}
+            failed_numbers = [product_number for _, product_number, _ in failed if product_number]
+            return success_count, errors, failed_numbers
+
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"Checkpoint konnte nicht gelesen werden: {e}")
+            return 0, {}, []
+
+    def commit(self, committed_row: int, outcomes: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> bool:
+        """
+        Speichert den Fortschritt nach einem übertragenen Block in einer Transaktion
+
+        Args:
+            committed_row: letzte CSV-Zeilennummer des Blocks
+            outcomes: Tupel (CSV-Zeilennummer, Produktnummer, Fehlermeldung oder None)
+        """
+        if not self.active:
+            return False
+
+        try:
+            with self.lock, self._transaction() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO row_outcomes (row_number, product_number, error) VALUES (?, ?, ?)",
+                    outcomes
+                )
+                conn.execute(
+                    "UPDATE checkpoint SET committed_row = ?, updated_at = ? WHERE id = 1",
+                    (int(committed_row), datetime.now().isoformat(timespec='seconds'))
+                )
+            return True
+
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"Checkpoint konnte nicht gespeichert werden: {e}")
+            return False
+
+    def finish(self) -> bool:
+        """
+        Markiert den Lauf als vollständig abgeschlossen
+        """
+        if not self.active:
+            return False
+
+        try:
+            with self.lock, self._transaction() as conn:
+                conn.execute("DELETE FROM row_outcomes")
+                conn.execute(
+                    "UPDATE checkpoint SET finished = 1, updated_at = ? WHERE id = 1",
+                    (datetime.now().isoformat(timespec='seconds'),)
+                )
+            self.active = False
+            return True
+
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"Checkpoint konnte nicht abgeschlossen werden: {e}")
+            return False
@@ -1,7 +1,11 @@
+import re
 import time
 import logging
 import os
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 try:
     from watchdog.observers import Observer
@@ -9,6 +13,7 @@ try:
     WATCHDOG_AVAILABLE = True
 except ImportError:
     WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
     print("⚠️ Watchdog nicht verfügbar. Dateiüberwachung deaktiviert.")
 
 try:
@@ -19,59 +24,219 @@ except ImportError:
     def config(key, default=None):
         return os.getenv(key, default)
 
-from csv_processor import CSVProcessor
+from csv_processor import CSV_COLUMN_DTYPES, CSVProcessor
+from dead_letter import DeadLetterFile
 from shopware_api import ShopwareAPI
+from sync_checkpoint import SyncCheckpoint
+from sync_metrics import metrics, start_metrics_server
+
+def feed_name_from_path(csv_file_path: str) -> str:
+    """
+    Kurzname eines Feeds aus dem Dateinamen (z.B. lieferant_a.csv -> lieferant_a)
+    """
+    stem = os.path.splitext(os.path.basename(csv_file_path))[0]
+    return re.sub(r'[^A-Za-z0-9_-]', '_', stem)
+
+def feed_state_path(file_path: Optional[str], feed_name: Optional[str]) -> Optional[str]:
+    """
+    Pfad einer Zustandsdatei je Feed (./state/row_snapshot.json -> ./state/row_snapshot.lieferant_a.json)
+    """
+    if not file_path or not feed_name:
+        return file_path
+    root, extension = os.path.splitext(file_path)
+    return f"{root}.{feed_name}{extension}"
 
 class CSVFileHandler(FileSystemEventHandler):
     """
-    Handler für Dateiänderungen (nur verfügbar wenn watchdog installiert ist)
+    Handler für Dateiänderungen einer CSV-Datei
+    
+    Mehrere Ereignisse innerhalb des Debounce-Fensters werden zu einer
+    Synchronisation zusammengefasst. Läuft bereits eine Synchronisation,
+    wird höchstens eine weitere im Anschluss ausgeführt.
+    
+    Mit einem Executor werden fällige Synchronisationen in dessen Warteschlange
+    gestellt (gemeinsam für mehrere Dateien); dieselbe Datei wird dabei nie
+    parallel synchronisiert.
     """
     
-    def __init__(self, csv_file_path: str, sync_manager):
-        if not WATCHDOG_AVAILABLE:
-            raise ImportError("Watchdog ist nicht verfügbar")
+    def __init__(self, csv_file_path: str, sync_manager, debounce_seconds: float = 2.0,
+                 stable_seconds: float = 0.5, executor: Optional[ThreadPoolExecutor] = None):
         super().__init__()
-        self.csv_file_path = csv_file_path
+        self.csv_file_path = os.path.abspath(csv_file_path)
         self.sync_manager = sync_manager
+        self.debounce_seconds = debounce_seconds
+        self.stable_seconds = stable_seconds
+        self.executor = executor
         self.logger = logging.getLogger(__name__)
+        
+        self.lock = threading.Lock()
+        self.timer = None
+        self.sync_pending = False
+        self.sync_running = False
     
     def on_modified(self, event):
+        self._handle_event(event, event.src_path)
+    
+    def on_created(self, event):
+        self._handle_event(event, event.src_path)
+    
+    def on_moved(self, event):
+        # Viele Editoren speichern über eine temporäre Datei und Umbenennen
+        self._handle_event(event, event.dest_path)
+    
+    def _handle_event(self, event, path: str):
         if event.is_directory:
             return
             
-        if event.src_path == self.csv_file_path:
-            self.logger.info(f"CSV-Datei geändert: {event.src_path}")
-            # Kurze Verzögerung, um sicherzustellen, dass die Datei vollständig geschrieben wurde
-            time.sleep(1)
-            self.sync_manager.sync_products()
+        if os.path.abspath(path) == self.csv_file_path:
+            self.logger.debug(f"CSV-Datei geändert: {path}")
+            self.schedule_sync()
+    
+    def schedule_sync(self):
+        """
+        Plant eine Synchronisation nach Ablauf des Debounce-Fensters (jedes Ereignis verlängert es)
+        """
+        with self.lock:
+            self.sync_pending = True
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.debounce_seconds, self._start_pending_sync)
+            self.timer.daemon = True
+            self.timer.start()
+    
+    def stop(self):
+        """
+        Verwirft eine noch geplante Synchronisation
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.sync_pending = False
+    
+    def _start_pending_sync(self):
+        if self.executor is None:
+            self._run_pending_sync()
+        else:
+            self.executor.submit(self._run_pending_sync)
+    
+    def _run_pending_sync(self):
+        with self.lock:
+            if self.sync_running or not self.sync_pending:
+                # Die laufende Synchronisation übernimmt die ausstehende Änderung anschließend
+                return
+            self.sync_running = True
+            self.sync_pending = False
+        
+        try:
+            while True:
+                self._wait_until_written()
+                self.logger.info(f"CSV-Datei geändert: {self.csv_file_path}")
+                try:
+                    self.sync_manager.sync_changes()
+                except Exception as e:
+                    self.logger.error(f"Fehler bei der Synchronisation von {self.csv_file_path}: {e}")
+                
+                with self.lock:
+                    if not self.sync_pending:
+                        return
+                    # Während der Synchronisation geändert: genau einmal nachziehen
+                    self.sync_pending = False
+        finally:
+            with self.lock:
+                self.sync_running = False
+    
+    def _wait_until_written(self, timeout: float = 300.0):
+        """
+        Wartet, bis sich Größe und Änderungszeit der Datei nicht mehr ändern
+        """
+        deadline = time.monotonic() + timeout
+        previous = None
+        
+        while time.monotonic() < deadline:
+            try:
+                stat = os.stat(self.csv_file_path)
+                current = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                current = None
+            
+            if current is not None and current == previous:
+                return
+            
+            previous = current
+            time.sleep(self.stable_seconds)
+        
+        self.logger.warning("CSV-Datei wird weiterhin geschrieben - synchronisiere trotzdem")
 
 class ProductSyncManager:
     """
     Hauptklasse für die Synchronisation von Produkten
+    
+    Args:
+        csv_file_path: CSV-Datei (Standard: CSV_FILE_PATH)
+        shopware_api: gemeinsam genutzte API-Verbindung (Standard: eigene Verbindung)
+        feed_name: Kurzname der Datei im Verzeichnismodus; Zustandsdateien
+                   (Snapshot, Checkpoint, Dead Letters) erhalten ihn als Zusatz
     """
     
-    def __init__(self):
+    def __init__(self, csv_file_path: Optional[str] = None, shopware_api: Optional[ShopwareAPI] = None,
+                 feed_name: Optional[str] = None):
         # Konfiguration laden
-        self.csv_file_path = config('CSV_FILE_PATH')
+        self.csv_file_path = csv_file_path or config('CSV_FILE_PATH')
+        self.feed_name = feed_name
         self.check_interval = int(config('CHECK_INTERVAL', 60))
+        self.sync_mode = config('SYNC_MODE', 'single').lower()
+        self.csv_chunk_size = int(config('CSV_CHUNK_SIZE', 10000))
+        self.sync_concurrency = max(1, int(config('SYNC_CONCURRENCY', 1)))
+        self.incremental_sync = config('INCREMENTAL_SYNC', 'false').lower() == 'true'
+        self.deactivate_deleted = config('DEACTIVATE_DELETED_PRODUCTS', 'false').lower() == 'true'
+        
+        # Fast Lane: reine Bestands-/Preisänderungen häufig und gebündelt übertragen,
+        # vollständige Produktdaten nur alle FULL_SYNC_INTERVAL Sekunden
+        self.fast_lane = config('FAST_LANE', 'false').lower() == 'true'
+        self.fast_lane_fields = [field.strip() for field in config('FAST_LANE_FIELDS', 'stock,price').split(',') if field.strip()]
+        self.fast_lane_batch_size = int(config('FAST_LANE_BATCH_SIZE', 2000))
+        self.fast_sync_interval = int(config('FAST_SYNC_INTERVAL', 30))
+        self.full_sync_interval = int(config('FULL_SYNC_INTERVAL', 900))
+        self.last_full_sync = None
+        self.deferred_changes = 0
+        if self.fast_lane:
+            # Die Fast Lane benötigt den Zeilenvergleich
+            self.incremental_sync = True
         
         # Komponenten initialisieren
-        self.csv_processor = CSVProcessor(self.csv_file_path)
-        self.shopware_api = ShopwareAPI()
+        self.shopware_api = shopware_api or ShopwareAPI()
+        self.csv_processor = CSVProcessor(
+            self.csv_file_path,
+            row_state_file_path=feed_state_path(config('ROW_STATE_FILE', './state/row_snapshot.json'), feed_name),
+            column_dtypes={**CSV_COLUMN_DTYPES, **self.shopware_api.transformer.column_dtypes},
+            fast_columns=[
+                field.column for field in self.shopware_api.transformer.mapping.fields
+                if field.target in self.fast_lane_fields and field.column
+            ] if self.fast_lane else None,
+            parse_mode=config('CSV_PARSE_MODE', 'default').lower(),
+            parse_workers=int(config('CSV_PARSE_WORKERS', 0)),
+            parse_block_size=int(config('CSV_PARSE_BLOCK_MB', 32)) * 1024 * 1024
+        )
+        self.dead_letters = DeadLetterFile(feed_state_path(config('DEAD_LETTER_FILE', default='') or None, feed_name))
+        self.checkpoint = SyncCheckpoint(feed_state_path(config('CHECKPOINT_FILE', default='') or None, feed_name))
+        
+        # Kennzahlen je Lauf (JSON-Datei) und optional Prometheus-Endpunkt im Dauerbetrieb;
+        # im Verzeichnismodus sammeln alle Feeds gemeinsame Kennzahlen
+        self.per_run_metrics = feed_name is None
+        self.metrics_file = config('METRICS_FILE', default='') or None
+        self.metrics_port = int(config('METRICS_PORT', 0))
+        self.metrics_host = config('METRICS_HOST', '127.0.0.1')
+        metrics.trace_spans = config('METRICS_TRACE_SPANS', 'false').lower() == 'true'
         
         # Logger konfigurieren
         self.setup_logging()
-        self.logger = logging.getLogger(__name__)
+        self.logger = logging.getLogger(__name__ if feed_name is None else f"{__name__}.{feed_name}")
         
-        # Erforderliche CSV-Spalten definieren
-        self.required_columns = [
-            'product_number',
-            'name',
-            'price',
-            'stock'
-        ]
+        # Erforderliche CSV-Spalten ergeben sich aus den Pflichtfeldern des Mappings
+        self.required_columns = self.shopware_api.transformer.required_columns
         
-    def setup_logging(self):
+    @staticmethod
+    def setup_logging():
         """
         Konfiguriert das Logging-System
         """
@@ -111,34 +276,371 @@ class ProductSyncManager:
         self.logger.info("Setup-Validierung erfolgreich")
         return True
     
-    def sync_products(self) -> bool:
+    def sync_products(self, resume: bool = False, fast_only: bool = False) -> bool:
         """
         Synchronisiert alle Produkte aus der CSV-Datei
+        
+        Die Datei wird blockweise gelesen und jeder Block direkt hochgeladen,
+        sodass der Speicherbedarf unabhängig von der Dateigröße bleibt. Nach
+        jedem Block wird ein Checkpoint geschrieben.
+        
+        Args:
+            resume: True, um einen unterbrochenen Lauf nach dem letzten
+                    gespeicherten Block fortzusetzen
+            fast_only: True, um nur die Fast-Lane-Felder (Bestand/Preis) zu
+                       übertragen; Inhaltsänderungen folgen im nächsten vollständigen Lauf
         """
-        self.logger.info("Starte Produktsynchronisation...")
+        self.logger.info("Starte Bestands-/Preis-Synchronisation..." if fast_only else "Starte Produktsynchronisation...")
+        if self.per_run_metrics:
+            metrics.reset()
+        
+        if not fast_only:
+            self.last_full_sync = time.monotonic()
+            self.deferred_changes = 0
         
-        # CSV-Daten lesen
-        csv_data = self.csv_processor.read_csv_data()
-        if not csv_data:
+        if self.incremental_sync:
+            self.csv_processor.begin_row_diff()
+        self.shopware_api.product_ids.reset_missing()
+        
+        row_count = 0
+        success_count = 0
+        errors = {}
+        failed_numbers = []
+        forgotten_numbers = []
+        
+        # Kurze Fast-Lane-Läufe verwenden keinen Checkpoint. Der Dateistand wird
+        # über stat erkannt, damit große Dateien nicht zusätzlich gehasht werden.
+        resume_after = 0 if fast_only else self.checkpoint.begin(
+            self.csv_file_path, self.csv_processor.file_version(), resume
+        )
+        if resume_after:
+            # Ergebnisse der bereits übertragenen Blöcke übernehmen
+            success_count, errors, failed_numbers = self.checkpoint.load_outcomes()
+            self.logger.info(f"Setze unterbrochene Synchronisation nach CSV-Zeile {resume_after} fort")
+        elif resume:
+            self.logger.info("Kein unterbrochener Lauf gefunden - starte vollständige Synchronisation")
+        
+        # Lese- und Synchronisationsfehler getrennt behandeln, damit die Meldung stimmt
+        frames = self.csv_processor.iter_csv_frames(self.csv_chunk_size)
+        while True:
+            try:
+                frame = next(frames, None)
+            except Exception as e:
+                self.logger.error(f"Fehler beim Lesen der CSV-Datei: {e}")
+                return self._abort_sync(row_count, success_count, len(errors))
+            if frame is None:
+                break
+            
+            row_count += len(frame)
+            first_row_number = int(frame.index[0])
+            last_row_number = int(frame.index[-1])
+            try:
+                fast_frame = frame.iloc[0:0]
+                if self.incremental_sync:
+                    # Nur neue und geänderte Zeilen synchronisieren (übersprungene
+                    # Blöcke werden trotzdem verglichen, damit der Snapshot vollständig ist)
+                    full_rows, fast_rows = self._changed_rows(frame, fast_only)
+                    fast_frame = frame[frame.index.isin([row_number for row_number, _ in fast_rows])]
+                    frame = frame[frame.index.isin([row_number for row_number, _ in full_rows])]
+                
+                # Bereits übertragene Zeilen überspringen
+                if resume_after:
+                    frame = frame[frame.index > resume_after]
+                    fast_frame = fast_frame[fast_frame.index > resume_after]
+                if frame.empty and fast_frame.empty:
+                    continue
+                
+                chunk_success, chunk_errors = self.sync_chunk(frame) if not frame.empty else (0, {})
+                fast_success, fast_errors = self.sync_fast_lane(fast_frame) if not fast_frame.empty else (0, {})
+                
+                success_count += chunk_success + fast_success
+                errors.update(chunk_errors)
+                errors.update(fast_errors)
+                failed_numbers += self._product_numbers(frame, chunk_errors)
+                # Fehlgeschlagene Fast-Lane-Zeilen im nächsten Lauf vollständig übertragen
+                forgotten_numbers += self._product_numbers(fast_frame, fast_errors)
+                
+                if not fast_only:
+                    self.checkpoint.commit(
+                        last_row_number,
+                        self._row_outcomes(frame, chunk_errors) + self._row_outcomes(fast_frame, fast_errors)
+                    )
+            except Exception as e:
+                self.logger.error(
+                    f"Fehler bei der Synchronisation der CSV-Zeilen {first_row_number}-{last_row_number}: {e}"
+                )
+                return self._abort_sync(row_count, success_count, len(errors))
+        
+        if row_count == 0:
             self.logger.error("Keine Daten aus CSV-Datei gelesen")
+            self.record_metrics(row_count, success_count, len(errors))
             return False
         
+        failed_deactivations = []
+        if self.incremental_sync:
+            deleted_numbers = self.csv_processor.finish_row_diff()
+            if deleted_numbers and self.deactivate_deleted:
+                failed_deactivations = self.deactivate_products(deleted_numbers)
+        
+        self.shopware_api.product_ids.save()
+        if self.incremental_sync:
+            self.csv_processor.commit_row_snapshot(failed_numbers + failed_deactivations, forgotten_numbers)
+        if not fast_only:
+            self.checkpoint.finish()
+        
+        error_count = len(errors) + len(failed_deactivations)
+        self.logger.info(f"Synchronisation abgeschlossen: {success_count} erfolgreich, {error_count} Fehler")
+        self.record_metrics(row_count, success_count, error_count)
+        return error_count == 0
+    
+    def _abort_sync(self, row_count: int, success_count: int, error_count: int) -> bool:
+        """
+        Beendet einen abgebrochenen Lauf: bekannte Produkt-IDs sichern, Kennzahlen schreiben
+        
+        Der Checkpoint bleibt erhalten, damit der Lauf fortgesetzt werden kann.
+        """
+        self.shopware_api.product_ids.save()
+        self.record_metrics(row_count, success_count, error_count)
+        return False
+    
+    def record_metrics(self, row_count: int, success_count: int, error_count: int):
+        """
+        Schließt die Kennzahlen des Laufs ab, protokolliert sie und schreibt die JSON-Datei
+        """
+        metrics.increment('rows_read', row_count)
+        metrics.increment('rows_synced', success_count)
+        metrics.increment('rows_failed', error_count)
+        if self.per_run_metrics:
+            metrics.finish()
+            self.logger.info(metrics.summary())
+        
+        if self.metrics_file:
+            metrics.write_json(self.metrics_file)
+    
+    def _changed_rows(self, frame, fast_only: bool = False) -> Tuple[List[Tuple[int, Dict]], List[Tuple[int, Dict]]]:
+        """
+        Ermittelt die geänderten Zeilen eines Blocks
+        
+        Returns:
+            Tuple (vollständig zu übertragende Zeilen, Zeilen für die Fast Lane)
+        """
+        rows = self.csv_processor.frame_to_rows(frame)
+        if not self.fast_lane:
+            return self.csv_processor.diff_row_chunk(rows), []
+        
+        changes = self.csv_processor.classify_row_chunk(rows)
+        if not fast_only:
+            return changes['inserted'] + changes['modified'], changes['fast']
+        
+        # Inhaltsänderungen auf den nächsten vollständigen Lauf verschieben,
+        # Bestand und Preis geänderter Produkte aber sofort übertragen
+        deferred = changes['inserted'] + changes['modified']
+        self.csv_processor.defer_row_changes(
+            str(row['product_number']) for _, row in deferred if row.get('product_number')
+        )
+        self.deferred_changes += len(deferred)
+        return [], sorted(changes['fast'] + changes['modified'], key=lambda item: item[0])
+    
+    @staticmethod
+    def _product_numbers(frame, errors: Dict[int, str]) -> List[str]:
+        """
+        Produktnummern der fehlgeschlagenen Zeilen eines Blocks
+        """
+        if not errors or 'product_number' not in frame.columns:
+            return []
+        return frame.loc[frame.index.isin(errors), 'product_number'].dropna().astype(str).tolist()
+    
+    @staticmethod
+    def _row_outcomes(frame, errors: Dict[int, str]) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """
+        Ergebnis je Zeile eines Blocks für den Checkpoint
+        """
+        if 'product_number' in frame.columns:
+            product_numbers = frame['product_number'].astype(object).where(frame['product_number'].notna(), None)
+        else:
+            product_numbers = [None] * len(frame)
+        
+        return [
+            (row_number, None if product_number is None else str(product_number), errors.get(row_number))
+            for row_number, product_number in zip(frame.index.tolist(), product_numbers)
+        ]
+    
+    def sync_chunk(self, frame) -> Tuple[int, Dict[int, str]]:
+        """
+        Synchronisiert einen DataFrame-Block im konfigurierten Modus und sichert
+        Fehlschläge in der Dead-Letter-Datei
+        """
+        if self.sync_mode == 'bulk':
+            success_count, errors = self.sync_frame_bulk(frame)
+        else:
+            success_count, errors = self.sync_rows(self.csv_processor.frame_to_rows(frame))
+        
+        if errors:
+            failed_rows = self.csv_processor.frame_to_rows(frame[frame.index.isin(errors)])
+            self.dead_letters.append(failed_rows, errors)
+        return success_count, errors
+    
+    def replay_dead_letters(self) -> bool:
+        """
+        Sendet die in der Dead-Letter-Datei gesicherten Zeilen erneut, ohne die CSV-Datei zu lesen
+        """
+        numbered_rows = self.dead_letters.take()
+        if not numbered_rows:
+            self.logger.info("Keine fehlgeschlagenen Zeilen zum erneuten Senden vorhanden")
+            return True
+        
+        self.logger.info(f"Sende {len(numbered_rows)} fehlgeschlagene Zeilen erneut...")
+        self.shopware_api.product_ids.reset_missing()
+        
+        success_count, errors = self.sync_chunk(self.csv_processor.rows_to_frame(numbered_rows))
+        self.shopware_api.product_ids.save()
+        
+        self.logger.info(f"Synchronisation abgeschlossen: {success_count} erfolgreich, {len(errors)} Fehler")
+        return not errors
+    
+    def sync_rows(self, numbered_rows) -> Tuple[int, Dict[int, str]]:
+        """
+        Synchronisiert die Zeilen einzeln (Suche + PATCH/POST je Produkt)
+        
+        Bis zu SYNC_CONCURRENCY Produkte werden parallel übertragen.
+        
+        Returns:
+            Tuple (Anzahl erfolgreicher Produkte, Fehler je CSV-Zeilennummer)
+        """
+        # Produkt-IDs (bzw. den aktuellen Stand) aller Zeilen vorab gesammelt abrufen
+        product_numbers = [str(row['product_number']) for _, row in numbered_rows if row.get('product_number')]
+        states = {}
+        if self.shopware_api.compare_before_update:
+            # Schlägt der Abruf fehl, werden die Produkte vollständig aktualisiert
+            states = self.shopware_api.fetch_product_states(product_numbers) or {}
+        else:
+            self.shopware_api.resolve_product_ids(product_numbers)
+        
         success_count = 0
-        error_count = 0
+        errors = {}
         
         # Jedes Produkt synchronisieren
-        for row in csv_data:
-            try:
-                if self.shopware_api.sync_product_from_csv_data(row):
+        with ThreadPoolExecutor(max_workers=self.sync_concurrency) as executor:
+            results = executor.map(
+                self._sync_row,
+                [row for _, row in numbered_rows],
+                [states.get(str(row.get('product_number'))) for _, row in numbered_rows]
+            )
+            
+            for (row_number, _), error in zip(numbered_rows, results):
+                if error is None:
                     success_count += 1
                 else:
-                    error_count += 1
-            except Exception as e:
-                self.logger.error(f"Fehler beim Synchronisieren des Produkts: {e}")
-                error_count += 1
+                    errors[row_number] = error
         
-        self.logger.info(f"Synchronisation abgeschlossen: {success_count} erfolgreich, {error_count} Fehler")
-        return error_count == 0
+        return success_count, errors
+    
+    def _sync_row(self, row: Dict, current_state: Optional[Dict] = None) -> Optional[str]:
+        """
+        Synchronisiert eine einzelne Zeile
+        
+        Returns:
+            None bei Erfolg, sonst eine Fehlermeldung
+        """
+        try:
+            if self.shopware_api.sync_product_from_csv_data(row, current_state):
+                return None
+            return "Synchronisation fehlgeschlagen"
+        except Exception as e:
+            self.logger.error(f"Fehler beim Synchronisieren des Produkts: {e}")
+            return str(e)
+    
+    def sync_fast_lane(self, frame) -> Tuple[int, Dict[int, str]]:
+        """
+        Überträgt nur die Fast-Lane-Felder (z.B. Bestand und Preis) in großen Batches
+        
+        Fehlgeschlagene Zeilen werden wie bei sync_chunk in der Dead-Letter-Datei
+        gesichert; das erneute Senden überträgt sie vollständig.
+        """
+        self.logger.info(f"Fast Lane: {len(frame)} Produkte mit geändertem Bestand/Preis")
+        metrics.increment('fast_lane_rows', len(frame))
+        success_count, errors = self.sync_frame_bulk(
+            frame, ['productNumber'] + self.fast_lane_fields, self.fast_lane_batch_size
+        )
+        
+        if errors:
+            failed_rows = self.csv_processor.frame_to_rows(frame[frame.index.isin(errors)])
+            self.dead_letters.append(failed_rows, errors)
+        return success_count, errors
+    
+    def sync_frame_bulk(self, frame, fields: Optional[List[str]] = None,
+                        batch_size: Optional[int] = None) -> Tuple[int, Dict[int, str]]:
+        """
+        Synchronisiert einen DataFrame-Block gebündelt über die Sync-API
+        
+        Die Produktdaten werden spaltenweise für den ganzen Block vorbereitet;
+        bis zu SYNC_CONCURRENCY Batches werden parallel übertragen.
+        
+        Args:
+            frame: DataFrame-Block
+            fields: nur diese Shopware-Felder senden (None = alle)
+            batch_size: Produkte je Sync-Anfrage (None = SYNC_BATCH_SIZE)
+        
+        Returns:
+            Tuple (Anzahl erfolgreicher Produkte, Fehler je CSV-Zeilennummer)
+        """
+        with metrics.span('transform'):
+            numbered_payloads, errors = self.shopware_api.transformer.transform_frame(frame)
+        
+        if fields is not None:
+            numbered_payloads = [
+                (row_number, {field: payload[field] for field in fields if field in payload})
+                for row_number, payload in numbered_payloads
+            ]
+        
+        batch_size = batch_size or self.shopware_api.batch_size
+        batches = [numbered_payloads[i:i + batch_size] for i in range(0, len(numbered_payloads), batch_size)]
+        
+        success_count = 0
+        
+        with ThreadPoolExecutor(max_workers=self.sync_concurrency) as executor:
+            for batch_success, batch_errors in executor.map(self.shopware_api.upsert_product_payloads, batches):
+                success_count += batch_success
+                errors.update(batch_errors)
+        
+        for row_number, message in sorted(errors.items()):
+            self.logger.error(f"CSV-Zeile {row_number}: {message}")
+        
+        return success_count, errors
+    
+    def deactivate_products(self, product_numbers) -> List[str]:
+        """
+        Deaktiviert Produkte, die aus der CSV-Datei entfernt wurden
+        
+        Die Deaktivierung wird in Batches von SYNC_BATCH_SIZE über die
+        Sync-API gesendet; Produkte, die es in Shopware nicht gibt, werden
+        übersprungen.
+        
+        Returns:
+            Liste der Produktnummern, die nicht deaktiviert werden konnten
+        """
+        product_numbers = list(product_numbers)
+        product_ids = self.shopware_api.resolve_product_ids(product_numbers)
+        if product_ids is None:
+            return product_numbers
+        
+        # Nur vorhandene Produkte senden, sonst würde der Upsert sie neu anlegen
+        numbered_payloads = [
+            (position, {'productNumber': product_number, 'active': False})
+            for position, product_number in enumerate(product_numbers)
+            if product_ids.get(product_number)
+        ]
+        batch_size = self.shopware_api.batch_size
+        
+        failed = []
+        for start in range(0, len(numbered_payloads), batch_size):
+            _, errors = self.shopware_api.upsert_product_payloads(numbered_payloads[start:start + batch_size])
+            for position, message in sorted(errors.items()):
+                self.logger.error(f"Produkt {product_numbers[position]} konnte nicht deaktiviert werden: {message}")
+                failed.append(product_numbers[position])
+        
+        self.logger.info(f"{len(product_numbers) - len(failed)} entfernte Produkte deaktiviert")
+        return failed
     
     def start_file_watcher(self):
         """
@@ -151,7 +653,12 @@ class ProductSyncManager:
         self.logger.info("Starte Dateiüberwachung...")
         
         try:
-            event_handler = CSVFileHandler(self.csv_file_path, self)
+            event_handler = CSVFileHandler(
+                self.csv_file_path,
+                self,
+                debounce_seconds=float(config('WATCH_DEBOUNCE_SECONDS', 2)),
+                stable_seconds=float(config('WATCH_STABLE_SECONDS', 0.5))
+            )
             observer = Observer()
             
             # Überwache das Verzeichnis der CSV-Datei
@@ -163,8 +670,13 @@ class ProductSyncManager:
             try:
                 while True:
                     time.sleep(1)
+                    
+                    # Von der Fast Lane verschobene Inhaltsänderungen nachziehen
+                    if self.full_sync_due() and not (event_handler.sync_pending or event_handler.sync_running):
+                        event_handler.schedule_sync()
             except KeyboardInterrupt:
                 self.logger.info("Dateiüberwachung wird beendet...")
+                event_handler.stop()
                 observer.stop()
             
             observer.join()
@@ -178,21 +690,45 @@ class ProductSyncManager:
         """
         Startet die intervallbasierte Synchronisation
         """
-        self.logger.info(f"Starte intervallbasierte Synchronisation (alle {self.check_interval} Sekunden)...")
+        check_interval = self.fast_sync_interval if self.fast_lane else self.check_interval
+        self.logger.info(f"Starte intervallbasierte Synchronisation (alle {check_interval} Sekunden)...")
         
         try:
             while True:
                 if self.csv_processor.has_file_changed():
                     self.logger.info("CSV-Datei hat sich geändert - starte Synchronisation")
+                    self.sync_changes()
+                elif self.full_sync_due():
+                    self.logger.info("Übertrage verschobene Inhaltsänderungen")
                     self.sync_products()
                 else:
                     self.logger.debug("Keine Änderungen in CSV-Datei erkannt")
                 
-                time.sleep(self.check_interval)
+                time.sleep(check_interval)
                 
         except KeyboardInterrupt:
             self.logger.info("Intervall-Synchronisation wird beendet...")
     
+    def full_sync_due(self) -> bool:
+        """
+        Prüft, ob verschobene Inhaltsänderungen jetzt vollständig übertragen werden sollen
+        """
+        if not self.deferred_changes:
+            return False
+        return self.last_full_sync is None or time.monotonic() - self.last_full_sync >= self.full_sync_interval
+    
+    def sync_changes(self) -> bool:
+        """
+        Synchronisiert eine geänderte CSV-Datei
+        
+        Mit Fast Lane werden zunächst nur Bestand und Preis übertragen;
+        Inhaltsänderungen folgen spätestens nach FULL_SYNC_INTERVAL Sekunden.
+        """
+        # Der erste Lauf überträgt immer alle Felder
+        if self.fast_lane and self.last_full_sync is not None and not self.full_sync_due():
+            return self.sync_products(fast_only=True)
+        return self.sync_products()
+    
     def run_once(self):
         """
         Führt eine einmalige Synchronisation durch
@@ -202,7 +738,40 @@ class ProductSyncManager:
         if not self.validate_setup():
             return False
         
-        return self.sync_products()
+        try:
+            return self.sync_products()
+        finally:
+            self.shopware_api.close()
+    
+    def run_resume(self) -> bool:
+        """
+        Setzt eine unterbrochene Synchronisation nach dem letzten Checkpoint fort
+        """
+        self.logger.info("Setze Synchronisation fort...")
+        
+        if not self.checkpoint.file_path:
+            self.logger.warning("CHECKPOINT_FILE nicht konfiguriert - führe vollständige Synchronisation durch")
+        
+        if not self.validate_setup():
+            return False
+        
+        try:
+            return self.sync_products(resume=True)
+        finally:
+            self.shopware_api.close()
+    
+    def run_replay(self) -> bool:
+        """
+        Sendet die Zeilen aus der Dead-Letter-Datei erneut
+        """
+        if not self.shopware_api.authenticate():
+            self.logger.error("Shopware API Authentifizierung fehlgeschlagen")
+            return False
+        
+        try:
+            return self.replay_dead_letters()
+        finally:
+            self.shopware_api.close()
     
     def run_continuous(self, mode='watcher'):
         """
@@ -214,6 +783,9 @@ class ProductSyncManager:
         if not self.validate_setup():
             return
         
+        if self.metrics_port:
+            start_metrics_server(self.metrics_port, self.metrics_host)
+        
         # Initiale Synchronisation
         self.sync_products()
         
@@ -237,8 +809,12 @@ if __name__ == "__main__":
             sync_manager.run_continuous('watcher')
         elif sys.argv[1] == 'interval':
             sync_manager.run_continuous('interval')
+        elif sys.argv[1] == 'resume':
+            sync_manager.run_resume()
+        elif sys.argv[1] == 'replay':
+            sync_manager.run_replay()
         else:
-            print("Verwendung: python sync_manager.py [once|watcher|interval]")
+            print("Verwendung: python sync_manager.py [once|resume|watcher|interval|replay]")
     else:
         # Standard: Dateiüberwachung
         sync_manager.run_continuous('watcher')
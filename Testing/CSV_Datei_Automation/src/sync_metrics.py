@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+import functools
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Anzahl Messwerte je Phase für die Perzentile (Reservoir-Stichprobe)
+SAMPLE_SIZE = 10000
+
+class PhaseStats:
+    """
+    Laufzeiten einer Phase: Anzahl, Summe, Maximum und Stichprobe für Perzentile
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(seconds)
+        else:
+            # Jeder Messwert landet mit gleicher Wahrscheinlichkeit in der Stichprobe
+            index = random.randrange(self.count)
+            if index < SAMPLE_SIZE:
+                self.samples[index] = seconds
+
+    def percentile(self, percent: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total_s': round(self.total, 4),
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+
+class SyncMetrics:
+    """
+    Thread-sichere Kennzahlen eines Synchronisationslaufs
+
+    Zähler (z.B. gesendete Bytes, Wiederholungen) und Laufzeiten je Phase
+    (z.B. CSV-Parsing, Umwandlung, Suche, Aktualisierung) werden gesammelt
+    und als JSON-Datei oder im Prometheus-Textformat ausgegeben.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.trace_spans = False
+        self.logger = logging.getLogger(__name__)
+        self.reset()
+
+    def reset(self):
+        """
+        Beginnt einen neuen Lauf
+        """
+        with self.lock:
+            self.started_at = datetime.now()
+            self.started = time.perf_counter()
+            self.finished = None
+            self.counters = Counter()
+            self.phases: Dict[str, PhaseStats] = {}
+
+    def finish(self):
+        """
+        Beendet den Lauf (Dauer und Durchsatz beziehen sich auf diesen Zeitpunkt)
+        """
+        with self.lock:
+            self.finished = time.perf_counter()
+
+    def increment(self, name: str, value: float = 1):
+        with self.lock:
+            self.counters[name] += value
+
+    def observe(self, phase: str, seconds: float):
+        with self.lock:
+            stats = self.phases.get(phase)
+            if stats is None:
+                stats = self.phases[phase] = PhaseStats()
+            stats.observe(seconds)
+
+        if self.trace_spans:
+            self.logger.info(f"Span {phase}: {seconds * 1000:.1f} ms")
+
+    @contextmanager
+    def span(self, phase: str):
+        """
+        Misst die Laufzeit des Blocks als Phase (auch bei Ausnahmen)
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def timed_iter(self, phase: str, iterable: Iterable) -> Iterator:
+        """
+        Misst die Zeit, die das Erzeugen jedes Elements eines Iterators benötigt
+        """
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(phase, time.perf_counter() - started)
+            yield item
+
+    def snapshot(self) -> Dict:
+        """
+        Kennzahlen des aktuellen bzw. letzten Laufs
+        """
+        with self.lock:
+            duration = (self.finished or time.perf_counter()) - self.started
+            rows_synced = self.counters.get('rows_synced', 0)
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'finished': self.finished is not None,
+                'duration_s': round(duration, 3),
+                'rows_per_s': round(rows_synced / duration, 1) if duration > 0 else 0.0,
+                'counters': dict(self.counters),
+                'phases': {phase: stats.to_dict() for phase, stats in sorted(self.phases.items())}
+            }
+
+    def write_json(self, file_path: str) -> bool:
+        """
+        Schreibt die Kennzahlen atomar in eine JSON-Datei
+        """
+        try:
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            temp_path = f"{file_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(temp_path, file_path)
+            return True
+
+        except OSError as e:
+            self.logger.error(f"Kennzahlen konnten nicht gespeichert werden: {e}")
+            return False
+
+    def render_prometheus(self) -> str:
+        """
+        Gibt die Kennzahlen im Prometheus-Textformat aus
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP shopware_sync_duration_seconds Dauer des aktuellen bzw. letzten Laufs",
+            "# TYPE shopware_sync_duration_seconds gauge",
+            f"shopware_sync_duration_seconds {snapshot['duration_s']}",
+            "# HELP shopware_sync_rows_per_second Erfolgreich synchronisierte Zeilen pro Sekunde",
+            "# TYPE shopware_sync_rows_per_second gauge",
+            f"shopware_sync_rows_per_second {snapshot['rows_per_s']}",
+            "# HELP shopware_sync_running 1, solange ein Lauf aktiv ist",
+            "# TYPE shopware_sync_running gauge",
+            f"shopware_sync_running {0 if snapshot['finished'] else 1}"
+        ]
+
+        for name, value in sorted(snapshot['counters'].items()):
+            lines += [
+                f"# TYPE shopware_sync_{name} gauge",
+                f"shopware_sync_{name} {value}"
+            ]
+
+        lines += [
+            "# HELP shopware_sync_phase_seconds Laufzeit je Phase",
+            "# TYPE shopware_sync_phase_seconds summary"
+        ]
+        for phase, stats in snapshot['phases'].items():
+            lines += [
+                f'shopware_sync_phase_seconds{{phase="{phase}",quantile="0.5"}} {stats["p50_ms"] / 1000}',
+                f'shopware_sync_phase_seconds{{phase="{phase}",quantile="0.99"}} {stats["p99_ms"] / 1000}',
+                f'shopware_sync_phase_seconds_sum{{phase="{phase}"}} {stats["total_s"]}',
+                f'shopware_sync_phase_seconds_count{{phase="{phase}"}} {stats["count"]}'
+            ]
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        Kurze Zusammenfassung der Laufzeiten für das Log
+        """
+        snapshot = self.snapshot()
+        phases = ", ".join(
+            f"{phase} {stats['total_s']:.2f}s/{stats['count']}x"
+            for phase, stats in snapshot['phases'].items()
+        )
+        counters = snapshot['counters']
+        return (
+            f"Laufzeit {snapshot['duration_s']:.1f}s ({snapshot['rows_per_s']} Zeilen/s), "
+            f"{counters.get('http_requests', 0):.0f} Anfragen, {counters.get('retries', 0):.0f} Wiederholungen, "
+            f"{counters.get('bytes_sent', 0) / 1024:.0f} KB gesendet - {phases}"
+        )
+
+
+# Gemeinsame Kennzahlen aller Komponenten
+metrics = SyncMetrics()
+
+def timed(phase: str) -> Callable:
+    """
+    Dekorator: misst jeden Aufruf der Funktion als Phase
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.span(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Liefert /metrics (Prometheus) und /stats (JSON)
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            body = metrics.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/stats':
+            body = json.dumps(metrics.snapshot(), indent=2).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(port: int, host: str = '127.0.0.1') -> Optional[ThreadingHTTPServer]:
+    """
+    Startet den Metrik-Endpunkt in einem Hintergrund-Thread
+
+    Standardmäßig nur lokal erreichbar; für einen entfernten Prometheus
+    METRICS_HOST=0.0.0.0 setzen.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logging.getLogger(__name__).error(f"Metrik-Endpunkt konnte nicht gestartet werden: {e}")
+        return None
+
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.getLogger(__name__).info(f"Metrik-Endpunkt: http://{host}:{port}/metrics")
+    return server
@@ -7,10 +7,15 @@ Dieses Skript testet die verschiedenen Komponenten des Systems.
 
 import sys
 import os
+import tempfile
 
 # Pfad zum src-Verzeichnis hinzufügen
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+# Log- und Kennzahlendateien der Tests nicht im Projektverzeichnis ablegen
+# (das Logging bleibt nach dem ersten Test auf diese Datei eingestellt)
+TEST_LOG_DIR = tempfile.mkdtemp(prefix='shopware_sync_test_')
+
 def test_csv_processor():
     """Test der CSV-Verarbeitung"""
     print("🧪 Teste CSV-Processor...")
@@ -53,6 +58,876 @@ def test_csv_processor():
         print(f"❌ Unerwarteter Fehler: {e}")
         return False
 
+def test_row_diff():
+    """Test der zeilenweisen Änderungserkennung"""
+    print("\n🧪 Teste Zeilenvergleich...")
+    
+    from csv_processor import CSVProcessor
+    
+    with tempfile.TemporaryDirectory() as state_dir:
+        state_file = os.path.join(state_dir, 'rows.json')
+        
+        processor = CSVProcessor('./data/products.csv', row_state_file_path=state_file)
+        rows = list(enumerate(processor.read_csv_data(), start=2))
+        
+        changes = processor.diff_rows(rows)
+        assert len(changes['inserted']) == len(rows), "Erster Lauf erkennt nicht alle Zeilen als neu"
+        processor.commit_row_snapshot()
+        
+        # Neuer Prozessor lädt den gespeicherten Snapshot
+        processor = CSVProcessor('./data/products.csv', row_state_file_path=state_file)
+        rows[0][1]['stock'] = -1
+        removed = rows.pop()
+        
+        changes = processor.diff_rows(rows)
+        assert [row_number for row_number, _ in changes['modified']] == [2] and not changes['inserted'], \
+            "Geänderte Zeile nicht korrekt erkannt"
+        assert changes['deleted'] == [str(removed[1]['product_number'])], "Entfernte Zeile nicht erkannt"
+        
+        # Fast Lane: reine Bestandsänderung getrennt von Inhaltsänderungen
+        processor = CSVProcessor('./data/products.csv', row_state_file_path=state_file, fast_columns=['stock', 'price'])
+        processor.diff_rows(rows)
+        processor.commit_row_snapshot()
+        rows[0][1]['stock'] = 5
+        processor.begin_row_diff()
+        changes = processor.classify_row_chunk(rows)
+        assert [row_number for row_number, _ in changes['fast']] == [2] and not changes['modified'], \
+            "Reine Bestandsänderung nicht für die Fast Lane erkannt"
+    
+    print("✅ Zeilenvergleich erkennt neue, geänderte und entfernte Zeilen")
+
+def test_row_numbers():
+    """Test: Zeilennummern entsprechen den Zeilen der CSV-Datei"""
+    print("\n🧪 Teste CSV-Zeilennummern...")
+    
+    import tempfile
+    import pandas as pd
+    from csv_processor import PYARROW_AVAILABLE, CSVProcessor
+    
+    with tempfile.TemporaryDirectory() as state_dir:
+        csv_path = os.path.join(state_dir, 'products.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write('product_number,name,description,price,stock\n'
+                    'L1,Produkt 1,"zwei\nZeilen",1.00,1\n'
+                    '\n'
+                    'L2,Produkt 2,einfach,2.00,2\n'
+                    'L3,Produkt 3,"drei\nlange\nZeilen",3.00,3\n'
+                    'L4,Produkt 4,x,4.00,4\n')
+        
+        # Leere Zeilen und Umbrüche in Anführungszeichen zählen mit, auch über Blockgrenzen
+        modes = ['default', 'processes'] + (['pyarrow'] if PYARROW_AVAILABLE else [])
+        for parse_mode in modes:
+            processor = CSVProcessor(csv_path, parse_mode=parse_mode, parse_workers=2)
+            processor.parse_block_size = 64
+            frame = pd.concat(processor.iter_csv_frames(2))
+            assert list(frame['product_number']) == ['L1', 'L2', 'L3', 'L4'], \
+                f"Modus {parse_mode}: falsche Datensätze {list(frame['product_number'])}"
+            assert list(frame.index) == [2, 5, 6, 9], f"Modus {parse_mode}: falsche Zeilennummern {list(frame.index)}"
+    
+    print("✅ Zeilennummern zählen leere Zeilen und mehrzeilige Werte mit")
+
+def test_parallel_parse():
+    """Test des parallelen CSV-Parsings"""
+    print("\n🧪 Teste paralleles CSV-Parsing...")
+    
+    import pandas as pd
+    from csv_processor import CSVProcessor
+    
+    expected = pd.concat(CSVProcessor('./data/products.csv').iter_csv_frames(2))
+    
+    # Byte-Bereiche im Prozesspool müssen dieselben Blöcke und Zeilennummern liefern
+    processor = CSVProcessor('./data/products.csv', parse_mode='processes', parse_workers=2)
+    processor.parse_block_size = 64
+    parsed = pd.concat(processor.iter_csv_frames(2))
+    
+    assert parsed.equals(expected) and list(parsed.index) == list(expected.index), \
+        "Parallel gelesene Daten weichen ab"
+    
+    from csv_processor import PYARROW_AVAILABLE
+    if PYARROW_AVAILABLE:
+        # pyarrow leitet Typen aus dem ersten Block ab: ein späterer Text in einer
+        # Zahlenspalte darf das Lesen nicht abbrechen
+        import tempfile
+        with tempfile.TemporaryDirectory() as state_dir:
+            csv_path = os.path.join(state_dir, 'products.csv')
+            with open(csv_path, 'w', encoding='utf-8') as f:
+                f.write('product_number,name,price,stock,tax_rate\n')
+                for i in range(5000):
+                    f.write(f'ARW{i},Produkt {i},{i}.99,{i},{"abc" if i == 4999 else 19}\n')
+            
+            processor = CSVProcessor(csv_path, parse_mode='pyarrow')
+            processor.parse_block_size = 16 * 1024
+            parsed = pd.concat(processor.iter_csv_frames(1000))
+        
+        assert len(parsed) == 5000 and list(parsed.index[[0, -1]]) == [2, 5001], "pyarrow liest nicht alle Zeilen"
+        assert parsed['tax_rate'].iloc[-1] == 'abc', "Abweichender Wert einer nicht deklarierten Spalte verloren"
+    
+    print("✅ Paralleles Parsing liefert dieselben Zeilen in Dateireihenfolge")
+
+def test_vectorized_transform():
+    """Test: spaltenweise Umwandlung entspricht der zeilenweisen (Standard-Mapping)"""
+    print("\n🧪 Teste spaltenweise Umwandlung...")
+    
+    from csv_processor import CSVProcessor
+    from product_transformer import ProductTransformer
+    
+    transformer = ProductTransformer()
+    with tempfile.TemporaryDirectory() as state_dir:
+        csv_path = os.path.join(state_dir, 'products.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            # Leere optionale Felder, Steuersatz/Währung je Zeile, Wahrheitswerte als Text
+            f.write('product_number,name,description,price,stock,weight,ean,active,tax_rate,currency_id\n')
+            f.write('VEC1,Produkt 1,Beschreibung,19.99,5,0.5,4006381333931,true,,\n')
+            f.write('VEC2,Produkt 2,,10,0,,,false,7,\n')
+            f.write('VEC3,"Produkt, 3",Text,0.99,12,1.25,,0,19,a1b2c3\n')
+            f.write('004,Produkt 4,,100.5,3,,0123,,,\n')
+        
+        processor = CSVProcessor(csv_path, column_dtypes=transformer.column_dtypes)
+        frame = next(processor.iter_csv_frames(1000))
+    
+    payloads, errors = transformer.transform_frame(frame)
+    expected = [(row_number, transformer.transform_row(row)) for row_number, row in processor.frame_to_rows(frame)]
+    assert not errors, f"Unerwartete Fehler: {errors}"
+    assert payloads == expected, "Spaltenweise Umwandlung weicht von der zeilenweisen ab"
+    
+    products = dict(payloads)
+    assert products[3]['active'] is False and products[4]['active'] is False, "Wahrheitswerte falsch gelesen"
+    assert products[5]['productNumber'] == '004' and products[5]['ean'] == '0123', "Führende Nullen verloren"
+    assert 'weight' not in products[3] and 'ean' not in products[3], "Leere optionale Felder gesendet"
+    assert products[4]['price'][0]['currencyId'] == 'a1b2c3', "Währung je Zeile ignoriert"
+    
+    print(f"✅ {len(payloads)} Zeilen spalten- und zeilenweise gleich umgewandelt")
+
+def test_field_mapping():
+    """Test des Mappings CSV -> Shopware"""
+    print("\n🧪 Teste Feld-Mapping...")
+    
+    from csv_processor import CSVProcessor
+    from field_mapping import load_mapping
+    from product_transformer import ProductTransformer
+    
+    transformer = ProductTransformer(mapping=load_mapping('./mappings/standard.json'))
+    processor = CSVProcessor('./data/products.csv')
+    frame = next(processor.iter_csv_frames(1000))
+    
+    # Spaltenweise und zeilenweise Umwandlung müssen dasselbe Ergebnis liefern
+    payloads, errors = transformer.transform_frame(frame)
+    rows = processor.frame_to_rows(frame)
+    expected = [(row_number, transformer.transform_row(row)) for row_number, row in rows]
+    assert not errors and payloads == expected, "Spaltenweise Umwandlung weicht von der zeilenweisen ab"
+    
+    # Fehlende Pflichtfelder werden je Zeile gemeldet
+    frame.loc[frame.index[0], 'price'] = None
+    _, errors = transformer.transform_frame(frame)
+    assert list(errors) == [frame.index[0]], "Fehlendes Pflichtfeld nicht erkannt"
+    
+    # Ungültige Zahlen werden mit dem Standard-Mapping je Zeile gemeldet
+    frame = next(processor.iter_csv_frames(1000))
+    frame.loc[frame.index[1], 'stock'] = 'viele'
+    payloads, errors = ProductTransformer().transform_frame(frame)
+    assert list(errors) == [frame.index[1]] and 'keine ganze Zahl' in errors[frame.index[1]], \
+        "Ungültige Zahl nicht je Zeile gemeldet"
+    assert [row_number for row_number, _ in payloads] == [frame.index[0], frame.index[2]], \
+        "Gültige Zeilen nicht umgewandelt"
+    
+    # Bestand mit Nachkommastellen oder Überlauf, Preis als Text: spalten- und zeilenweise abgelehnt
+    transformer = ProductTransformer()
+    for column, value, message in (('stock', '2.7', 'keine ganze Zahl'), ('stock', '1e20', 'keine ganze Zahl'),
+                                   ('price', 'abc', 'keine gültige Zahl'), ('price', 'inf', 'keine gültige Zahl')):
+        frame = next(processor.iter_csv_frames(1000))
+        frame.loc[frame.index[0], column] = value
+        _, errors = transformer.transform_frame(frame)
+        assert list(errors) == [frame.index[0]] and message in errors[frame.index[0]], \
+            f"{column}='{value}' nicht als '{message}' gemeldet: {errors}"
+        
+        row = processor.frame_to_rows(frame)[0][1]
+        try:
+            transformer.transform_row(row)
+        except ValueError as e:
+            assert message in str(e), f"Zeilenweise falsche Meldung für {column}='{value}': {e}"
+        else:
+            raise AssertionError(f"{column}='{value}' zeilenweise nicht abgelehnt")
+    
+    print(f"✅ Mapping mit {len(transformer.mapping.fields)} Feldern korrekt angewendet")
+
+def mock_sync_env(server, state_dir: str, **overrides) -> dict:
+    """Umgebung für eine Synchronisation gegen den Mock-Server (Zustand und Logs im Temp-Verzeichnis)"""
+    env = {
+        'SHOPWARE_URL': server.url,
+        'SHOPWARE_API_USERNAME': 'test',
+        'SHOPWARE_API_PASSWORD': 'test',
+        'CSV_FILE_PATH': './data/products.csv',
+        'SYNC_MODE': 'bulk',
+        'INCREMENTAL_SYNC': 'false',
+        'SHOPWARE_RATE_LIMIT': '0',
+        'PRODUCT_ID_CACHE_FILE': '',
+        'CHECKPOINT_FILE': '',
+        'DEAD_LETTER_FILE': os.path.join(state_dir, 'dead_letter.jsonl'),
+        'LOG_FILE': os.path.join(TEST_LOG_DIR, 'shopware_sync.log'),
+        'METRICS_FILE': os.path.join(TEST_LOG_DIR, 'sync_metrics.json')
+    }
+    env.update(overrides)
+    return env
+
+def test_mock_sync():
+    """Test einer vollständigen Synchronisation gegen den lokalen Shopware-Mock"""
+    print("\n🧪 Teste Synchronisation gegen Mock-Server...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from sync_manager import ProductSyncManager
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            for sync_mode in ('single', 'bulk'):
+                server.state.reset()
+                with mock.patch.dict(os.environ, mock_sync_env(server, state_dir, SYNC_MODE=sync_mode)):
+                    assert ProductSyncManager().run_once(), f"Synchronisation im Modus {sync_mode} fehlgeschlagen"
+                
+                stats = server.state.stats()
+                assert stats['products'] == 3, f"Modus {sync_mode}: Produkte nicht im Mock-Shop angelegt"
+                # Neue Produkte werden nach der Sammelsuche nicht einzeln nachgeschlagen
+                assert stats['requests'].get('search') == 1, \
+                    f"Modus {sync_mode}: {stats['requests'].get('search')} Suchanfragen statt einer"
+    finally:
+        server.stop()
+    
+    print("✅ Synchronisation (single und bulk) gegen Mock-Server erfolgreich")
+
+def test_concurrent_sync():
+    """Test: bis zu SYNC_CONCURRENCY Anfragen laufen gleichzeitig, alle Zeilen kommen an"""
+    print("\n🧪 Teste parallele Synchronisation...")
+    
+    import time
+    import threading
+    from unittest import mock
+    from mock_shopware import MockShopwareHandler, MockShopwareServer
+    from sync_manager import ProductSyncManager
+    
+    in_flight = [0, 0]  # aktuell, maximal
+    lock = threading.Lock()
+    original = MockShopwareHandler._simulate
+    
+    def counting_simulate(handler, endpoint):
+        if endpoint not in ('create', 'sync'):
+            return original(handler, endpoint)
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        try:
+            time.sleep(0.02)
+            return original(handler, endpoint)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            csv_path = os.path.join(state_dir, 'products.csv')
+            with open(csv_path, 'w', encoding='utf-8') as f:
+                f.write('product_number,name,price,stock\n')
+                for i in range(40):
+                    f.write(f'PAR{i},Produkt {i},{10 + i}.99,{i}\n')
+            
+            for sync_mode in ('single', 'bulk'):
+                server.state.reset()
+                in_flight[1] = 0
+                env = mock_sync_env(server, state_dir, CSV_FILE_PATH=csv_path, SYNC_MODE=sync_mode,
+                                    SYNC_CONCURRENCY='4', SYNC_BATCH_SIZE='5')
+                with mock.patch.dict(os.environ, env), \
+                        mock.patch.object(MockShopwareHandler, '_simulate', counting_simulate):
+                    assert ProductSyncManager().run_once(), f"Synchronisation im Modus {sync_mode} fehlgeschlagen"
+                
+                assert sorted(server.state.numbers) == sorted(f'PAR{i}' for i in range(40)), \
+                    f"Modus {sync_mode}: nicht alle Produkte angelegt"
+                assert 2 <= in_flight[1] <= 4, \
+                    f"Modus {sync_mode}: {in_flight[1]} gleichzeitige Anfragen bei SYNC_CONCURRENCY=4"
+    finally:
+        server.stop()
+    
+    print("✅ Zeilen und Batches parallel mit höchstens SYNC_CONCURRENCY Anfragen übertragen")
+
+def test_invalid_number():
+    """Test: eine ungültige Zahl lässt nur ihre Zeile scheitern"""
+    print("\n🧪 Teste ungültige Zahlen in der CSV-Datei...")
+    
+    from unittest import mock
+    from dead_letter import DeadLetterFile
+    from mock_shopware import MockShopwareServer
+    from sync_manager import ProductSyncManager
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            csv_path = os.path.join(state_dir, 'products.csv')
+            with open('./data/products.csv', 'r', encoding='utf-8') as f:
+                content = f.read()
+            with open(csv_path, 'w', encoding='utf-8') as f:
+                f.write(content.replace(',49.99,', ',oops,'))
+            
+            for sync_mode in ('single', 'bulk'):
+                server.state.reset()
+                env = mock_sync_env(server, state_dir, CSV_FILE_PATH=csv_path, SYNC_MODE=sync_mode,
+                                    DEAD_LETTER_FILE=os.path.join(state_dir, f'dead_letter_{sync_mode}.jsonl'))
+                with mock.patch.dict(os.environ, env):
+                    assert not ProductSyncManager().run_once(), f"Modus {sync_mode}: Fehler nicht gemeldet"
+                
+                assert server.state.stats()['products'] == 2, f"Modus {sync_mode}: gültige Zeilen nicht übertragen"
+                failed = DeadLetterFile(env['DEAD_LETTER_FILE']).take()
+                assert [row_number for row_number, _ in failed] == [3], \
+                    f"Modus {sync_mode}: fehlerhafte Zeile nicht gesichert"
+    finally:
+        server.stop()
+    
+    print("✅ Ungültige Zahl wird je Zeile gemeldet, übrige Zeilen werden synchronisiert")
+
+def test_sync_errors():
+    """Test: Fehler der Sync-API werden über den JSON-Pointer den CSV-Zeilen zugeordnet"""
+    print("\n🧪 Teste Fehlerzuordnung der Sync-API...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from shopware_api import ShopwareAPI
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir, \
+                mock.patch.dict(os.environ, mock_sync_env(server, state_dir)):
+            api = ShopwareAPI()
+            assert api.authenticate(), "Authentifizierung am Mock fehlgeschlagen"
+            
+            # Zeile 11 fehlt der Name (Pointer /write-product/1/...), Zeile 13 wiederholt SW001
+            success_count, errors = api.upsert_product_payloads([
+                (10, {'productNumber': 'SW001', 'name': 'Alt', 'stock': 1}),
+                (11, {'productNumber': 'SW002', 'stock': 2}),
+                (12, {'productNumber': 'SW003', 'name': 'Produkt 3', 'stock': 3}),
+                (13, {'productNumber': 'SW001', 'name': 'Neu', 'stock': 4})
+            ])
+            api.close()
+        
+        assert list(errors) == [11], f"Fehler falschen Zeilen zugeordnet: {errors}"
+        assert success_count == 3, f"Unerwartete Erfolgsanzahl: {success_count}"
+        assert sorted(server.state.numbers) == ['SW001', 'SW003'], "Gültige Zeilen nicht übertragen"
+        product = server.state.products[server.state.numbers['SW001']]
+        assert product['name'] == 'Neu', "Doppelte Produktnummer: nicht die letzte Zeile übernommen"
+    finally:
+        server.stop()
+    
+    print("✅ Fehler je CSV-Zeile zugeordnet, doppelte Produktnummer nur einmal gesendet")
+
+def test_checkpoint_resume():
+    """Test: ein abgebrochener Lauf setzt nach dem letzten gespeicherten Block fort"""
+    print("\n🧪 Teste Fortsetzen nach Abbruch...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from sync_manager import ProductSyncManager
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            csv_path = os.path.join(state_dir, 'products.csv')
+            with open(csv_path, 'w', encoding='utf-8') as f:
+                f.write('product_number,name,price,stock\n')
+                for i in range(5):
+                    f.write(f'RES{i},Produkt {i},{10 + i}.99,{i}\n')
+            
+            env = mock_sync_env(server, state_dir, CSV_FILE_PATH=csv_path, CSV_CHUNK_SIZE='2',
+                                CHECKPOINT_FILE=os.path.join(state_dir, 'checkpoint.db'))
+            with mock.patch.dict(os.environ, env):
+                # Abbruch beim zweiten Block: nur der erste Block ist gespeichert
+                original = ProductSyncManager.sync_chunk
+                calls = []
+                
+                def crash_after_first_chunk(manager, frame):
+                    calls.append(len(frame))
+                    if len(calls) == 2:
+                        raise RuntimeError("Abbruch")
+                    return original(manager, frame)
+                
+                with mock.patch.object(ProductSyncManager, 'sync_chunk', crash_after_first_chunk):
+                    assert not ProductSyncManager().run_once(), "Abbruch nicht gemeldet"
+                assert server.state.stats()['products'] == 2, "Erster Block nicht übertragen"
+                
+                server.state.reset()
+                assert ProductSyncManager().run_resume(), "Fortgesetzter Lauf fehlgeschlagen"
+            
+            numbers = sorted(server.state.numbers)
+            assert numbers == ['RES2', 'RES3', 'RES4'], f"Falsche Zeilen fortgesetzt: {numbers}"
+    finally:
+        server.stop()
+    
+    print("✅ Fortgesetzter Lauf überträgt nur die noch offenen Blöcke")
+
+def test_sync_failure_messages():
+    """Test: Lese- und Synchronisationsfehler werden unterschiedlich gemeldet"""
+    print("\n🧪 Teste Fehlermeldungen bei Abbruch...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from sync_manager import ProductSyncManager
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            broken_path = os.path.join(state_dir, 'broken.csv')
+            with open(broken_path, 'wb') as f:
+                f.write(b'product_number,name,price,stock\nSW1,Kaputt \xff\xfe,1.00,1\n')
+            
+            with mock.patch.dict(os.environ, mock_sync_env(server, state_dir, CSV_FILE_PATH=broken_path)):
+                manager = ProductSyncManager()
+                with mock.patch.object(manager.logger, 'error') as log_error:
+                    # sync_products direkt, da run_once die Datei vorher schon prüft
+                    assert not manager.sync_products(), "Lesefehler nicht gemeldet"
+                messages = [call.args[0] for call in log_error.call_args_list]
+                assert any(message.startswith("Fehler beim Lesen der CSV-Datei") for message in messages), \
+                    f"Lesefehler falsch gemeldet: {messages}"
+            
+            with mock.patch.dict(os.environ, mock_sync_env(server, state_dir)):
+                manager = ProductSyncManager()
+                with mock.patch.object(manager.logger, 'error') as log_error, \
+                        mock.patch.object(manager, 'sync_chunk', side_effect=RuntimeError("API nicht erreichbar")):
+                    assert not manager.sync_products(), "Synchronisationsfehler nicht gemeldet"
+                messages = [call.args[0] for call in log_error.call_args_list]
+                assert any(message.startswith("Fehler bei der Synchronisation der CSV-Zeilen 2-") for message in messages), \
+                    f"Synchronisationsfehler falsch gemeldet: {messages}"
+                assert not any("Lesen" in message for message in messages), "Synchronisationsfehler als Lesefehler gemeldet"
+    finally:
+        server.stop()
+    
+    print("✅ Lese- und Synchronisationsfehler werden getrennt gemeldet")
+
+def test_rate_limiter():
+    """Test der Ratenbegrenzung (Token-Bucket)"""
+    print("\n🧪 Teste Ratenbegrenzung...")
+    
+    import time
+    from rate_limiter import RateLimiter, get_rate_limiter
+    
+    # Zwei Anfragen sofort, vier weitere mit 20 pro Sekunde
+    limiter = RateLimiter(20, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    elapsed = time.monotonic() - started
+    assert 0.18 <= elapsed < 1.0, f"Ratenbegrenzung nicht eingehalten: 6 Anfragen in {elapsed:.2f}s"
+    
+    started = time.monotonic()
+    for _ in range(100):
+        RateLimiter(0).acquire()
+    assert time.monotonic() - started < 0.1, "Rate 0 sollte nicht begrenzen"
+    
+    assert get_rate_limiter('http://shop.test/api', 5) is get_rate_limiter('http://shop.test/api/search', 5), \
+        "Anfragen an denselben Host teilen sich keinen RateLimiter"
+    
+    print("✅ Ratenbegrenzung hält die Rate ein und gilt je Host")
+
+def test_resilience():
+    """Test von Backoff, Retry-After und Circuit Breaker"""
+    print("\n🧪 Teste Wiederholungen und Circuit Breaker...")
+    
+    import time
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from resilience import CircuitBreaker, RetryPolicy
+    from shopware_api import ShopwareAPI
+    
+    policy = RetryPolicy(base_delay=0.5, max_delay=10)
+    assert policy.get_delay(0, '3') == 3, "Retry-After in Sekunden nicht beachtet"
+    assert policy.get_delay(0, '120') == 10, "Retry-After nicht auf max_delay begrenzt"
+    assert all(0 <= policy.get_delay(2) <= 2.0 for _ in range(50)), "Backoff überschreitet die Obergrenze"
+    
+    breaker = CircuitBreaker(failure_rate=0.5, window_size=4, min_requests=4, cooldown=0.2)
+    for success in (True, False, False, True):
+        breaker.record(success)
+    started = time.monotonic()
+    breaker.wait_until_closed()
+    assert time.monotonic() - started >= 0.15, "Circuit Breaker bei 50 % Fehlern nicht geöffnet"
+    
+    # Mock-Server lässt nur eine Anfrage pro Sekunde zu und antwortet sonst mit 429
+    server = MockShopwareServer(rate_limit=1).start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir, \
+                mock.patch.dict(os.environ, mock_sync_env(server, state_dir)):
+            api = ShopwareAPI()
+            assert api.authenticate(), "Authentifizierung am Mock fehlgeschlagen"
+            success_count, errors = api.upsert_product_payloads([
+                (2, {'productNumber': 'RETRY1', 'name': 'Wiederholung', 'stock': 1})
+            ])
+            api.close()
+        
+        assert success_count == 1 and not errors, f"Anfrage nach 429 nicht wiederholt: {errors}"
+        assert 'RETRY1' in server.state.numbers, "Produkt nach Wiederholung nicht angelegt"
+    finally:
+        server.stop()
+    
+    print("✅ Backoff, Retry-After und Circuit Breaker funktionieren")
+
+def test_debounce():
+    """Test: mehrere Dateiereignisse lösen eine Synchronisation aus"""
+    print("\n🧪 Teste Zusammenfassen von Dateiereignissen...")
+    
+    import time
+    from types import SimpleNamespace
+    from unittest import mock
+    from sync_manager import CSVFileHandler
+    
+    with tempfile.TemporaryDirectory() as state_dir:
+        csv_path = os.path.join(state_dir, 'products.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write('product_number,name,price,stock\n')
+        
+        manager = mock.Mock()
+        handler = CSVFileHandler(csv_path, manager, debounce_seconds=0.1, stable_seconds=0.02)
+        
+        for _ in range(5):
+            handler.on_modified(SimpleNamespace(is_directory=False, src_path=csv_path))
+        handler.on_modified(SimpleNamespace(is_directory=False, src_path=os.path.join(state_dir, 'andere.csv')))
+        handler.on_moved(SimpleNamespace(is_directory=False, src_path=csv_path + '.tmp', dest_path=csv_path))
+        
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline and not manager.sync_changes.called:
+            time.sleep(0.05)
+        time.sleep(0.3)
+        handler.stop()
+    
+    assert manager.sync_changes.call_count == 1, \
+        f"{manager.sync_changes.call_count} Synchronisationen statt einer"
+    
+    print("✅ Dateiereignisse werden zu einer Synchronisation zusammengefasst")
+
+def test_change_detection():
+    """Test der Änderungserkennung über Dateistatus und Hash"""
+    print("\n🧪 Teste Änderungserkennung...")
+    
+    from unittest import mock
+    from csv_processor import CSVProcessor
+    
+    with tempfile.TemporaryDirectory() as state_dir:
+        csv_path = os.path.join(state_dir, 'products.csv')
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write('product_number,name,price,stock\nSW1,Produkt,1.00,1\n')
+        
+        processor = CSVProcessor(csv_path)
+        assert processor.has_file_changed(), "Erste Prüfung sollte als Änderung gelten"
+        
+        # Unveränderter Dateistatus: kein erneutes Hashen
+        with mock.patch.object(processor, 'calculate_file_hash') as calculate:
+            assert not processor.has_file_changed(), "Unveränderte Datei als geändert erkannt"
+            assert not calculate.called, "Hash trotz unverändertem Dateistatus berechnet"
+        
+        # Nur die Änderungszeit ist neu: Hash entscheidet
+        stat = os.stat(csv_path)
+        os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+        assert not processor.has_file_changed(), "Gleicher Inhalt mit neuer Änderungszeit als geändert erkannt"
+        
+        with open(csv_path, 'a', encoding='utf-8') as f:
+            f.write('SW2,Produkt 2,2.00,2\n')
+        assert processor.has_file_changed(), "Geänderter Inhalt nicht erkannt"
+    
+    print("✅ Änderungen werden über Dateistatus und Hash erkannt")
+
+def test_diff_comparison():
+    """Test: unveränderte Produkte werden mit COMPARE_BEFORE_UPDATE nicht erneut gesendet"""
+    print("\n🧪 Teste Vergleich mit dem Shopware-Stand...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from product_transformer import diff_product_data
+    from sync_manager import ProductSyncManager
+    
+    price = [{'currencyId': 'eur', 'gross': 19.99, 'net': 16.798319, 'linked': True}]
+    current = {'name': 'Produkt', 'stock': 5, 'active': True, 'ean': None,
+               'price': [{'currencyId': 'eur', 'gross': 19.99, 'net': 16.79832, 'linked': True}]}
+    assert diff_product_data(current, {'name': 'Produkt', 'stock': 5.0, 'price': price, 'ean': ''}) == {}, \
+        "Rundungsdifferenzen oder leere Werte als Änderung erkannt"
+    assert diff_product_data(current, {'name': 'Produkt', 'stock': 4, 'active': False}) == \
+        {'stock': 4, 'active': False}, "Geänderte Felder nicht erkannt"
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir, \
+                mock.patch.dict(os.environ, mock_sync_env(server, state_dir, COMPARE_BEFORE_UPDATE='true')):
+            assert ProductSyncManager().run_once(), "Erste Synchronisation fehlgeschlagen"
+            sync_requests = server.state.stats()['requests'].get('sync')
+            
+            assert ProductSyncManager().run_once(), "Zweite Synchronisation fehlgeschlagen"
+            assert server.state.stats()['requests'].get('sync') == sync_requests, \
+                "Unveränderte Produkte erneut gesendet"
+    finally:
+        server.stop()
+    
+    print("✅ Unveränderte Produkte werden nicht erneut übertragen")
+
+def test_feed_directory():
+    """Test der Synchronisation aller Dateien eines Feed-Verzeichnisses"""
+    print("\n🧪 Teste Feed-Verzeichnis...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from feed_directory import FeedDirectorySync
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            feed_dir = os.path.join(state_dir, 'feeds')
+            os.makedirs(feed_dir)
+            for supplier in ('lieferant_a', 'lieferant_b'):
+                with open(os.path.join(feed_dir, f'{supplier}.csv'), 'w', encoding='utf-8') as f:
+                    f.write('product_number,name,price,stock\n')
+                    for i in range(3):
+                        f.write(f'{supplier.upper()}-{i},Produkt {i},{i + 1}.99,{i}\n')
+            with open(os.path.join(feed_dir, 'notizen.txt'), 'w', encoding='utf-8') as f:
+                f.write('keine CSV-Datei\n')
+            
+            env = mock_sync_env(server, state_dir, FEED_DIRECTORY=feed_dir, FEED_CONCURRENCY='2')
+            with mock.patch.dict(os.environ, env):
+                feeds = FeedDirectorySync()
+                assert [os.path.basename(path) for path in feeds.feed_paths()] == \
+                    ['lieferant_a.csv', 'lieferant_b.csv'], "Feed-Dateien falsch erkannt"
+                assert feeds.run_once(), "Synchronisation des Feed-Verzeichnisses fehlgeschlagen"
+        
+        numbers = sorted(server.state.numbers)
+        assert len(numbers) == 6 and numbers[0] == 'LIEFERANT_A-0' and numbers[-1] == 'LIEFERANT_B-2', \
+            f"Nicht alle Feeds übertragen: {numbers}"
+        assert server.state.stats()['requests'].get('token') == 1, "Feeds teilen sich keine Verbindung"
+    finally:
+        server.stop()
+    
+    print("✅ Alle Feeds des Verzeichnisses über eine gemeinsame Verbindung synchronisiert")
+
+def test_deactivate_deleted():
+    """Test: entfernte Produkte werden gebündelt über die Sync-API deaktiviert"""
+    print("\n🧪 Teste Deaktivierung entfernter Produkte...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from sync_manager import ProductSyncManager
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            csv_path = os.path.join(state_dir, 'products.csv')
+            
+            def write_products(count):
+                with open(csv_path, 'w', encoding='utf-8') as f:
+                    f.write('product_number,name,price,stock\n')
+                    for i in range(count):
+                        f.write(f'DEL{i},Produkt {i},{10 + i}.99,{i}\n')
+            
+            env = mock_sync_env(server, state_dir, CSV_FILE_PATH=csv_path, INCREMENTAL_SYNC='true',
+                                DEACTIVATE_DELETED_PRODUCTS='true', SYNC_BATCH_SIZE='2',
+                                ROW_STATE_FILE=os.path.join(state_dir, 'rows.json'))
+            with mock.patch.dict(os.environ, env):
+                write_products(6)
+                assert ProductSyncManager().run_once(), "Erster Lauf fehlgeschlagen"
+                
+                write_products(1)
+                server.state.reset_stats()
+                assert ProductSyncManager().run_once(), "Lauf mit entfernten Produkten fehlgeschlagen"
+            
+            requests = server.state.stats()['requests']
+            inactive = sorted(
+                product['productNumber'] for product in server.state.products.values()
+                if product.get('active') is False
+            )
+            assert inactive == [f'DEL{i}' for i in range(1, 6)], f"Falsche Produkte deaktiviert: {inactive}"
+            assert not requests.get('update'), f"{requests.get('update')} Einzel-Updates statt Sync-Batches"
+            assert requests.get('sync') == 3, f"{requests.get('sync')} Sync-Anfragen statt drei Batches"
+    finally:
+        server.stop()
+    
+    print("✅ Entfernte Produkte in Batches deaktiviert")
+
+def test_fast_lane_dead_letters():
+    """Test: fehlgeschlagene Fast-Lane-Zeilen lassen sich erneut senden"""
+    print("\n🧪 Teste Dead Letters der Fast Lane...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from sync_manager import ProductSyncManager
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir, \
+                mock.patch.dict(os.environ, mock_sync_env(server, state_dir, FAST_LANE='true')):
+            manager = ProductSyncManager()
+            assert manager.shopware_api.authenticate(), "Authentifizierung am Mock fehlgeschlagen"
+            frame = next(manager.csv_processor.iter_csv_frames(1000))
+            failed_row = int(frame.index[1])
+            
+            with mock.patch.object(manager.shopware_api, 'upsert_product_payloads',
+                                   side_effect=lambda payloads: (0, {row_number: "Zeitüberschreitung"
+                                                                     for row_number, _ in payloads})):
+                _, errors = manager.sync_fast_lane(frame[frame.index == failed_row])
+            assert list(errors) == [failed_row], "Fehler der Fast Lane nicht gemeldet"
+            
+            assert manager.replay_dead_letters(), "Erneutes Senden fehlgeschlagen"
+            product_number = str(frame.loc[failed_row, 'product_number'])
+            product = server.state.products[server.state.numbers[product_number]]
+            assert product['stock'] == int(frame.loc[failed_row, 'stock']), "Bestand nicht nachgetragen"
+    finally:
+        server.stop()
+    
+    print("✅ Fehlgeschlagene Fast-Lane-Zeilen werden gesichert und erneut gesendet")
+
+def test_sync_metrics():
+    """Test der Kennzahlen eines Laufs (JSON-Datei und Prometheus-Endpunkt)"""
+    print("\n🧪 Teste Kennzahlen...")
+    
+    import json
+    import urllib.request
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from sync_manager import ProductSyncManager
+    from sync_metrics import start_metrics_server
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            metrics_file = os.path.join(state_dir, 'sync_metrics.json')
+            with mock.patch.dict(os.environ, mock_sync_env(server, state_dir, METRICS_FILE=metrics_file)):
+                assert ProductSyncManager().run_once(), "Synchronisation fehlgeschlagen"
+            
+            with open(metrics_file, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+    finally:
+        server.stop()
+    
+    counters = snapshot['counters']
+    assert snapshot['finished'], "Lauf nicht abgeschlossen"
+    assert (counters.get('rows_read'), counters.get('rows_synced'), counters.get('rows_failed')) == (3, 3, 0), \
+        f"Falsche Zeilenzähler: {counters}"
+    assert counters.get('http_requests', 0) >= 2 and counters.get('bytes_sent', 0) > 0, "HTTP-Anfragen nicht gezählt"
+    assert {'csv_parse', 'transform', 'sync_batch'} <= set(snapshot['phases']), \
+        f"Phasen fehlen: {sorted(snapshot['phases'])}"
+    
+    # Endpunkt nur lokal, Port vom Betriebssystem
+    metrics_server = start_metrics_server(0)
+    try:
+        assert metrics_server.server_address[0] == '127.0.0.1', "Metrik-Endpunkt nicht nur lokal erreichbar"
+        url = f"http://127.0.0.1:{metrics_server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode('utf-8')
+    finally:
+        metrics_server.shutdown()
+        metrics_server.server_close()
+    
+    assert 'shopware_sync_rows_synced 3' in body, "Zeilenzähler fehlt im Prometheus-Format"
+    assert 'shopware_sync_phase_seconds_count{phase="sync_batch"} 1' in body, "Phasen fehlen im Prometheus-Format"
+    
+    print("✅ Kennzahlen als JSON-Datei und im Prometheus-Format ausgegeben")
+
+def test_token_refresh():
+    """Test: das Access Token wird vor Ablauf und nach 401 genau einmal erneuert"""
+    print("\n🧪 Teste Token-Erneuerung...")
+    
+    import time
+    from unittest import mock
+    from concurrent.futures import ThreadPoolExecutor
+    from mock_shopware import MockShopwareServer
+    from shopware_api import ShopwareAPI
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            server.state.seed(['TOK1'])
+            with mock.patch.dict(os.environ, mock_sync_env(server, state_dir)):
+                api = ShopwareAPI()
+                try:
+                    assert api.search_product_ids(['TOK1']), "Suche fehlgeschlagen"
+                    
+                    # Token läuft demnächst ab: gleichzeitige Anfragen erneuern es nur einmal
+                    api.token_expires_at = time.monotonic() + api.token_refresh_margin / 2
+                    with ThreadPoolExecutor(max_workers=8) as executor:
+                        results = list(executor.map(api.search_product_ids, [['TOK1']] * 8))
+                    assert all(results), "Suche nach Token-Erneuerung fehlgeschlagen"
+                    requests = server.state.stats()['requests']
+                    assert requests.get('token') == 2, f"{requests.get('token')} Token-Anfragen statt 2"
+                    
+                    # Vom Server verworfenes Token: 401, Erneuerung und Wiederholung der Anfrage
+                    with server.state.lock:
+                        server.state.tokens.clear()
+                    assert api.search_product_ids(['TOK1']), "Anfrage nach 401 nicht wiederholt"
+                    requests = server.state.stats()['requests']
+                    assert requests.get('token') == 3, f"{requests.get('token')} Token-Anfragen statt 3"
+                    assert requests.get('search') == 11, "Abgelehnte Anfrage nicht genau einmal wiederholt"
+                finally:
+                    api.close()
+    finally:
+        server.stop()
+    
+    print("✅ Access Token vor Ablauf und nach 401 einmalig erneuert")
+
+def test_product_id_cache():
+    """Test: Produkt-IDs werden gesammelt gesucht und im Cache gehalten"""
+    print("\n🧪 Teste Produkt-ID-Cache...")
+    
+    from unittest import mock
+    from mock_shopware import MockShopwareServer
+    from shopware_api import ShopwareAPI
+    
+    server = MockShopwareServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            server.state.seed(['ID1', 'ID2'])
+            env = mock_sync_env(server, state_dir, SEARCH_PAGE_SIZE='2',
+                                PRODUCT_ID_CACHE_FILE=os.path.join(state_dir, 'product_ids.json'))
+            with mock.patch.dict(os.environ, env):
+                numbers = ['ID1', 'NEU1', 'ID2', 'NEU2']
+                api = ShopwareAPI()
+                try:
+                    ids = api.resolve_product_ids(numbers)
+                    assert ids == {number: server.state.numbers[number] for number in ('ID1', 'ID2')}, \
+                        f"Falsche Produkt-IDs: {ids}"
+                    assert server.state.stats()['requests'].get('search') == 2, "Nicht seitenweise gesucht"
+                    
+                    # Bekannte und bekannt fehlende Nummern werden nicht erneut gesucht
+                    assert api.resolve_product_ids(numbers) == ids, "Cache liefert andere IDs"
+                    assert server.state.stats()['requests'].get('search') == 2, "Bekannte Nummern erneut gesucht"
+                    api.product_ids.save()
+                finally:
+                    api.close()
+                
+                # Nächster Lauf: IDs aus der Cache-Datei
+                server.state.reset_stats()
+                api = ShopwareAPI()
+                try:
+                    assert api.resolve_product_ids(['ID1', 'ID2']) == ids, "Cache-Datei nicht geladen"
+                    assert not server.state.stats()['requests'].get('search'), "IDs trotz Cache-Datei gesucht"
+                finally:
+                    api.close()
+    finally:
+        server.stop()
+    
+    print("✅ Produkt-IDs gesammelt gesucht, im Speicher und in der Cache-Datei gehalten")
+
+def test_connection_pool():
+    """Test der Poolgröße der Shopware-Session"""
+    print("\n🧪 Teste Verbindungspool...")
+    
+    from unittest import mock
+    from shopware_api import ShopwareAPI
+    
+    with mock.patch.dict(os.environ, {'SHOPWARE_POOL_SIZE': '10', 'SYNC_CONCURRENCY': '2'}):
+        # Eine übergebene Poolgröße (Feed-Verzeichnis, Medien-Import) hat Vorrang
+        api = ShopwareAPI(pool_size=3)
+        assert api.session.get_adapter('http://shop.test')._pool_maxsize == 3, "Übergebene Poolgröße ignoriert"
+        api.close()
+        
+        api = ShopwareAPI()
+        assert api.session.get_adapter('http://shop.test')._pool_maxsize == 10, "SHOPWARE_POOL_SIZE ignoriert"
+        api.close()
+    
+    with mock.patch.dict(os.environ, {'SHOPWARE_POOL_SIZE': '0', 'SYNC_CONCURRENCY': '4'}):
+        api = ShopwareAPI()
+        assert api.session.get_adapter('http://shop.test')._pool_maxsize == 4, "Poolgröße passt nicht zu SYNC_CONCURRENCY"
+        api.close()
+    
+    print("✅ Poolgröße: Argument vor SHOPWARE_POOL_SIZE vor SYNC_CONCURRENCY")
+
 def test_shopware_api():
     """Test der Shopware API (ohne tatsächliche Verbindung)"""
     print("\n🧪 Teste Shopware API...")
@@ -161,6 +1036,29 @@ def main():
         ("Dependencies", test_dependencies),
         ("Konfiguration", test_configuration),
         ("CSV-Processor", test_csv_processor),
+        ("Zeilenvergleich", test_row_diff),
+        ("Änderungserkennung", test_change_detection),
+        ("CSV-Zeilennummern", test_row_numbers),
+        ("Paralleles Parsing", test_parallel_parse),
+        ("Spaltenweise Umwandlung", test_vectorized_transform),
+        ("Feld-Mapping", test_field_mapping),
+        ("Mock-Synchronisation", test_mock_sync),
+        ("Parallele Synchronisation", test_concurrent_sync),
+        ("Ungültige Zahlen", test_invalid_number),
+        ("Fehlerzuordnung Sync-API", test_sync_errors),
+        ("Fortsetzen nach Abbruch", test_checkpoint_resume),
+        ("Deaktivierung entfernter Produkte", test_deactivate_deleted),
+        ("Dead Letters der Fast Lane", test_fast_lane_dead_letters),
+        ("Fehlermeldungen bei Abbruch", test_sync_failure_messages),
+        ("Ratenbegrenzung", test_rate_limiter),
+        ("Wiederholungen und Circuit Breaker", test_resilience),
+        ("Zusammenfassen von Dateiereignissen", test_debounce),
+        ("Vergleich mit Shopware-Stand", test_diff_comparison),
+        ("Feed-Verzeichnis", test_feed_directory),
+        ("Kennzahlen", test_sync_metrics),
+        ("Token-Erneuerung", test_token_refresh),
+        ("Produkt-ID-Cache", test_product_id_cache),
+        ("Verbindungspool", test_connection_pool),
         ("Shopware API", test_shopware_api)
     ]
     
@@ -168,8 +1066,12 @@ def main():
     
     for test_name, test_func in tests:
         try:
+            # Neuere Tests prüfen per assert und geben nichts zurück
             result = test_func()
-            results.append((test_name, result))
+            results.append((test_name, result is not False))
+        except AssertionError as e:
+            print(f"❌ {e}")
+            results.append((test_name, False))
         except Exception as e:
             print(f"❌ Test '{test_name}' fehlgeschlagen: {e}")
             results.append((test_name, False))
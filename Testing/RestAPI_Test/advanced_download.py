@@ -0,0 +1,338 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from download_cache import DownloadCache
+
+USER_AGENT = 'Shopware Media Importer 1.0'
+
+# Größe der Blöcke beim Lesen der Antwort (64 KB)
+CHUNK_SIZE = 64 * 1024
+
+# Maximale Bildgröße (20 MB)
+MAX_IMAGE_SIZE = 20 * 1024 * 1024
+
+# Bildformate anhand der ersten Bytes: (Position, Signatur, Content-Type)
+IMAGE_SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),
+    (4, b'ftypavif', 'image/avif'),
+    (0, b'BM', 'image/bmp'),
+    (0, b'II*\x00', 'image/tiff'),
+    (0, b'MM\x00*', 'image/tiff')
+]
+
+IMAGE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/avif': '.avif',
+    'image/bmp': '.bmp',
+    'image/tiff': '.tif'
+}
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """
+    Bestimmt das Bildformat aus den ersten Bytes (None, wenn es kein bekanntes Bild ist)
+    """
+    for offset, signature, content_type in IMAGE_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    return None
+
+class BandwidthLimiter:
+    """
+    Begrenzt die gemeinsame Download-Bandbreite aller Threads (Token Bucket in Bytes/Sekunde)
+    """
+
+    def __init__(self, bytes_per_second: float = 0):
+        self.rate = bytes_per_second
+        self.tokens = bytes_per_second
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, size: int):
+        """
+        Wartet, bis size Bytes übertragen werden dürfen (0 = unbegrenzt)
+        """
+        if not self.rate:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= size
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+class DownloadSummary:
+    """
+    Ergebnis eines Sammel-Downloads: Erfolge, Fehler und Durchsatz
+    """
+
+    def __init__(self):
+        self.succeeded = 0
+        self.failed: Dict[str, str] = {}
+        self.files: Dict[str, str] = {}
+        self.duplicates = 0
+        self.not_modified = 0
+        self.total_bytes = 0
+        self.started = time.perf_counter()
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def record(self, url: str, size: int, error: Optional[str] = None,
+               file_path: Optional[str] = None, status: str = 'new'):
+        """
+        Args:
+            size: übertragene Bytes
+            status: 'new', 'duplicate' (Inhalt bereits gespeichert) oder 'not_modified' (304)
+        """
+        with self.lock:
+            if error is None:
+                self.succeeded += 1
+                self.total_bytes += size
+                if file_path:
+                    self.files[url] = file_path
+                    self.duplicates += status == 'duplicate'
+                    self.not_modified += status == 'not_modified'
+            else:
+                self.failed[url] = error
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def report(self) -> str:
+        duration = self.duration
+        total = self.succeeded + len(self.failed)
+        megabytes = self.total_bytes / (1024 * 1024)
+        stored = f" ({self.duplicates} bereits vorhanden, {self.not_modified} unverändert)" if self.files else ""
+        return (
+            f"{self.succeeded}/{total} Bilder heruntergeladen{stored}, {len(self.failed)} Fehler, "
+            f"{megabytes:.1f} MB in {duration:.1f}s "
+            f"({megabytes / duration if duration else 0:.2f} MB/s, {total / duration if duration else 0:.1f} Bilder/s)"
+        )
+
+class MediaDownloader:
+    """
+    Lädt viele Bilder parallel über wiederverwendete Keep-Alive-Verbindungen
+
+    Args:
+        max_workers: maximale Anzahl gleichzeitiger Downloads insgesamt
+        per_host_limit: maximale Verbindungen je Host
+        max_bytes_per_second: gemeinsame Bandbreitengrenze (0 = unbegrenzt)
+        timeout: Timeout je Anfrage in Sekunden
+        max_retries: Wiederholungen bei Verbindungsfehlern, 429 und 5xx
+        max_image_size: größere Bilder werden abgebrochen und als Fehler gemeldet
+        cache: Download-Cache für bedingte Anfragen (ETag/Last-Modified); Bilder
+               werden dann standardmäßig im Cache-Verzeichnis gespeichert
+    """
+
+    def __init__(self, max_workers: int = 16, per_host_limit: int = 4, max_bytes_per_second: float = 0,
+                 timeout: int = 30, max_retries: int = 3, max_image_size: int = MAX_IMAGE_SIZE,
+                 cache: Optional[DownloadCache] = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_image_size = max_image_size
+        self.cache = cache
+        self.bandwidth = BandwidthLimiter(max_bytes_per_second)
+
+        # Ein Pool je Host mit höchstens per_host_limit Verbindungen; weitere Threads warten
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET',),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=per_host_limit, pool_block=True, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+
+    def close(self):
+        self.session.close()
+
+    def _fetch(self, image_url: str) -> Tuple[bytes, str]:
+        with self.session.get(image_url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+
+            chunks = []
+            for chunk in self._iter_body(response):
+                chunks.append(chunk)
+
+            # Content-Type bestimmen
+            content_type = response.headers.get('content-type', 'image/jpeg')
+            if not content_type.startswith('image/'):
+                content_type = 'image/jpeg'
+
+            return b''.join(chunks), content_type
+
+    def _fetch_to_file(self, image_url: str, target_dir: str) -> Tuple[str, str, int, str]:
+        """
+        Schreibt das Bild über eine temporäre Datei und benennt sie erst nach
+        vollständigem Download um; gleiche Bilder werden nur einmal gespeichert
+
+        Returns:
+            Tuple (Dateipfad, Content-Type, übertragene Bytes, Status wie bei DownloadSummary.record)
+        """
+        os.makedirs(target_dir, exist_ok=True)
+
+        # Bekannte URLs nur erneut laden, wenn sie sich geändert haben
+        entry = self.cache.lookup(image_url) if self.cache else None
+        headers = DownloadCache.conditional_headers(entry)
+
+        with self.session.get(image_url, timeout=self.timeout, stream=True, headers=headers) as response:
+            if entry and response.status_code == 304:
+                self.cache.touch(image_url, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                return entry['file_path'], entry['content_type'], 0, 'not_modified'
+
+            response.raise_for_status()
+
+            file_hash = hashlib.sha256()
+            head = b''
+            content_type = None
+            size = 0
+
+            temp = tempfile.NamedTemporaryFile(dir=target_dir, suffix='.part', delete=False)
+            try:
+                with temp:
+                    for chunk in self._iter_body(response):
+                        # Format aus den ersten Bytes bestimmen, nicht aus dem Header
+                        if content_type is None:
+                            head += chunk
+                            if len(head) < 16:
+                                continue
+                            content_type = sniff_image_type(head)
+                            if content_type is None:
+                                raise ValueError("Antwort ist kein unterstütztes Bildformat")
+                            chunk, head = head, b''
+
+                        file_hash.update(chunk)
+                        temp.write(chunk)
+                        size += len(chunk)
+
+                    if content_type is None:
+                        content_type = sniff_image_type(head)
+                        if content_type is None:
+                            raise ValueError("Antwort ist kein unterstütztes Bildformat")
+                        file_hash.update(head)
+                        temp.write(head)
+                        size += len(head)
+
+                file_path = os.path.join(target_dir, file_hash.hexdigest() + IMAGE_EXTENSIONS[content_type])
+                if os.path.exists(file_path):
+                    os.remove(temp.name)
+                    status = 'duplicate'
+                else:
+                    os.replace(temp.name, file_path)
+                    status = 'new'
+
+                if self.cache:
+                    self.cache.store(
+                        image_url, file_path, content_type, size,
+                        response.headers.get('ETag'), response.headers.get('Last-Modified')
+                    )
+                return file_path, content_type, size, status
+
+            except BaseException:
+                if os.path.exists(temp.name):
+                    os.remove(temp.name)
+                raise
+
+    def _iter_body(self, response: requests.Response) -> Iterable[bytes]:
+        """
+        Liest die Antwort blockweise unter Einhaltung von Bandbreite und maximaler Größe
+        """
+        content_length = response.headers.get('content-length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_image_size:
+            raise ValueError(f"Bild ist zu groß ({int(content_length)} Bytes)")
+
+        size = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > self.max_image_size:
+                raise ValueError(f"Bild ist größer als {self.max_image_size} Bytes")
+            self.bandwidth.consume(len(chunk))
+            yield chunk
+
+    def download_all(self, urls: Iterable[str], on_result: Optional[Callable[[str, bool, object, str], None]] = None,
+                     target_dir: Optional[str] = None) -> DownloadSummary:
+        """
+        Lädt alle URLs parallel herunter
+
+        Args:
+            urls: Bild-URLs (Duplikate werden nur einmal geladen)
+            on_result: wird je URL mit (url, success, image_data, content_type) aufgerufen,
+                       damit nicht alle Bilder gleichzeitig im Speicher gehalten werden
+            target_dir: Bilder direkt in dieses Verzeichnis schreiben statt im Speicher
+                        zu halten; on_result erhält dann den Dateipfad statt der Bytes
+                        (Standard mit Cache: Cache-Verzeichnis)
+
+        Returns:
+            DownloadSummary mit Erfolgen, Fehlern und Durchsatz
+        """
+        summary = DownloadSummary()
+        if target_dir is None and self.cache is not None:
+            target_dir = self.cache.blob_dir
+
+        def fetch(url: str):
+            try:
+                if target_dir is None:
+                    data, content_type = self._fetch(url)
+                    summary.record(url, len(data))
+                else:
+                    data, content_type, size, status = self._fetch_to_file(url, target_dir)
+                    summary.record(url, size, file_path=data, status=status)
+            except Exception as e:
+                print(f"Fehler beim Download von {url}: {e}")
+                summary.record(url, 0, str(e))
+                success, data, content_type = False, None if target_dir else b'', ''
+            else:
+                success = True
+
+            if on_result is not None:
+                on_result(url, success, data, content_type)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # list() gibt Ausnahmen aus on_result an den Aufrufer weiter
+            list(executor.map(fetch, interleave_by_host(urls)))
+
+        summary.finished = time.perf_counter()
+        return summary
+
+def interleave_by_host(urls: Iterable[str]) -> List[str]:
+    """
+    Ordnet die URLs abwechselnd nach Host an, damit wartende Threads eines
+    ausgelasteten Hosts nicht alle Downloads anderer Hosts blockieren
+    """
+    by_host: Dict[str, List[str]] = OrderedDict()
+    for url in dict.fromkeys(urls):
+        by_host.setdefault(urlsplit(url).netloc, []).append(url)
+
+    queues = [list(reversed(host_urls)) for host_urls in by_host.values()]
+    ordered = []
+    while queues:
+        for queue in queues:
+            ordered.append(queue.pop())
+        queues = [queue for queue in queues if queue]
+    return ordered
@@ -0,0 +1,164 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+# Standardgröße des Caches (1 GB)
+DEFAULT_MAX_CACHE_SIZE = 1024 * 1024 * 1024
+
+class DownloadCache:
+    """
+    Lokaler Download-Cache: SQLite-Index je URL und Bilddateien in einem Verzeichnis
+
+    Je URL werden ETag, Last-Modified, Datei und Content-Type gespeichert, damit
+    erneute Downloads als bedingte Anfragen gestellt werden (304 = unverändert).
+    Übersteigt die Gesamtgröße max_size, werden die am längsten nicht genutzten
+    Dateien gelöscht. Dateien, die seit dem Öffnen des Caches geladen oder
+    bestätigt wurden, bleiben erhalten, bis der Cache erneut geöffnet wird: der
+    laufende Import verwendet sie noch. Mehrere URLs können auf dieselbe Datei zeigen.
+
+    Args:
+        cache_dir: Verzeichnis für Index und Bilddateien
+        max_size: maximale Gesamtgröße der Bilddateien in Bytes
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_CACHE_SIZE):
+        self.blob_dir = cache_dir
+        self.max_size = max_size
+        self.opened_at = time.time()
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    file_path TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_file_path ON entries (file_path)")
+
+        self.total_size = self._calculate_total_size()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _calculate_total_size(self) -> int:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM entries GROUP BY file_path)"
+            ).fetchone()
+        return row[0]
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """
+        Gespeicherter Eintrag einer URL (None, wenn unbekannt oder die Datei fehlt)
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, file_path, content_type, size FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        entry = dict(zip(('etag', 'last_modified', 'file_path', 'content_type', 'size'), row))
+        if not os.path.exists(entry['file_path']):
+            self._remove_file_entries(entry['file_path'])
+            return None
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """
+        Header für eine bedingte Anfrage (leer, wenn der Server keine Validatoren geliefert hat)
+        """
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Markiert die URL als genutzt (für die LRU-Verdrängung)
+
+        Validatoren aus einer 304-Antwort ersetzen die gespeicherten; fehlen sie
+        in der Antwort, bleiben die bisherigen erhalten.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE entries SET last_used = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), etag, last_modified, url)
+            )
+
+    def store(self, url: str, file_path: str, content_type: str, size: int,
+              etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Speichert bzw. aktualisiert den Eintrag einer heruntergeladenen URL
+
+        Hat sich der Inhalt der URL geändert, wird die bisherige Datei gelöscht,
+        sofern keine andere URL auf sie zeigt.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT file_path FROM entries WHERE url = ?", (url,)).fetchone()
+            previous = row[0] if row and row[0] != file_path else None
+            if previous is not None and self.conn.execute(
+                "SELECT 1 FROM entries WHERE file_path = ? AND url != ? LIMIT 1", (previous, url)
+            ).fetchone():
+                previous = None
+        if previous is not None:
+            self._remove_file_entries(previous)
+
+        with self.lock, self.conn:
+            known = self.conn.execute("SELECT 1 FROM entries WHERE file_path = ? LIMIT 1", (file_path,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (url, etag, last_modified, file_path, content_type, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, file_path, content_type, size, time.time())
+            )
+            if known is None:
+                self.total_size += size
+
+        if self.total_size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """
+        Löscht die am längsten nicht genutzten Dateien, bis die Maximalgröße eingehalten ist
+
+        In diesem Lauf genutzte Dateien werden nicht gelöscht, auch wenn der Cache
+        dadurch vorübergehend größer als max_size bleibt.
+        """
+        with self.lock:
+            candidates = self.conn.execute(
+                "SELECT file_path, MAX(size) FROM entries GROUP BY file_path "
+                "HAVING MAX(last_used) < ? ORDER BY MAX(last_used)",
+                (self.opened_at,)
+            ).fetchall()
+
+        for file_path, size in candidates:
+            if self.total_size <= self.max_size:
+                break
+            self._remove_file_entries(file_path)
+
+    def _remove_file_entries(self, file_path: str):
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT MAX(size) FROM entries WHERE file_path = ?", (file_path,)).fetchone()
+            self.conn.execute("DELETE FROM entries WHERE file_path = ?", (file_path,))
+            if row[0] is not None:
+                self.total_size -= row[0]
+
+        if os.path.exists(file_path):
+            os.remove(file_path)
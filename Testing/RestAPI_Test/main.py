@@ -1,58 +1,71 @@
-import requests
 import pandas as pd
 
-links = []
+from advanced_download import MediaDownloader
+from download_cache import DownloadCache
 
-def download_image(image_url: str, timeout: int = 30):
+def load_image_links(file_path: str, merchant_name: str = "terracanis DE", limit: int = 100,
+                     image_column: str = "aw_image_url", chunk_size: int = 50000):
     """
-    Lädt ein Bild von einer URL herunter
+    Liest die ersten Bild-URLs eines Händlers aus dem Affiliate-Feed
+    
+    Es werden nur die benötigten Spalten gelesen und die Zeilen blockweise
+    gefiltert; das Lesen endet, sobald limit Links gefunden sind.
     
     Args:
-        image_url: URL des Bildes
-        timeout: Timeout in Sekunden
+        file_path: Pfad der Feed-Datei
+        merchant_name: Händler, dessen Bilder gesucht werden
+        limit: maximale Anzahl Links
+        image_column: Spalte mit den Bild-URLs
+        chunk_size: Zeilen pro gelesenem Block
         
     Returns:
-        Tuple (success, image_data, content_type)
+        Liste der Links (ohne Zeilen des Händlers die ersten Links aller Händler)
     """
-    try:
-        response = requests.get(
-            image_url, 
-            timeout=timeout,
-            headers={'User-Agent': 'Shopware Media Importer 1.0'}
-        )
-        response.raise_for_status()
-        
-        # Content-Type bestimmen
-        content_type = response.headers.get('content-type', 'image/jpeg')
-        if not content_type.startswith('image/'):
-            content_type = 'image/jpeg'
-        
-        return True, response.content, content_type
-        
-    except Exception as e:
-        print(f"Fehler beim Download von {image_url}: {e}")
-        return False, b'', ''
-        
-        
-
+    columns = pd.read_csv(file_path, nrows=0).columns
+    if image_column not in columns:
+        print(f"Column '{image_column}' not found in CSV")
+        return []
+    
+    has_merchant = "merchant_name" in columns
+    usecols = [image_column, "merchant_name"] if has_merchant else [image_column]
+    
+    merchant_links = []
+    merchant_found = False
+    fallback_links = []
+    
+    with pd.read_csv(file_path, usecols=usecols, dtype=str, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            # Links of all merchants, in case the merchant does not appear in the feed
+            if not merchant_found and len(fallback_links) < limit:
+                fallback_links += chunk[image_column].dropna().head(limit - len(fallback_links)).tolist()
+            
+            if has_merchant:
+                matches = chunk[chunk["merchant_name"] == merchant_name]
+                if not matches.empty:
+                    merchant_found = True
+                    merchant_links += matches[image_column].dropna().head(limit - len(merchant_links)).tolist()
+                    if len(merchant_links) >= limit:
+                        break
+    
+    return merchant_links if merchant_found else fallback_links
 
-# Reload the CSV file
-file_path = "moin.csv"
-df = pd.read_csv(file_path)
 
-# Extract the first 100 links from the 'merchant_image_url' column as strings
-if "aw_image_url" in df.columns:
-    # Filter for terracanis DE merchant and get their image URLs
-    terracanis_df = df[df['merchant_name'] == "terracanis DE"]
-    if not terracanis_df.empty:
-        links = terracanis_df["aw_image_url"].dropna().astype(str).head(100).tolist()
-    else:
-        # If no terracanis DE found, get all merchant image URLs
-        links = df["aw_image_url"].dropna().astype(str).head(100).tolist()
-else:
-    print("Column 'aw_image_url' not found in CSV")
+if __name__ == "__main__":
+    # Extract the first 100 terracanis DE image links (all merchants if it is not in the feed)
+    file_path = "moin.csv"
+    links = load_image_links(file_path)
 
+    # Download the first 20 links concurrently over pooled keep-alive connections.
+    # Images are streamed into the cache directory (content hash names); on
+    # later runs unchanged images are answered with 304 Not Modified.
+    cache = DownloadCache("images")
+    downloader = MediaDownloader(max_workers=16, per_host_limit=4, cache=cache)
+    try:
+        summary = downloader.download_all(links[:20])
+    finally:
+        downloader.close()
+        cache.close()
 
-if __name__ == "__main__":
-    for link in links[:20]:
-        download_image(link)
\ No newline at end of file
+    print(summary.report())
+    for url, error in summary.failed.items():
+        print(f"  {url}: {error}")
\ No newline at end of file
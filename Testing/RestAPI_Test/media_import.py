@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Import von Produktbildern aus dem Affiliate-Feed in die Shopware-Medienverwaltung
+
+Die Bilder werden parallel heruntergeladen und als Datei gespeichert (Name =
+SHA-256 des Inhalts). Über einen lokalen Index Inhalt -> Medien-ID wird jedes
+Bild nur einmal hochgeladen; unbekannte Inhalte werden zusätzlich in Shopware
+über den Dateinamen gesucht. Fehlende Medien werden gebündelt angelegt, die
+Dateien direkt von der Festplatte an den Upload-Endpunkt gestreamt und
+anschließend den Produkten (über die Produktnummer) zugeordnet.
+
+Download, Upload und Zuordnung laufen überlappend: sobald ein Batch Bilder
+geladen ist, wird er hochgeladen, während weitere Downloads laufen.
+
+Der Importer erhält die Shopware-Verbindung von außen (z.B. ShopwareAPI aus
+CSV_Datei_Automation/src). Die Kommandozeile verwendet dieses Modul, es muss
+dafür im PYTHONPATH liegen; die Zugangsdaten stammen dann aus der .env-Datei
+der CSV-Synchronisation.
+
+Verwendung:
+    export PYTHONPATH=../CSV_Datei_Automation/src
+    python media_import.py moin.csv --merchant "terracanis DE" --limit 100
+    python media_import.py moin.csv --number-column merchant_product_id --image-columns aw_image_url large_image
+"""
+
+import os
+import sys
+import time
+import uuid
+import queue
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from advanced_download import MediaDownloader
+from download_cache import DownloadCache
+
+class MediaIndex:
+    """
+    Lokaler Index der hochgeladenen Bilder: Inhalts-Hash -> Medien-ID je Shop,
+    dazu die zuletzt zugeordneten Medien je Produkt
+
+    Args:
+        index_file: Pfad der SQLite-Datenbank
+        shop_url: Shopware-URL, damit Medien-IDs verschiedener Shops getrennt bleiben
+    """
+
+    def __init__(self, index_file: str, shop_url: str):
+        self.shop_url = shop_url
+        self.lock = threading.Lock()
+        directory = os.path.dirname(index_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(index_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS media (
+                    shop_url TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    media_id TEXT NOT NULL,
+                    PRIMARY KEY (shop_url, content_hash)
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS product_media (
+                    shop_url TEXT NOT NULL,
+                    product_id TEXT NOT NULL,
+                    media_ids TEXT NOT NULL,
+                    PRIMARY KEY (shop_url, product_id)
+                )
+            """)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def get_many(self, content_hashes: List[str]) -> Dict[str, str]:
+        """
+        Medien-IDs der bereits hochgeladenen Inhalte
+        """
+        found = {}
+        with self.lock:
+            # SQLite erlaubt höchstens 999 Parameter je Anfrage
+            for start in range(0, len(content_hashes), 900):
+                part = content_hashes[start:start + 900]
+                rows = self.conn.execute(
+                    f"SELECT content_hash, media_id FROM media WHERE shop_url = ? "
+                    f"AND content_hash IN ({', '.join('?' * len(part))})",
+                    [self.shop_url] + part
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def store_many(self, media_ids: Dict[str, str]):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO media (shop_url, content_hash, media_id) VALUES (?, ?, ?)",
+                [(self.shop_url, content_hash, media_id) for content_hash, media_id in media_ids.items()]
+            )
+
+    def get_links(self, product_ids: List[str]) -> Dict[str, List[str]]:
+        """
+        Zuletzt zugeordnete Medien-IDs je Produkt-ID (in Anzeigereihenfolge)
+        """
+        found = {}
+        with self.lock:
+            for start in range(0, len(product_ids), 900):
+                part = product_ids[start:start + 900]
+                rows = self.conn.execute(
+                    f"SELECT product_id, media_ids FROM product_media WHERE shop_url = ? "
+                    f"AND product_id IN ({', '.join('?' * len(part))})",
+                    [self.shop_url] + part
+                ).fetchall()
+                found.update((product_id, media_ids.split(',')) for product_id, media_ids in rows)
+        return found
+
+    def store_links(self, product_media: Dict[str, List[str]]):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO product_media (shop_url, product_id, media_ids) VALUES (?, ?, ?)",
+                [(self.shop_url, product_id, ','.join(media_ids)) for product_id, media_ids in product_media.items()]
+            )
+
+class ImportSummary:
+    """
+    Ergebnis eines Medien-Imports
+    """
+
+    def __init__(self):
+        self.downloaded = 0
+        self.uploaded = 0
+        self.reused = 0
+        self.products_linked = 0
+        self.products_unchanged = 0
+        self.products_missing: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def report(self) -> str:
+        duration = (self.finished or time.perf_counter()) - self.started
+        return (
+            f"{self.downloaded} Bilder geladen, {self.uploaded} hochgeladen, {self.reused} bereits vorhanden, "
+            f"{len(self.failed)} Fehler - {self.products_linked} Produkte verknüpft, "
+            f"{self.products_unchanged} unverändert, "
+            f"{len(self.products_missing)} nicht in Shopware gefunden ({duration:.1f}s)"
+        )
+
+class MediaImporter:
+    """
+    Lädt Produktbilder herunter, lädt neue Inhalte zu Shopware hoch und verknüpft sie mit den Produkten
+
+    Args:
+        shopware_api: Verbindung zu Shopware (ShopwareAPI oder Objekt mit denselben Methoden:
+                      search_media_ids, create_media, upload_media, delete_media,
+                      resolve_product_ids, link_product_media)
+        downloader: Downloader für die Bilder (mit Cache werden unveränderte Bilder nicht erneut geladen)
+        index: lokaler Index Inhalts-Hash -> Medien-ID
+        batch_size: Bilder je Upload-Batch bzw. Produkte je Zuordnungs-Batch
+        upload_workers: gleichzeitige Uploads
+        target_dir: Verzeichnis der heruntergeladenen Bilder (Standard: Cache-Verzeichnis)
+    """
+
+    def __init__(self, shopware_api, downloader: MediaDownloader, index: MediaIndex,
+                 batch_size: int = 50, upload_workers: int = 4, target_dir: Optional[str] = None):
+        self.shopware_api = shopware_api
+        self.downloader = downloader
+        self.index = index
+        self.batch_size = batch_size
+        self.upload_workers = upload_workers
+        self.target_dir = target_dir or (downloader.cache.blob_dir if downloader.cache else 'images')
+
+    def import_images(self, product_images: Iterable[Tuple[str, str]]) -> ImportSummary:
+        """
+        Importiert die Bilder und ordnet sie den Produkten zu
+
+        Args:
+            product_images: Paare (Produktnummer, Bild-URL); die Reihenfolge je
+                            Produkt bestimmt die Bildposition, das erste Bild wird Titelbild
+
+        Returns:
+            ImportSummary mit Uploads, Duplikaten, Fehlern und verknüpften Produkten
+        """
+        summary = ImportSummary()
+
+        # Bild-URLs je Produkt und Produkte je URL (ein Bild kann zu mehreren Produkten gehören)
+        product_urls: Dict[str, List[str]] = OrderedDict()
+        url_products: Dict[str, List[str]] = OrderedDict()
+        for product_number, url in product_images:
+            urls = product_urls.setdefault(product_number, [])
+            if url not in urls:
+                urls.append(url)
+                url_products.setdefault(url, []).append(product_number)
+
+        # Zustand nur für diesen Lauf, damit ein Importer mehrfach (auch parallel) verwendet werden kann
+        pending = {product_number: set(urls) for product_number, urls in product_urls.items()}
+        url_media: Dict[str, str] = {}
+        ready: List[str] = []
+
+        def resolve(url: str, media_id: Optional[str]):
+            """
+            Vermerkt das Medium einer URL; Produkte mit vollständig verarbeiteten Bildern werden zugeordnet
+            """
+            if media_id is not None:
+                url_media[url] = media_id
+
+            for product_number in url_products[url]:
+                remaining = pending[product_number]
+                remaining.discard(url)
+                if not remaining:
+                    ready.append(product_number)
+
+            if len(ready) >= self.batch_size:
+                self._link_products(ready, product_urls, url_media, summary)
+                ready.clear()
+
+        # Begrenzte Warteschlange: Downloads laufen höchstens einige Batches voraus
+        results = queue.Queue(maxsize=self.batch_size * 4)
+        download_error = []
+
+        def download():
+            try:
+                self.downloader.download_all(
+                    url_products,
+                    on_result=lambda url, success, file_path, content_type: results.put(
+                        (url, success, file_path, content_type)
+                    ),
+                    target_dir=self.target_dir
+                )
+            except Exception as e:
+                download_error.append(e)
+            finally:
+                results.put(None)
+
+        thread = threading.Thread(target=download, name='media-download', daemon=True)
+        thread.start()
+
+        with ThreadPoolExecutor(max_workers=self.upload_workers, thread_name_prefix='media-upload') as uploads:
+            batch = []
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+
+                url, success, file_path, content_type = item
+                if not success:
+                    summary.failed[url] = "Download fehlgeschlagen"
+                    resolve(url, None)
+                    continue
+
+                summary.downloaded += 1
+                batch.append((url, file_path, content_type))
+                if len(batch) >= self.batch_size:
+                    for batch_url, media_id in self._upload_batch(batch, uploads, summary).items():
+                        resolve(batch_url, media_id)
+                    batch = []
+
+            if batch:
+                for batch_url, media_id in self._upload_batch(batch, uploads, summary).items():
+                    resolve(batch_url, media_id)
+
+        thread.join()
+        self._link_products(ready, product_urls, url_media, summary)
+
+        summary.finished = time.perf_counter()
+        if download_error:
+            raise download_error[0]
+        return summary
+
+    def _upload_batch(self, batch: List[Tuple[str, str, str]], uploads: ThreadPoolExecutor,
+                      summary: ImportSummary) -> Dict[str, Optional[str]]:
+        """
+        Ermittelt bzw. erstellt die Medien eines Batches
+
+        Returns:
+            Medien-ID je URL (None, wenn das Medium nicht angelegt werden konnte)
+        """
+        # Dateiname = Inhalts-Hash; gleiche Inhalte verschiedener URLs nur einmal hochladen
+        files: Dict[str, Tuple[str, str]] = {}
+        url_hashes = {}
+        for url, file_path, content_type in batch:
+            content_hash = os.path.splitext(os.path.basename(file_path))[0]
+            files.setdefault(content_hash, (file_path, content_type))
+            url_hashes[url] = content_hash
+
+        media_ids = self.index.get_many(list(files))
+        unknown = [content_hash for content_hash in files if content_hash not in media_ids]
+
+        if unknown:
+            # In Shopware vorhandene Medien (z.B. aus einem anderen Index) übernehmen
+            found = self.shopware_api.search_media_ids(unknown)
+            if found is None:
+                unknown = []
+            else:
+                self.index.store_many(found)
+                media_ids.update(found)
+                unknown = [content_hash for content_hash in unknown if content_hash not in found]
+        summary.reused += len(media_ids)
+
+        new_media = {content_hash: uuid.uuid4().hex for content_hash in unknown}
+        if new_media and self.shopware_api.create_media(list(new_media.values())) is not None:
+            new_media = {}
+
+        def upload(content_hash: str) -> bool:
+            file_path, content_type = files[content_hash]
+            media_id = new_media[content_hash]
+            if self.shopware_api.upload_media(media_id, file_path, content_type, content_hash):
+                return True
+            # Leere Medien-Entität nicht zurücklassen, damit der nächste Lauf sie neu anlegt
+            self.shopware_api.delete_media(media_id)
+            return False
+
+        uploaded = {}
+        for content_hash, success in zip(new_media, uploads.map(upload, new_media)):
+            if success:
+                uploaded[content_hash] = new_media[content_hash]
+        self.index.store_many(uploaded)
+        media_ids.update(uploaded)
+        summary.uploaded += len(uploaded)
+
+        url_media = {}
+        for url, content_hash in url_hashes.items():
+            url_media[url] = media_ids.get(content_hash)
+            if url_media[url] is None:
+                summary.failed[url] = "Medium konnte nicht angelegt oder hochgeladen werden"
+        return url_media
+
+    def _link_products(self, product_numbers: List[str], product_urls: Dict[str, List[str]],
+                       url_media: Dict[str, str], summary: ImportSummary):
+        """
+        Ordnet den fertigen Produkten ihre Medien zu (Position = Reihenfolge der Bilder)
+
+        Produkte, deren Medien seit der letzten Zuordnung unverändert sind, werden übersprungen.
+        Fehlt ein Bild eines Produkts, bleibt die bisherige Zuordnung bestehen und das
+        Produkt wird als fehlgeschlagen gemeldet.
+        """
+        product_media = OrderedDict()
+        for product_number in product_numbers:
+            urls = product_urls[product_number]
+            missing_count = sum(1 for url in urls if url not in url_media)
+            if missing_count:
+                summary.failed[product_number] = f"{missing_count} von {len(urls)} Bildern nicht verfügbar"
+                continue
+            product_media[product_number] = list(dict.fromkeys(url_media[url] for url in urls))
+        if not product_media:
+            return
+
+        product_ids = self.shopware_api.resolve_product_ids(list(product_media))
+        if product_ids is None:
+            for product_number in product_media:
+                summary.failed[product_number] = "Produkt-IDs konnten nicht ermittelt werden"
+            return
+
+        links = OrderedDict()
+        for product_number, media_ids in product_media.items():
+            product_id = product_ids.get(product_number)
+            if product_id is None:
+                summary.products_missing.append(product_number)
+            else:
+                links[product_id] = (product_number, media_ids)
+
+        linked = self.index.get_links(list(links))
+        for product_id in [product_id for product_id, (_, media_ids) in links.items()
+                           if linked.get(product_id) == media_ids]:
+            del links[product_id]
+            summary.products_unchanged += 1
+
+        if not links:
+            return
+
+        product_links = {product_id: media_ids for product_id, (_, media_ids) in links.items()}
+        errors = self.shopware_api.link_product_media(product_links)
+        if errors is None:
+            self.index.store_links(product_links)
+            summary.products_linked += len(links)
+            return
+
+        # Die Sync-API schreibt den Batch in einer Transaktion: alle Produkte gelten als fehlgeschlagen
+        fallback = next(iter(errors.values()))
+        for position, (product_number, _) in enumerate(links.values()):
+            summary.failed[product_number] = errors.get(position, fallback)
+
+def load_product_images(file_path: str, number_column: str = "merchant_product_id",
+                        image_columns: Optional[List[str]] = None, merchant_name: Optional[str] = None,
+                        limit: Optional[int] = None, chunk_size: int = 50000) -> List[Tuple[str, str]]:
+    """
+    Liest Produktnummern und Bild-URLs aus dem Affiliate-Feed
+
+    Es werden nur die benötigten Spalten gelesen; das Lesen endet, sobald
+    limit Produkte gefunden sind.
+
+    Args:
+        file_path: Pfad der Feed-Datei
+        number_column: Spalte mit der Shopware-Produktnummer
+        image_columns: Spalten mit Bild-URLs in Anzeigereihenfolge
+        merchant_name: nur Zeilen dieses Händlers (None = alle)
+        limit: maximale Anzahl Produkte (None = alle)
+        chunk_size: Zeilen pro gelesenem Block
+
+    Returns:
+        Liste von Tupeln (Produktnummer, Bild-URL)
+    """
+    image_columns = image_columns or ["aw_image_url"]
+    columns = pd.read_csv(file_path, nrows=0).columns
+    missing = [column for column in [number_column] + image_columns if column not in columns]
+    if merchant_name and "merchant_name" not in columns:
+        missing.append("merchant_name")
+    if missing:
+        print(f"❌ Spalten nicht in der CSV-Datei gefunden: {', '.join(missing)}")
+        return []
+
+    usecols = [number_column] + image_columns + (["merchant_name"] if merchant_name else [])
+
+    product_images = []
+    products = set()
+    with pd.read_csv(file_path, usecols=usecols, dtype=str, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            if merchant_name:
+                chunk = chunk[chunk["merchant_name"] == merchant_name]
+            chunk = chunk.dropna(subset=[number_column])
+
+            for product_number, *urls in zip(chunk[number_column], *(chunk[column] for column in image_columns)):
+                if limit and product_number not in products and len(products) >= limit:
+                    return product_images
+                products.add(product_number)
+                product_images += [(product_number, url) for url in urls if isinstance(url, str) and url]
+
+    return product_images
+
+def main():
+    parser = argparse.ArgumentParser(description="Importiert Produktbilder aus dem Feed in die Shopware-Medien")
+    parser.add_argument('feed', help="CSV-Feed mit Produktnummern und Bild-URLs")
+    parser.add_argument('--number-column', default='merchant_product_id', help="Spalte mit der Produktnummer")
+    parser.add_argument('--image-columns', nargs='+', default=['aw_image_url'], help="Spalten mit Bild-URLs")
+    parser.add_argument('--merchant', help="nur Produkte dieses Händlers")
+    parser.add_argument('--limit', type=int, help="maximale Anzahl Produkte")
+    parser.add_argument('--cache-dir', default='images', help="Verzeichnis für Download-Cache und Bilder")
+    parser.add_argument('--index', default='media_index.db', help="lokaler Index Inhalt -> Medien-ID")
+    parser.add_argument('--batch-size', type=int, default=50, help="Bilder je Upload-Batch")
+    parser.add_argument('--download-workers', type=int, default=16, help="gleichzeitige Downloads")
+    parser.add_argument('--upload-workers', type=int, default=4, help="gleichzeitige Uploads")
+    args = parser.parse_args()
+
+    try:
+        from shopware_api import ShopwareAPI
+    except ImportError:
+        print("❌ shopware_api nicht gefunden. Fügen Sie CSV_Datei_Automation/src zum PYTHONPATH hinzu.")
+        return 1
+
+    product_images = load_product_images(args.feed, args.number_column, args.image_columns,
+                                         args.merchant, args.limit)
+    if not product_images:
+        print("❌ Keine Bilder im Feed gefunden")
+        return 1
+    print(f"📷 {len(product_images)} Bilder für {len({number for number, _ in product_images})} Produkte")
+
+    shopware_api = ShopwareAPI(pool_size=args.upload_workers)
+    if not shopware_api.authenticate():
+        print("❌ Shopware API Authentifizierung fehlgeschlagen")
+        return 1
+
+    cache = DownloadCache(args.cache_dir)
+    downloader = MediaDownloader(max_workers=args.download_workers, cache=cache)
+    index = MediaIndex(args.index, shopware_api.base_url)
+    try:
+        importer = MediaImporter(shopware_api, downloader, index, args.batch_size, args.upload_workers)
+        summary = importer.import_images(product_images)
+    finally:
+        downloader.close()
+        cache.close()
+        index.close()
+        shopware_api.close()
+
+    print(summary.report())
+    for key, error in summary.failed.items():
+        print(f"  {key}: {error}")
+    return 0 if not summary.failed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Test-Skript für Bild-Download, Download-Cache und Medien-Import
+
+Der Medien-Import wird gegen den Shopware-Mock der CSV-Synchronisation
+getestet; ShopwareAPI und Mock müssen dafür im PYTHONPATH liegen, sonst
+wird dieser Test übersprungen.
+
+Verwendung:
+    export PYTHONPATH=../CSV_Datei_Automation/src:../CSV_Datei_Automation
+    python test_media.py
+"""
+
+import os
+import tempfile
+
+def serve_directory(directory: str):
+    """Lokaler HTTP-Server für Testbilder (mit Last-Modified und 304-Antworten)"""
+    import threading
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+def write_test_image(path: str, content: bytes):
+    """Schreibt ein minimales PNG (Signatur + Inhalt)"""
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + content.ljust(32, b'\0'))
+
+def mock_shopware_env(server) -> dict:
+    """Zugangsdaten für den Shopware-Mock der CSV-Synchronisation"""
+    return {
+        'SHOPWARE_URL': server.url,
+        'SHOPWARE_API_USERNAME': 'test',
+        'SHOPWARE_API_PASSWORD': 'test',
+        'SHOPWARE_RATE_LIMIT': '0',
+        'PRODUCT_ID_CACHE_FILE': ''
+    }
+
+def test_downloader():
+    """Test des parallelen Bild-Downloads mit Cache"""
+    print("\n🧪 Teste Bild-Download...")
+
+    from advanced_download import MediaDownloader
+    from download_cache import DownloadCache
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        image_dir = os.path.join(state_dir, 'feed')
+        os.makedirs(image_dir)
+        write_test_image(os.path.join(image_dir, 'a.png'), b'a')
+        write_test_image(os.path.join(image_dir, 'a-kopie.png'), b'a')
+        with open(os.path.join(image_dir, 'seite.html'), 'w', encoding='utf-8') as f:
+            f.write('<html>kein Bild</html>' * 4)
+        images = serve_directory(image_dir)
+
+        urls = [f"{images.url}/{name}" for name in ('a.png', 'a-kopie.png', 'seite.html', 'fehlt.png')]
+        cache = DownloadCache(os.path.join(state_dir, 'cache'))
+        downloader = MediaDownloader(max_workers=4, max_retries=0, cache=cache)
+        try:
+            results = {}
+            summary = downloader.download_all(
+                urls, on_result=lambda url, success, file_path, content_type: results.update({url: success})
+            )
+            assert results == {urls[0]: True, urls[1]: True, urls[2]: False, urls[3]: False}, \
+                f"Unerwartete Ergebnisse: {results}"
+            assert summary.files[urls[0]] == summary.files[urls[1]] and summary.duplicates == 1, \
+                "Gleicher Inhalt nicht nur einmal gespeichert"
+            assert os.path.basename(summary.files[urls[0]]).endswith('.png'), "Bildformat nicht erkannt"
+
+            # Zweiter Lauf: unveränderte Bilder per 304 aus dem Cache
+            summary = downloader.download_all(urls[:2])
+            assert summary.not_modified == 2 and summary.total_bytes == 0, "Bedingte Anfragen nicht genutzt"
+        finally:
+            downloader.close()
+            cache.close()
+            images.shutdown()
+
+    print("✅ Bilder parallel geladen, ungültige Antworten erkannt, Cache genutzt")
+
+def test_download_limits():
+    """Test: zu große Bilder und Antworten ohne Bild werden abgebrochen"""
+    print("\n🧪 Teste Größenbegrenzung beim Download...")
+
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from advanced_download import MediaDownloader
+
+    class NoLengthHandler(BaseHTTPRequestHandler):
+        """Antwortet ohne Content-Length (Ende der Antwort = Verbindungsende)"""
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.end_headers()
+            self.wfile.write(b'\x89PNG\r\n\x1a\n' + b'\0' * 4000)
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        image_dir = os.path.join(state_dir, 'feed')
+        os.makedirs(image_dir)
+        write_test_image(os.path.join(image_dir, 'klein.png'), b'klein')
+        write_test_image(os.path.join(image_dir, 'gross.png'), b'gross' * 400)
+        with open(os.path.join(image_dir, 'seite.png'), 'w', encoding='utf-8') as f:
+            f.write('<html>kein Bild</html>' * 4)
+        images = serve_directory(image_dir)
+
+        stream = ThreadingHTTPServer(('127.0.0.1', 0), NoLengthHandler)
+        stream.daemon_threads = True
+        threading.Thread(target=stream.serve_forever, daemon=True).start()
+
+        urls = [f"{images.url}/{name}" for name in ('klein.png', 'gross.png', 'seite.png')]
+        urls.append(f"http://127.0.0.1:{stream.server_address[1]}/ohne-laenge.png")
+        target_dir = os.path.join(state_dir, 'bilder')
+        downloader = MediaDownloader(max_workers=4, max_retries=0, max_image_size=1000)
+        try:
+            summary = downloader.download_all(urls, target_dir=target_dir)
+            assert list(summary.files) == urls[:1], f"Falsche Bilder gespeichert: {list(summary.files)}"
+            assert 'zu groß' in summary.failed[urls[1]], "Content-Length über dem Limit nicht abgelehnt"
+            assert 'kein unterstütztes Bildformat' in summary.failed[urls[2]], "HTML als Bild gespeichert"
+            assert 'größer als 1000 Bytes' in summary.failed[urls[3]], "Download ohne Content-Length nicht begrenzt"
+            assert os.listdir(target_dir) == [os.path.basename(summary.files[urls[0]])], \
+                "Abgebrochene Downloads hinterlassen Dateien"
+
+            # Auch ohne Zielverzeichnis (im Speicher) gilt das Limit
+            summary = downloader.download_all([urls[0], urls[3]])
+            assert summary.succeeded == 1 and list(summary.failed) == [urls[3]], "Limit im Speicher nicht geprüft"
+        finally:
+            downloader.close()
+            images.shutdown()
+            stream.shutdown()
+
+    print("✅ Zu große Bilder und Antworten ohne Bild werden abgebrochen und nicht gespeichert")
+
+def test_download_cache():
+    """Test des Download-Caches (Validatoren und Verdrängung)"""
+    print("\n🧪 Teste Download-Cache...")
+
+    from download_cache import DownloadCache
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = DownloadCache(cache_dir)
+        try:
+            file_path = os.path.join(cache_dir, 'bild.png')
+            write_test_image(file_path, b'bild')
+            cache.store('http://bilder.test/bild.png', file_path, 'image/png', 40,
+                        '"v1"', 'Mon, 05 Oct 2026 10:00:00 GMT')
+
+            # 304 mit neuem ETag, ohne Last-Modified
+            cache.touch('http://bilder.test/bild.png', '"v2"')
+            entry = cache.lookup('http://bilder.test/bild.png')
+            assert entry['etag'] == '"v2"', "ETag aus der 304-Antwort nicht übernommen"
+            assert entry['last_modified'] == 'Mon, 05 Oct 2026 10:00:00 GMT', "Last-Modified verloren"
+            assert DownloadCache.conditional_headers(entry)['If-None-Match'] == '"v2"', \
+                "Bedingte Anfrage verwendet alten ETag"
+        finally:
+            cache.close()
+
+        # Nächster Lauf: nur Dateien früherer Läufe werden verdrängt
+        cache = DownloadCache(cache_dir, max_size=100)
+        try:
+            files = []
+            for name in ('neu1', 'neu2', 'neu3'):
+                files.append(os.path.join(cache_dir, f'{name}.png'))
+                write_test_image(files[-1], name.encode())
+                cache.store(f'http://bilder.test/{name}.png', files[-1], 'image/png', 40)
+
+            assert not os.path.exists(file_path), "Datei des vorherigen Laufs nicht verdrängt"
+            assert all(os.path.exists(path) for path in files), "Im laufenden Import genutzte Datei gelöscht"
+        finally:
+            cache.close()
+
+    # Geänderter Inhalt einer URL: die alte Datei wird gelöscht, außer eine andere URL nutzt sie
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = DownloadCache(cache_dir)
+        try:
+            old_path, new_path, shared_path = (os.path.join(cache_dir, name) for name in ('a.png', 'b.png', 'c.png'))
+            for path in (old_path, new_path, shared_path):
+                write_test_image(path, os.path.basename(path).encode())
+
+            cache.store('http://bilder.test/1.png', old_path, 'image/png', 100)
+            cache.store('http://bilder.test/1.png', new_path, 'image/png', 50)
+            assert not os.path.exists(old_path), "Alte Datei der URL nicht gelöscht"
+            assert cache.total_size == 50, f"Cache-Größe {cache.total_size} statt 50"
+
+            cache.store('http://bilder.test/2.png', shared_path, 'image/png', 30)
+            cache.store('http://bilder.test/3.png', shared_path, 'image/png', 30)
+            cache.store('http://bilder.test/2.png', new_path, 'image/png', 50)
+            assert os.path.exists(shared_path), "Von einer anderen URL genutzte Datei gelöscht"
+            assert cache.total_size == 80, f"Cache-Größe {cache.total_size} statt 80"
+        finally:
+            cache.close()
+
+    print("✅ Download-Cache übernimmt Validatoren, schont Dateien des laufenden Imports und löscht ersetzte Dateien")
+
+def test_load_image_links():
+    """Test: Bild-Links eines Händlers werden blockweise aus wenigen Spalten gelesen"""
+    print("\n🧪 Teste Laden der Bild-Links...")
+
+    from main import load_image_links
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        rows = [
+            'aw_product_id,merchant_name,description,aw_image_url',
+            '1,Anderer Shop,"Text, mit Komma",http://bilder.test/1.jpg',
+            '2,terracanis DE,,http://bilder.test/2.jpg',
+            '3,terracanis DE,,',
+            '4,Anderer Shop,,http://bilder.test/4.jpg',
+            '5,terracanis DE,,http://bilder.test/5.jpg',
+            '6,terracanis DE,,http://bilder.test/6.jpg'
+        ]
+        feed_path = os.path.join(state_dir, 'feed.csv')
+        with open(feed_path, 'w', encoding='utf-8') as f:
+            # Die offene Anführung am Ende wird nach dem Limit nicht mehr gelesen (sonst Parserfehler)
+            f.write('\n'.join(rows + ['7,"offen,,']) + '\n')
+
+        links = load_image_links(feed_path, limit=2, chunk_size=2)
+        assert links == ['http://bilder.test/2.jpg', 'http://bilder.test/5.jpg'], f"Falsche Links: {links}"
+
+        # Unbekannter Händler: die ersten Links aller Händler
+        with open(feed_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(rows) + '\n')
+        links = load_image_links(feed_path, merchant_name='Unbekannt', limit=3, chunk_size=2)
+        assert links == ['http://bilder.test/1.jpg', 'http://bilder.test/2.jpg', 'http://bilder.test/4.jpg'], \
+            f"Falsche Ersatz-Links: {links}"
+
+        assert load_image_links(feed_path, image_column='large_image') == [], "Fehlende Bildspalte nicht erkannt"
+
+    print("✅ Bild-Links nach Händler gefiltert und Lesen nach dem Limit beendet")
+
+def test_media_import():
+    """Test des Medien-Imports gegen den Mock-Server"""
+    print("\n🧪 Teste Medien-Import...")
+
+    try:
+        from mock_shopware import MockShopwareServer
+        from shopware_api import ShopwareAPI
+    except ImportError:
+        print("⚠️ Übersprungen: CSV_Datei_Automation und CSV_Datei_Automation/src nicht im PYTHONPATH")
+        return
+
+    from unittest import mock
+    from advanced_download import MediaDownloader
+    from download_cache import DownloadCache
+    from media_import import MediaImporter, MediaIndex
+
+    server = MockShopwareServer().start()
+    with tempfile.TemporaryDirectory() as state_dir:
+        image_dir = os.path.join(state_dir, 'feed')
+        os.makedirs(image_dir)
+        write_test_image(os.path.join(image_dir, 'a.png'), b'a')
+        write_test_image(os.path.join(image_dir, 'b.png'), b'b')
+        write_test_image(os.path.join(image_dir, 'b-kopie.png'), b'b')
+        images = serve_directory(image_dir)
+
+        try:
+            with mock.patch.dict(os.environ, mock_shopware_env(server)):
+                api = ShopwareAPI()
+                assert api.authenticate(), "Authentifizierung am Mock fehlgeschlagen"
+                server.state.seed(['IMG1', 'IMG2'])
+
+                # b-kopie.png hat denselben Inhalt wie b.png; IMG3 fehlt im Shop
+                product_images = [
+                    ('IMG1', f"{images.url}/a.png"), ('IMG1', f"{images.url}/b.png"),
+                    ('IMG2', f"{images.url}/b-kopie.png"), ('IMG3', f"{images.url}/a.png")
+                ]
+                index = MediaIndex(os.path.join(state_dir, 'media_index.db'), server.url)
+                cache = DownloadCache(os.path.join(state_dir, 'cache'))
+                downloader = MediaDownloader(max_workers=4, cache=cache)
+                try:
+                    importer = MediaImporter(api, downloader, index, batch_size=2)
+                    summary = importer.import_images(product_images)
+                    assert not summary.failed, f"Fehler beim Import: {summary.failed}"
+                    assert summary.uploaded == 2, f"{summary.uploaded} Uploads statt 2 (gleicher Inhalt doppelt?)"
+                    assert summary.products_linked == 2, "Produkte nicht verknüpft"
+                    assert summary.products_missing == ['IMG3'], "Fehlendes Produkt nicht gemeldet"
+
+                    product = server.state.products[server.state.numbers['IMG1']]
+                    assert len(product['media']) == 2 and product['coverId'] == product['media'][0]['id'], \
+                        "Bilder oder Titelbild nicht zugeordnet"
+
+                    # Zweiter Lauf mit demselben Importer: nichts hochladen, nichts neu verknüpfen
+                    sync_requests = server.state.stats()['requests'].get('sync')
+                    summary = importer.import_images(product_images)
+                    assert summary.uploaded == 0 and summary.products_linked == 0, "Unveränderte Bilder erneut übertragen"
+                    assert summary.products_unchanged == 2, "Unveränderte Produkte nicht erkannt"
+                    assert server.state.stats()['requests'].get('sync') == sync_requests, \
+                        "Unveränderte Zuordnungen erneut gesendet"
+
+                    # Fehlt ein Bild, wird das Produkt nicht mit den übrigen Bildern verknüpft
+                    summary = importer.import_images(product_images + [('IMG2', f"{images.url}/fehlt.png")])
+                    assert summary.failed.get('IMG2') == "1 von 2 Bildern nicht verfügbar", \
+                        f"Unvollständiges Produkt nicht gemeldet: {summary.failed}"
+                    assert summary.products_linked == 0 and summary.products_unchanged == 1, \
+                        "Produkt mit fehlendem Bild verknüpft"
+                finally:
+                    downloader.close()
+                    cache.close()
+                    index.close()
+                    api.close()
+        finally:
+            images.shutdown()
+            server.stop()
+
+    print("✅ Bilder einmal hochgeladen, Produkten zugeordnet und bei Wiederholung übersprungen")
+
+def main():
+    """Hauptfunktion für alle Tests"""
+    print("🔍 Bild-Download und Medien-Import - Test")
+    print("=" * 40)
+
+    tests = [
+        ("Bild-Download", test_downloader),
+        ("Größenbegrenzung", test_download_limits),
+        ("Download-Cache", test_download_cache),
+        ("Bild-Links laden", test_load_image_links),
+        ("Medien-Import", test_media_import)
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results.append((test_name, True))
+        except AssertionError as e:
+            print(f"❌ {e}")
+            results.append((test_name, False))
+        except Exception as e:
+            print(f"❌ Test '{test_name}' fehlgeschlagen: {e}")
+            results.append((test_name, False))
+
+    print("\n" + "=" * 40)
+    passed = sum(1 for _, success in results if success)
+    failed = len(results) - passed
+    print(f"🎯 Ergebnis: {passed} erfolgreich, {failed} fehlgeschlagen")
+
+    return failed == 0
+
+if __name__ == "__main__":
+    exit(0 if main() else 1)